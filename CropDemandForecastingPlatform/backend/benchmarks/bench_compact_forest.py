@@ -0,0 +1,62 @@
+"""
+Microbenchmark: DemandPredictor forest latency and memory, sklearn versus the packed float32 CompactForest.
+
+Usage: python benchmarks/bench_compact_forest.py [n_calls]
+"""
+import sys
+import os
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+# Add the backend and backend source directories to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.compact_forest import CompactForest
+from models.crop_models import DemandPredictor
+
+def time_per_call(fn, n_calls):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls
+
+def main(n_calls=200):
+    predictor = DemandPredictor(store=False)
+    forest = predictor.model
+    compact = CompactForest.from_forest(forest)
+    rng = np.random.RandomState(0)
+    X = predictor.data[predictor.feature_columns].to_numpy(dtype=np.float64)
+    X[:, 2:] += rng.normal(0, 1, (len(X), 3))
+    frame = pd.DataFrame(X, columns=predictor.feature_columns)
+
+    error = np.max(np.abs(compact.predict(X) - forest.predict(frame)) / np.abs(forest.predict(frame)))
+    assert error <= CompactForest.RTOL, f"relative error {error:.2e} above tolerance"
+
+    print(f"{'batch size':<12}{'sklearn ms':>12}{'compact ms':>12}{'speedup':>10}")
+    for n in [1, 10, 100, 1000]:
+        calls = max(1, n_calls // n)
+        sklearn_s = time_per_call(lambda: forest.predict(frame.iloc[:n]), calls)
+        compact_s = time_per_call(lambda: compact.predict(X[:n]), calls)
+        print(f"{n:<12}{sklearn_s * 1e3:>12.3f}{compact_s * 1e3:>12.3f}{sklearn_s / compact_s:>9.1f}x")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        single = {
+            'sklearn DemandPredictor.predict': time_per_call(
+                lambda: max(0, forest.predict(predictor.preprocess_input('corn', 'north'))[0]), n_calls),
+            'compact DemandPredictor.predict': time_per_call(lambda: predictor.predict('corn', 'north'), n_calls),
+        }
+    for name, seconds in single.items():
+        print(f"{name:<40}{seconds * 1e6:>12.1f} us")
+
+    sklearn_bytes = sum(e.tree_.__getstate__()['nodes'].nbytes + e.tree_.value.nbytes for e in forest.estimators_)
+    print(f"\n{compact.n_trees} trees, {compact.n_nodes} nodes, max relative error {error:.1e}")
+    print(f"Node storage: sklearn {sklearn_bytes / 1024:.0f} KiB, compact {compact.nbytes / 1024:.0f} KiB "
+          f"({sklearn_bytes / compact.nbytes:.1f}x smaller)")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
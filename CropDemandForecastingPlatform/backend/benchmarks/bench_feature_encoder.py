@@ -0,0 +1,68 @@
+"""
+Microbenchmark: per-call latency of the legacy pandas feature path versus FeatureEncoder.
+
+Usage: python benchmarks/bench_feature_encoder.py [n_calls]
+"""
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.forecasting import Forecasting
+
+def legacy_prepare_features(features, data):
+    """The original one-row DataFrame path, kept as the reference implementation"""
+    df = pd.DataFrame([data])
+    if 'price_history' in data:
+        df['price_moving_avg'] = np.mean(data['price_history'])
+        df['price_change'] = (data['price_per_ton'] - data['price_history'][-1]) / data['price_history'][-1]
+    else:
+        df['price_moving_avg'] = data.get('price_per_ton', 0)
+        df['price_change'] = 0
+    for feature in features:
+        if feature not in df.columns:
+            df[feature] = 0
+    return df[features]
+
+def time_per_call(fn, n_calls):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls
+
+def main(n_calls=2000):
+    rng = np.random.RandomState(42)
+    forecaster = Forecasting()
+    X_train = rng.normal(size=(500, len(forecaster.features)))
+    forecaster.yield_model = LinearRegression().fit(X_train, rng.normal(size=500))
+
+    data = {
+        'temperature': 24.5, 'rainfall': 120.0, 'humidity': 65.0, 'soil_moisture': 40.0,
+        'month': 7, 'price_per_ton': 310.0, 'price_history': [300.0, 305.0, 298.0, 302.0, 307.0]
+    }
+    legacy_X = legacy_prepare_features(forecaster.features, data).to_numpy(dtype=np.float64)
+    assert np.array_equal(legacy_X, forecaster.encoder.encode(data)), "encoder output differs from legacy path"
+
+    results = {
+        'legacy prepare_features': time_per_call(lambda: legacy_prepare_features(forecaster.features, data), n_calls),
+        'encoder.encode': time_per_call(lambda: forecaster.encoder.encode(data), n_calls),
+        'legacy prepare + LinearRegression.predict': time_per_call(
+            lambda: forecaster.yield_model.predict(legacy_prepare_features(forecaster.features, data).to_numpy()), n_calls),
+        'predict_yield (encoder)': time_per_call(lambda: forecaster.predict_yield(data), n_calls),
+    }
+
+    print(f"{'path':<45}{'us/call':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<45}{seconds * 1e6:>12.1f}")
+    print(f"\nFeature preparation speedup: "
+          f"{results['legacy prepare_features'] / results['encoder.encode']:.1f}x")
+    return results
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
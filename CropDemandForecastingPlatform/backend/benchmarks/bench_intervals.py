@@ -0,0 +1,66 @@
+"""
+Microbenchmark: cost of p10/p50/p90 intervals on top of point forecasts.
+
+Compares, per batch size, the former point path (sklearn predict on both models), point predictions
+from the per-tree pass alone (CompactForest export up to COMPACT_MAX_ROWS rows, as the registry serves
+them), and the full Forecasting.predict_arrays with demand quantiles from the trees and residual-based
+yield quantiles.
+
+Usage: python benchmarks/bench_intervals.py [n_calls]
+"""
+import sys
+import os
+import time
+import numpy as np
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.compact_forest import CompactForest
+from core.forecasting import Forecasting, tree_predictions
+from core.training import fit_models
+
+def best_times(fns, n_calls, repeats=7):
+    """Best time per call of each function; runs are interleaved so drift hits all of them alike"""
+    for fn in fns:
+        fn()  # warm up
+    best = [float('inf')] * len(fns)
+    for _ in range(repeats):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter()
+            for _ in range(n_calls):
+                fn()
+            best[i] = min(best[i], (time.perf_counter() - start) / n_calls)
+    return best
+
+def main(n_calls=200):
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(9000, 8))
+    y_yield = X @ rng.normal(size=8) + 4 + rng.normal(0, 0.5, len(X))
+    y_demand = X @ rng.normal(size=8) * 100 + 3000 + rng.normal(0, 50, len(X))
+    forecaster = Forecasting()
+    forecaster.yield_model, forecaster.demand_model = fit_models(X, y_yield, y_demand, n_jobs=1)
+    forecaster.compact_demand_model = CompactForest.from_forest(forecaster.demand_model)
+
+    def sklearn_point(Xn):
+        return forecaster.yield_model.predict(Xn), forecaster.demand_model.predict(Xn)
+
+    def tree_point(Xn):
+        trees = tree_predictions(forecaster.demand_model, Xn, forecaster.compact_demand_model)
+        return forecaster.yield_model.predict(Xn), trees.mean(axis=0)
+
+    print(f"{'batch size':<12}{'sklearn ms':>12}{'point ms':>12}{'+intervals ms':>15}{'overhead':>10}")
+    worst = 0.0
+    for n in [1, 10, 100, 1000]:
+        Xn = X[:n]
+        calls = max(5, n_calls // n)
+        sklearn_s, point_s, interval_s = best_times(
+            [lambda: sklearn_point(Xn), lambda: tree_point(Xn), lambda: forecaster.predict_arrays(Xn)], calls)
+        overhead = interval_s / point_s - 1
+        worst = max(worst, overhead)
+        print(f"{n:<12}{sklearn_s * 1e3:>12.3f}{point_s * 1e3:>12.3f}{interval_s * 1e3:>15.3f}{overhead:>9.1%}")
+
+    print(f"\nWorst interval overhead over point prediction: {worst:.1%} (target < 20%)")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,44 @@
+"""
+Microbenchmark: cost of timing spans while disabled and enabled, alone and on an instrumented forecast.
+
+Usage: python benchmarks/bench_metrics.py [n_calls]
+"""
+import sys
+import os
+import time
+
+# Add the backend source directory and tests (for the sample models) to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from core.forecasting import Forecasting
+from core.metrics import metrics
+from test_forecasting import make_models, sample_features
+
+def time_per_call(fn, n_calls):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls
+
+def empty_span():
+    with metrics.span('bench'):
+        pass
+
+def main(n_calls=20000):
+    forecaster = Forecasting()
+    forecaster.yield_model, forecaster.demand_model = make_models()
+    features = sample_features()
+
+    print(f"{'':<28}{'disabled us':>14}{'enabled us':>14}")
+    for name, fn, calls in [('empty span', empty_span, n_calls),
+                            ('Forecasting.get_forecast', lambda: forecaster.get_forecast(features), n_calls // 100)]:
+        timings = []
+        for enabled in (False, True):
+            metrics.enabled = enabled
+            timings.append(time_per_call(fn, calls) * 1e6)
+        print(f"{name:<28}{timings[0]:>14.3f}{timings[1]:>14.3f}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,64 @@
+"""
+Benchmark: train the default model plus every (crop, region) partition serially and on process pools of growing size.
+
+The training set is read once; each run publishes into a fresh registry. The
+speedup column is relative to the serial run with single-threaded forests.
+There are 25 partitions plus the default model, whose forest is split into
+tree chunks, so on a machine with N cores the pool with N workers should
+approach N times faster until N nears the number of tasks.
+
+Usage: python benchmarks/bench_parallel_training.py [max_workers] [replicate]
+"""
+import sys
+import os
+import tempfile
+import time
+import pandas as pd
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.ingestion import build_training_set, load_training_set
+from core.model_registry import ModelRegistry
+from core.training import train_forecasting_models, plan_parallelism, DEFAULT_FOREST_CHUNKS
+
+def run(training_set, root, n_workers, rf_jobs=None):
+    registry = ModelRegistry(root)
+    start = time.perf_counter()
+    published = train_forecasting_models(training_set, registry, n_workers=n_workers, rf_jobs=rf_jobs)
+    return time.perf_counter() - start, len(published)
+
+def main():
+    cpus = os.cpu_count() or 1
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else cpus
+    replicate = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        training_set = load_training_set(build_training_set(output_dir=os.path.join(tmp, 'ts')))
+        # Replicating rows grows every partition without changing how many there are
+        training_set = pd.concat([training_set] * replicate, ignore_index=True)
+        partitions = training_set.groupby(['crop_type', 'region'], observed=True).ngroups + 1
+        tasks = partitions - 1 + DEFAULT_FOREST_CHUNKS
+
+        pool_sizes = []
+        n = 1
+        while n < max_workers:
+            pool_sizes.append(n)
+            n *= 2
+        pool_sizes.append(max_workers)
+
+        runs = [('serial, 1 thread per forest', 1, 1),
+                (f'serial, forests on {cpus} core(s)', 1, None)]
+        runs += [(f'{n} workers x {plan_parallelism(tasks, n)[1]} threads', n, None) for n in pool_sizes[1:]]
+
+        print(f"{len(training_set)} rows, {partitions} models, {cpus} CPU(s)")
+        print(f"{'run':<34}{'seconds':>10}{'speedup':>10}")
+        baseline = None
+        for i, (name, n_workers, rf_jobs) in enumerate(runs):
+            seconds, published = run(training_set, os.path.join(tmp, f'registry-{i}'), n_workers, rf_jobs)
+            assert published == partitions, "some partitions were not published"
+            baseline = baseline or seconds
+            print(f"{name:<34}{seconds:>10.2f}{baseline / seconds:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
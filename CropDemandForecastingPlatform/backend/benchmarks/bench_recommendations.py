@@ -0,0 +1,133 @@
+"""
+Microbenchmark: per-call latency of the original RecommendationEngine logic versus the precomputed table.
+
+Usage: python benchmarks/bench_recommendations.py [n_calls]
+"""
+import sys
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any
+import numpy as np
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.recommendation_engine import RecommendationEngine
+
+class LegacyRecommendationEngine(RecommendationEngine):
+    def get_recommendation(self, crop_type: str, predicted_yield: float, predicted_demand: float) -> Dict[str, Any]:
+        """The original per-call implementation, kept as the reference"""
+        current_month = datetime.now().month
+        ratio = predicted_demand / predicted_yield if predicted_yield > 0 else 0
+        crop_info = self.market_conditions.get(crop_type, {})
+        
+        # Calculate months until peak season
+        peak_months = crop_info.get('peak_months', [])
+        next_peak = next((m for m in peak_months if m >= current_month), peak_months[0] if peak_months else current_month)
+        months_to_peak = (next_peak - current_month) % 12
+
+        # Generate planting recommendation
+        if ratio > 1.2:
+            planting_advice = f"High demand expected for {crop_type}. Recommended to increase production."
+            confidence = 0.9
+        elif ratio < 0.8:
+            planting_advice = f"Market may be oversupplied for {crop_type}. Consider diversifying crops or reducing production."
+            confidence = 0.8
+        else:
+            planting_advice = f"Current production levels of {crop_type} align well with market demand."
+            confidence = 0.85
+
+        # Generate market insights
+        market_insights = []
+        if crop_info.get('demand_trend') == 'increasing':
+            market_insights.append("Market demand is trending upward")
+        elif crop_info.get('demand_trend') == 'decreasing':
+            market_insights.append("Market demand is trending downward")
+
+        if crop_info.get('price_trend') == 'increasing':
+            market_insights.append("Prices are expected to rise")
+        elif crop_info.get('price_trend') == 'decreasing':
+            market_insights.append("Prices are expected to decline")
+
+        # Generate selling strategy
+        if months_to_peak <= 3:
+            selling_strategy = f"Peak selling season approaching in {months_to_peak} months. Consider storing crop until then for better prices."
+        else:
+            selling_strategy = f"Current off-peak season. {months_to_peak} months until peak season. Evaluate storage costs versus current market prices."
+
+        # Generate distribution recommendation
+        recommended_markets = []
+        if ratio > 1.2:
+            # High demand - recommend distant markets with better prices
+            for region, markets in self.regional_markets.items():
+                if region not in crop_info.get('best_regions', []):
+                    recommended_markets.extend(markets[:1])
+        else:
+            # Normal/Low demand - recommend local markets to reduce costs
+            for region in crop_info.get('best_regions', [])[:2]:
+                recommended_markets.extend(self.regional_markets.get(region, [])[:2])
+
+        # Storage recommendation
+        storage_months = crop_info.get('storage_life_months', 6)
+        storage_advice = f"Crop can be stored for up to {storage_months} months under proper conditions."
+
+        return {
+            "planting_recommendation": {
+                "advice": planting_advice,
+                "confidence": confidence,
+                "best_regions": crop_info.get('best_regions', [])
+            },
+            "selling_strategy": {
+                "timing": selling_strategy,
+                "peak_months": peak_months,
+                "storage_duration": storage_advice
+            },
+            "distribution_strategy": {
+                "recommended_markets": recommended_markets,
+                "transportation_tips": "Consider bulk transport to reduce costs" if ratio > 1.2 else "Focus on local markets to minimize transportation costs"
+            },
+            "market_analysis": {
+                "demand_supply_ratio": float(ratio),
+                "predicted_yield": float(predicted_yield),
+                "predicted_demand": float(predicted_demand),
+                "market_insights": market_insights
+            }
+        }
+
+def time_per_call(fn, n_calls):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls
+
+def main(n_calls=20000):
+    rng = np.random.RandomState(42)
+    legacy = LegacyRecommendationEngine()
+    engine = RecommendationEngine()
+    crops = list(engine.market_conditions) + ['barley']
+    yields = rng.uniform(0, 10, size=1000)
+    demands = rng.uniform(0, 15, size=1000)
+
+    for i, (y, d) in enumerate(zip(yields.tolist(), demands.tolist())):
+        crop_type = crops[i % len(crops)]
+        assert engine.get_recommendation(crop_type, y, d) == legacy.get_recommendation(crop_type, y, d), \
+            "table lookup differs from legacy path"
+
+    results = {
+        'legacy get_recommendation': time_per_call(lambda: legacy.get_recommendation('corn', 4.2, 5.9), n_calls),
+        'table get_recommendation': time_per_call(lambda: engine.get_recommendation('corn', 4.2, 5.9), n_calls),
+        'get_recommendations_batch (per item, n=1000)': time_per_call(
+            lambda: engine.get_recommendations_batch('corn', yields, demands), max(1, n_calls // 1000)) / len(yields),
+    }
+
+    print(f"{'path':<50}{'us/call':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<50}{seconds * 1e6:>12.2f}")
+    print(f"\nPer-call speedup: "
+          f"{results['legacy get_recommendation'] / results['table get_recommendation']:.1f}x")
+    return results
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
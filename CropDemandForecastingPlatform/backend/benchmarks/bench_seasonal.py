@@ -0,0 +1,53 @@
+"""
+Microbenchmark: fitting the seasonal models of every crop/region in one vectorized pass versus one series at a time,
+and the cost of an incremental one-day update.
+
+Usage: python benchmarks/bench_seasonal.py [repeats]
+"""
+import sys
+import os
+import time
+import numpy as np
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.seasonal import SeasonalModel, read_history
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(repeats=3):
+    start = time.perf_counter()
+    history = read_history()
+    read_s = time.perf_counter() - start
+    model = SeasonalModel.fit(history)
+    keys = model.keys
+
+    def fit_each():
+        for crop_type, region in keys:
+            SeasonalModel.fit({measure: {name: values[(obs['crop_type'] == crop_type) & (obs['region'] == region)]
+                                         for name, values in obs.items()}
+                               for measure, obs in history.items()})
+
+    vectorized_s = best_of(lambda: SeasonalModel.fit(history), repeats)
+    looped_s = best_of(fit_each, repeats)
+
+    next_day = {measure: {'crop_type': np.array([k[0] for k in keys]), 'region': np.array([k[1] for k in keys]),
+                          'day': np.full(len(keys), model.last_day + 1), 'value': model.level[m]}
+                for m, measure in enumerate(history)}
+    update_s = best_of(lambda: model.updated(next_day), max(repeats, 100))
+
+    print(f"{len(keys)} crop/region pairs x {len(history)} measures, "
+          f"{model.last_day - int(min(o['day'].min() for o in history.values())) + 1} days (read {read_s * 1e3:.0f} ms)")
+    print(f"{'all series in one pass':<32}{vectorized_s * 1e3:>10.1f} ms")
+    print(f"{'one series at a time':<32}{looped_s * 1e3:>10.1f} ms ({looped_s / vectorized_s:.1f}x slower)")
+    print(f"{'one-day update':<32}{update_s * 1e3:>10.3f} ms")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
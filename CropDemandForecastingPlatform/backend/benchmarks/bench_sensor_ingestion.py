@@ -0,0 +1,54 @@
+"""
+Benchmark: sustained sensor ingestion throughput (NDJSON parsing, queueing, batched SQLite writes, aggregation).
+
+Usage: python benchmarks/bench_sensor_ingestion.py [n_readings]
+"""
+import sys
+import os
+import json
+import tempfile
+import time
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.database import Database
+from core.sensor_ingestion import SensorIngestor, parse_lines
+
+def make_lines(n):
+    regions = ['north', 'south', 'east', 'west', 'central']
+    return [json.dumps({
+        'timestamp': f'2024-01-01T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}',
+        'sensor_id': f'SENSOR{i % 200:03d}', 'location': f'{regions[i % 5]}_field_{i % 4}',
+        'temperature': 20.0 + i % 10, 'humidity': 60.0 + i % 20, 'soil_moisture': 35.0 + i % 15,
+        'soil_ph': 6.8, 'light_intensity': 850.0
+    }).encode('utf-8') for i in range(n)]
+
+def main(n_readings=200000, request_size=1000):
+    lines = make_lines(n_readings)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        db.ensure_schema()
+        ingestor = SensorIngestor(db)
+
+        start = time.perf_counter()
+        parse_seconds = 0.0
+        for i in range(0, n_readings, request_size):
+            parse_start = time.perf_counter()
+            readings, _ = parse_lines(lines[i:i + request_size])
+            parse_seconds += time.perf_counter() - parse_start
+            ingestor.submit(readings, block=True)
+        assert ingestor.flush(timeout=120), "writer did not drain"
+        seconds = time.perf_counter() - start
+        stats = ingestor.stats()
+        ingestor.stop()
+
+    print(f"{n_readings} readings in {request_size}-line requests")
+    print(f"{'end-to-end readings/s':<32}{n_readings / seconds:>12.0f}")
+    print(f"{'parse readings/s':<32}{n_readings / parse_seconds:>12.0f}")
+    print(f"{'write+aggregate readings/s':<32}{stats['written'] / stats['write_seconds']:>12.0f}")
+    print(f"{'batches':<32}{stats['batches']:>12}")
+    return stats
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
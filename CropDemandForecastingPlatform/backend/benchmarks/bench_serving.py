@@ -0,0 +1,359 @@
+"""
+Benchmark suite for forecast serving, with JSON results for regression checks.
+
+Covers predictor construction (training versus loading from the model
+store), server cold start (import, first login and first forecast in a
+fresh process for each APP_WARMUP mode), single-row and batch predict
+latency of YieldPredictor and DemandPredictor,
+Forecasting.prepare_features overhead, and a load test of
+POST /api/forecast. The load test runs against the Flask app in process
+(one test client per thread) or, with --url, against a running server.
+Latencies are reported as mean/p50/p95/p99 in milliseconds.
+
+The in-process app serves models published from the historical training set
+into a temporary registry (or --registry), and uses a temporary database.
+Request logging is silenced unless --log-requests is given.
+
+With --baseline, every latency metric (*_ms, *_us) that grew and every
+throughput that fell by more than --tolerance (a fraction) is reported as a
+regression, and the exit status is 1. Compare runs made with the same
+options on the same machine.
+
+Usage: python benchmarks/bench_serving.py [--quick] [--output results.json] [--baseline previous.json]
+           [--tolerance 0.25] [--requests 2000] [--concurrency 4] [--url http://127.0.0.1:5000]
+           [--registry DIR]
+"""
+import sys
+import os
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import sklearn
+
+# Add the backend and backend source directories to the Python path
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(BACKEND_DIR, 'src'))
+sys.path.append(BACKEND_DIR)
+
+from models.crop_models import CROPS, REGIONS, YieldPredictor, DemandPredictor
+from models.model_store import ModelStore
+from core.forecasting import Forecasting
+
+def summarize(seconds):
+    """
+    Latency summary in milliseconds for a list of per-call durations in seconds
+    """
+    ms = np.asarray(seconds) * 1000
+    return {
+        'count': int(len(ms)),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
+
+def time_calls(fn, n_calls, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(n_calls):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def scenario_columns(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return (
+        [CROPS[i] for i in rng.randint(0, len(CROPS), n)],
+        [REGIONS[i] for i in rng.randint(0, len(REGIONS), n)],
+        rng.normal(25, 5, n), rng.normal(150, 30, n), rng.normal(7, 1, n)
+    )
+
+def random_features(rng):
+    return {
+        'temperature': float(rng.normal(25, 5)), 'rainfall': float(rng.uniform(0, 100)),
+        'humidity': float(rng.uniform(30, 90)), 'soil_moisture': float(rng.uniform(20, 60)),
+        'month': int(rng.randint(1, 13)), 'price_history': rng.uniform(150, 450, 8).round(2).tolist()
+    }
+
+def bench_startup(repeats):
+    """
+    Predictor construction: training from scratch versus loading a stored version
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = ModelStore(store_dir)
+        for name, cls in [('yield', YieldPredictor), ('demand', DemandPredictor)]:
+            results[name] = {
+                'train': summarize(time_calls(lambda: cls(store=False), repeats, warmup=0)),
+                'load': summarize(time_calls(lambda: cls(store=store), repeats, warmup=1)),
+            }
+    return results
+
+def bench_predictors(n_calls, batch_sizes):
+    """
+    Single-row predict and predict_batch latency; batch entries also report per-row cost
+    """
+    results = {}
+    with warnings.catch_warnings():
+        # The row-wise predict path passes arrays to models fitted on DataFrames
+        warnings.simplefilter('ignore', UserWarning)
+        for name, predictor in [('yield', YieldPredictor(store=False)), ('demand', DemandPredictor(store=False))]:
+            results[name] = {'single': summarize(time_calls(lambda: predictor.predict('corn', 'north'), n_calls))}
+            for size in batch_sizes:
+                columns = scenario_columns(size)
+                summary = summarize(time_calls(lambda: predictor.predict_batch(*columns), max(3, n_calls // size)))
+                summary['per_row_us'] = summary['mean_ms'] * 1000 / size
+                results[name][f'batch_{size}'] = summary
+    return results
+
+def bench_prepare_features(n_calls):
+    """
+    Feature preparation: the DataFrame path against the encoder it wraps
+    """
+    forecaster = Forecasting()
+    features = random_features(np.random.RandomState(0))
+    return {
+        'prepare_features': summarize(time_calls(lambda: forecaster.prepare_features(features), n_calls)),
+        'encode': summarize(time_calls(lambda: forecaster.encoder.encode(features), n_calls)),
+    }
+
+def forecast_payloads(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return [{'crop_type': CROPS[i % len(CROPS)], 'region': REGIONS[(i // len(CROPS)) % len(REGIONS)],
+             'features': random_features(rng)} for i in range(n)]
+
+def prepare_environment(registry_dir, quick):
+    """
+    Point the app at a temporary database, publishing models first when the registry is empty
+    """
+    tmp = tempfile.mkdtemp(prefix='bench-serving-')
+    os.environ.setdefault('DATABASE_PATH', os.path.join(tmp, 'agritech.db'))
+    os.environ.setdefault('FEATURE_STORE_DIR', os.path.join(tmp, 'feature-store'))
+    os.environ.setdefault('CROP_MODEL_STORE', os.path.join(tmp, 'model-store'))
+    os.environ.setdefault('SEASONAL_MODEL_PATH', os.path.join(tmp, 'seasonal_model.npz'))
+    os.environ['MODEL_UPDATE_INTERVAL'] = '0'
+    os.environ['MODEL_REGISTRY_DIR'] = registry_dir or os.path.join(tmp, 'registry')
+
+    from core.model_registry import ModelRegistry
+    if not ModelRegistry().load_all():
+        from core.ingestion import build_training_set, load_training_set
+        from core.training import train_forecasting_models
+        training_set = load_training_set(build_training_set(output_dir=os.path.join(tmp, 'training-set')))
+        if quick:
+            training_set = training_set.iloc[::5]
+        train_forecasting_models(training_set, ModelRegistry(), n_workers=1)
+
+def prepare_app(registry_dir, quick):
+    """
+    Import the app, warmed up, against the prepared environment
+    """
+    prepare_environment(registry_dir, quick)
+    os.environ.setdefault('APP_WARMUP', 'eager')
+    from app import app
+    return app
+
+COLD_START_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+login = client.post('/api/login', json={'email': 'mahesha@gmail.com', 'password': 'm@123'})
+logged_in = time.perf_counter()
+forecast = client.post('/api/forecast', json=json.loads(sys.argv[1]))
+done = time.perf_counter()
+assert login.status_code == 200 and forecast.status_code == 200, (login.status_code, forecast.status_code)
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_login_ms': (logged_in - imported) * 1000,
+                  'first_forecast_ms': (done - logged_in) * 1000, 'ready_ms': (done - start) * 1000}))
+'''
+
+def bench_cold_start(repeats, registry_dir=None, quick=False):
+    """
+    A fresh server process per APP_WARMUP mode: import, then the first login and the first forecast
+    """
+    prepare_environment(registry_dir, quick)
+    payload = json.dumps(forecast_payloads(1)[0])
+    results = {}
+    for mode in ('off', 'background', 'eager'):
+        runs = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, payload],
+                                    cwd=os.path.join(BACKEND_DIR, 'src'), env={**os.environ, 'APP_WARMUP': mode},
+                                    capture_output=True, text=True, check=True)
+            runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+        results[mode] = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+    return results
+
+def run_load(send, payloads, concurrency):
+    """
+    Send every payload from ``concurrency`` threads; returns per-request latencies, errors and wall time
+    """
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    chunks = [payloads[i::concurrency] for i in range(concurrency)]
+
+    def worker(chunk):
+        nonlocal errors
+        local, failed = [], 0
+        for payload in chunk:
+            start = time.perf_counter()
+            ok = send(payload)
+            local.append(time.perf_counter() - start)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, chunks))
+    return latencies, errors, time.perf_counter() - start
+
+def bench_forecast_endpoint(n_requests, concurrency, url=None, registry_dir=None, quick=False, log_requests=False):
+    """
+    End-to-end POST /api/forecast: distinct feature sets (cache misses), then one repeated request (cache hits)
+    """
+    if url:
+        def send(payload):
+            request = urllib.request.Request(f'{url.rstrip("/")}/api/forecast', data=json.dumps(payload).encode(),
+                                             headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status == 200
+    else:
+        app = prepare_app(registry_dir, quick)
+        if not log_requests:
+            logging.getLogger().setLevel(logging.WARNING)
+        clients = threading.local()
+
+        def send(payload):
+            if not hasattr(clients, 'client'):
+                clients.client = app.test_client()
+            return clients.client.post('/api/forecast', json=payload).status_code == 200
+
+    results = {}
+    payloads = forecast_payloads(n_requests)
+    send(payloads[0])  # warm up
+    for name, batch in [('uncached', payloads), ('cached', [payloads[0]] * n_requests)]:
+        latencies, errors, wall = run_load(send, batch, concurrency)
+        results[name] = {**summarize(latencies), 'errors': errors, 'concurrency': concurrency,
+                         'throughput_rps': len(batch) / wall}
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=BACKEND_DIR, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit, 'python': platform.python_version(),
+        'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+        'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+    }
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def compare(results, baseline, tolerance):
+    """
+    Metrics that regressed beyond ``tolerance``: latencies (*_ms, *_us) up or throughput down
+    """
+    current, previous = flatten(results.get('benchmarks', {})), flatten(baseline.get('benchmarks', {}))
+    regressions = []
+    for name, old in previous.items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+        if name.endswith(('_ms', '_us')) and new > old * (1 + tolerance):
+            regressions.append({'metric': name, 'baseline': old, 'current': new, 'change': new / old - 1})
+        elif name.endswith('throughput_rps') and new < old * (1 - tolerance):
+            regressions.append({'metric': name, 'baseline': old, 'current': new, 'change': new / old - 1})
+    return regressions
+
+def print_report(benchmarks):
+    cold_start = benchmarks.get('cold_start', {})
+    if cold_start:
+        print(f"{'cold start (APP_WARMUP)':<24}{'import ms':>12}{'first login ms':>16}{'first forecast ms':>19}{'ready ms':>11}")
+        for mode, timings in cold_start.items():
+            print(f"{mode:<24}{timings['import_ms']:>12.1f}{timings['first_login_ms']:>16.1f}"
+                  f"{timings['first_forecast_ms']:>19.1f}{timings['ready_ms']:>11.1f}")
+        print()
+
+    print(f"{'metric':<44}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for section, groups in benchmarks.items():
+        if section == 'cold_start':
+            continue
+        for group, entries in groups.items():
+            summaries = entries if 'mean_ms' not in entries else {'': entries}
+            for name, summary in summaries.items():
+                label = '.'.join(part for part in (section, group, name) if part)
+                line = (f"{label:<44}{summary['mean_ms']:>10.3f}{summary['p50_ms']:>10.3f}"
+                        f"{summary['p95_ms']:>10.3f}{summary['p99_ms']:>10.3f}")
+                if 'throughput_rps' in summary:
+                    line += f"  {summary['throughput_rps']:.0f} req/s"
+                print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--quick', action='store_true', help='fewer iterations and a smaller training set')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--requests', type=int, default=None)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--url', help='load test a running server instead of the in-process app')
+    parser.add_argument('--registry', help='serve the models published in this registry')
+    parser.add_argument('--log-requests', action='store_true')
+    args = parser.parse_args()
+
+    n_calls = 50 if args.quick else 300
+    n_requests = args.requests or (200 if args.quick else 2000)
+    benchmarks = {
+        'startup': bench_startup(2 if args.quick else 5),
+        'cold_start': bench_cold_start(1 if args.quick else 3, args.registry, args.quick),
+        'predict': bench_predictors(n_calls, [1, 100] if args.quick else [1, 100, 1000, 10000]),
+        'features': {'forecasting': bench_prepare_features(n_calls * 10)},
+        'endpoint': {'forecast': bench_forecast_endpoint(n_requests, args.concurrency, args.url, args.registry,
+                                                         args.quick, args.log_requests)},
+    }
+    results = {'environment': environment(), 'quick': args.quick, 'benchmarks': benchmarks}
+    print_report(benchmarks)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} ({r['change']:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark: fetch forecasts for many regions from the local weather stub, sequentially versus fanned out.
+
+Usage: python benchmarks/bench_weather_fanout.py [n_regions] [latency_seconds]
+"""
+import sys
+import os
+import asyncio
+import time
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.weather_client import AsyncWeatherClient
+from api.weather_stub_server import WeatherStubServer
+
+async def fetch_all(base_url, regions, **options):
+    async with AsyncWeatherClient(base_url, **options) as client:
+        start = time.perf_counter()
+        results = await client.fetch_many(regions, days=7)
+        seconds = time.perf_counter() - start
+        stats = client.stats()
+    assert not any(isinstance(r, Exception) for r in results.values()), "weather fetch failed"
+    return seconds, stats
+
+async def run(n_regions, latency):
+    regions = [f'region-{i}' for i in range(n_regions)]
+    configs = {
+        'sequential (1 connection)': {'max_connections': 1, 'max_concurrency': 1},
+        'fan-out (20 connections, 50 in flight)': {'max_connections': 20, 'max_concurrency': 50},
+        'fan-out (50 connections, 100 in flight)': {'max_connections': 50, 'max_concurrency': 100},
+    }
+    results = {}
+    async with WeatherStubServer(latency=latency) as server:
+        for name, options in configs.items():
+            results[name] = await fetch_all(server.base_url, regions, **options)
+
+    print(f"{n_regions} regions, {latency * 1000:.0f} ms simulated latency")
+    print(f"{'client':<42}{'seconds':>10}{'regions/s':>12}{'connects':>10}")
+    for name, (seconds, stats) in results.items():
+        print(f"{name:<42}{seconds:>10.2f}{n_regions / seconds:>12.0f}{stats['connects']:>10}")
+    return results
+
+if __name__ == '__main__':
+    n_regions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    asyncio.run(run(n_regions, latency))
@@ -3,108 +3,265 @@ import pandas as pd
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
+from core.compact_forest import CompactForest
+from models.model_store import ModelStore
+
+CROPS = ['wheat', 'rice', 'corn', 'soybeans', 'cotton']
+REGIONS = ['north', 'south', 'east', 'west', 'central']
+
+def chunk_rng(seed, chunk_index):
+    """Random stream for one chunk; chunk 0 continues the plain seeded stream"""
+    return np.random.RandomState(seed if chunk_index == 0 else [seed, chunk_index])
 
 class BasePredictor:
-    def __init__(self):
+    model_name = None
+    model_params = {}
+    target = None
+    feature_columns = ['crop_type_encoded', 'region_encoded', 'temperature', 'rainfall', 'soil_quality']
+    # Predict with a CompactForest exported from the fitted forest. Its
+    # level-by-level walk wins up to a few hundred rows; sklearn's compiled
+    # traversal is faster for larger batches
+    compact = False
+    compact_max_rows = 256
+
+    def __init__(self, store=None, n_samples=1000, seed=42, chunk_size=250000, feature_store=None):
         self.model = None
-        self.label_encoder_crop = LabelEncoder()
-        self.label_encoder_region = LabelEncoder()
+        # Array-based copy of the model used for prediction, when export_model provides one
+        self.compact_model = None
+        self.model_version = None
+        # Pass store=False to always retrain without touching the disk
+        self.store = ModelStore() if store is None else store
+        # Optional core.feature_store.FeatureStore; inputs then take the region's latest stored weather
+        self.feature_store = feature_store
+        self.n_samples = n_samples
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.input_rng = np.random.RandomState(seed)
+        self.label_encoder_crop = LabelEncoder().fit(CROPS)
+        self.label_encoder_region = LabelEncoder().fit(REGIONS)
         self.generate_training_data()
         self.train_model()
 
+    @property
+    def model(self):
+        # With a stored compact model the full model is only read from disk when first used
+        if self._model is None and self._load_model is not None:
+            self._model = self._load_model()
+            self._load_model = None
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+        self._load_model = None
+
+    def build_model(self):
+        raise NotImplementedError
+
+    def export_model(self):
+        """Compact inference copy of the fitted model, or None to predict with the model itself"""
+        return CompactForest.from_forest(self.model) if self.compact else None
+
+    def fit_model(self, X, y):
+        """Fit the model, reusing a stored artifact when data and hyperparameters match"""
+        model_class = type(self.build_model()).__name__
+        fingerprint = ModelStore.fingerprint(X, y, model_class, self.model_params)
+        self.model_version = fingerprint[:16]
+
+        if self.store:
+            artifacts = self.store.load(self.model_name, fingerprint, skip=('model',) if self.compact else ())
+            if artifacts is not None:
+                self.label_encoder_crop = artifacts['label_encoder_crop']
+                self.label_encoder_region = artifacts['label_encoder_region']
+                if 'model' in artifacts:
+                    self.model = artifacts['model']
+                else:
+                    store, name = self.store, self.model_name
+                    self._load_model = lambda: store.load_artifact(name, fingerprint, 'model')
+                self.compact_model = artifacts.get('compact_model')
+                if self.compact and self.compact_model is None:
+                    self.compact_model = self.export_model()
+                return
+
+        self.model = self.build_model()
+        self.model.fit(X, y)
+        self.compact_model = self.export_model()
+
+        if self.store:
+            self.store.save(self.model_name, fingerprint, {
+                'model': self.model,
+                'label_encoder_crop': self.label_encoder_crop,
+                'label_encoder_region': self.label_encoder_region,
+                'compact_model': self.compact_model
+            }, metadata={
+                'model_class': model_class,
+                'model_params': self.model_params,
+                'n_samples': len(X)
+            })
+
     def generate_training_data(self):
-        # Generate sample data
-        np.random.seed(42)
-        n_samples = 1000
-        
-        # Create sample crops and regions
-        crops = ['wheat', 'rice', 'corn', 'soybeans', 'cotton']
-        regions = ['north', 'south', 'east', 'west', 'central']
-        
-        # Generate random data
-        self.data = pd.DataFrame({
-            'crop_type': np.random.choice(crops, n_samples),
-            'region': np.random.choice(regions, n_samples),
-            'temperature': np.random.normal(25, 5, n_samples),
-            'rainfall': np.random.normal(150, 30, n_samples),
-            'soil_quality': np.random.normal(7, 1, n_samples)
-        })
-        
-        # Encode categorical variables
-        self.data['crop_type_encoded'] = self.label_encoder_crop.fit_transform(self.data['crop_type'])
-        self.data['region_encoded'] = self.label_encoder_region.fit_transform(self.data['region'])
+        self.data = pd.concat(list(self.iter_training_chunks()), ignore_index=True)
+
+    def iter_training_chunks(self, n_samples=None, chunk_size=None):
+        """
+        Yield synthetic training rows (features plus target) in columnar chunks.
+        Each chunk has its own seeded stream, so the output is reproducible for a
+        given seed and chunk size, and datasets larger than memory can be written
+        out chunk by chunk.
+        """
+        n_samples = self.n_samples if n_samples is None else n_samples
+        chunk_size = self.chunk_size if chunk_size is None else chunk_size
+
+        # Codes of CROPS/REGIONS under the fitted (sorted) label encoders
+        crop_codes = self.label_encoder_crop.transform(CROPS)
+        region_codes = self.label_encoder_region.transform(REGIONS)
+
+        for chunk_index, start in enumerate(range(0, n_samples, chunk_size)):
+            rng = chunk_rng(self.seed, chunk_index)
+            n = min(chunk_size, n_samples - start)
+
+            crop_idx = rng.randint(0, len(CROPS), n)
+            region_idx = rng.randint(0, len(REGIONS), n)
+            chunk = pd.DataFrame({
+                'crop_type': pd.Categorical.from_codes(crop_codes[crop_idx], self.label_encoder_crop.classes_),
+                'region': pd.Categorical.from_codes(region_codes[region_idx], self.label_encoder_region.classes_),
+                'temperature': rng.normal(25, 5, n),
+                'rainfall': rng.normal(150, 30, n),
+                'soil_quality': rng.normal(7, 1, n),
+                'crop_type_encoded': crop_codes[crop_idx],
+                'region_encoded': region_codes[region_idx]
+            })
+            chunk[self.target] = self.compute_target(chunk, rng)
+            yield chunk
+
+    def compute_target(self, data, rng):
+        raise NotImplementedError
+
+    def train_model(self):
+        X = self.data[self.feature_columns]
+        y = self.data[self.target]
+        self.fit_model(X, y)
+
+    def stored_weather(self, region):
+        """Mean temperature and rainfall of the region's latest day in the feature store, or None"""
+        store = self.feature_store
+        if store is None or not store.exists('weather'):
+            return None
+        date = store.latest_date('weather', region)
+        if date is None:
+            return None
+        weather = store.read_arrays('weather', ['temperature', 'rainfall'], region=region, start=date, end=date)
+        if not len(weather['temperature']):
+            return None
+        return float(weather['temperature'].mean()), float(weather['rainfall'].mean())
 
     def preprocess_input(self, crop_type, region):
         # Encode input
         crop_encoded = self.label_encoder_crop.transform([crop_type])[0]
         region_encoded = self.label_encoder_region.transform([region])[0]
-        
+
+        # Stored weather when there is some for the region, simulated otherwise
+        weather = self.stored_weather(region)
+        if weather is None:
+            weather = (
+                self.input_rng.normal(25, 5),  # Simulated temperature
+                self.input_rng.normal(150, 30)  # Simulated rainfall
+            )
+
         # Create feature array
         X = np.array([[
             crop_encoded,
             region_encoded,
-            np.random.normal(25, 5),  # Simulated temperature
-            np.random.normal(150, 30),  # Simulated rainfall
-            np.random.normal(7, 1)  # Simulated soil quality
+            *weather,
+            self.input_rng.normal(7, 1)  # Simulated soil quality
         ]])
-        
+
         return X
 
-class YieldPredictor(BasePredictor):
-    def train_model(self):
-        # Generate yield data (tons per hectare)
-        base_yields = {
-            'wheat': 3.0,
-            'rice': 4.0,
-            'corn': 5.5,
-            'soybeans': 2.8,
-            'cotton': 2.0
+    def use_compact(self, n_rows):
+        return self.compact_model is not None and n_rows <= self.compact_max_rows
+
+    def predict_rows(self, X):
+        """Predict a feature matrix in feature_columns order"""
+        if self.use_compact(len(X)):
+            return self.compact_model.predict(X)
+        return self.model.predict(X)
+
+    def predict_batch(self, crop_types, regions, temperature, rainfall, soil_quality):
+        """Predict many scenarios in one call; returns a non-negative array"""
+        columns = {
+            'crop_type_encoded': self.label_encoder_crop.transform(crop_types),
+            'region_encoded': self.label_encoder_region.transform(regions),
+            'temperature': np.asarray(temperature, dtype=np.float64),
+            'rainfall': np.asarray(rainfall, dtype=np.float64),
+            'soil_quality': np.asarray(soil_quality, dtype=np.float64)
         }
-        
+        if self.use_compact(len(columns['temperature'])):
+            return np.maximum(0, self.compact_model.predict(np.column_stack([columns[c] for c in self.feature_columns])))
+        X = pd.DataFrame(columns, columns=self.feature_columns)
+        return np.maximum(0, self.model.predict(X))
+
+class YieldPredictor(BasePredictor):
+    model_name = 'yield'
+    model_params = {}
+    target = 'yield'
+
+    # Base yield (tons per hectare)
+    base_yields = {
+        'wheat': 3.0,
+        'rice': 4.0,
+        'corn': 5.5,
+        'soybeans': 2.8,
+        'cotton': 2.0
+    }
+
+    def build_model(self):
+        return LinearRegression(**self.model_params)
+
+    def compute_target(self, data, rng):
         # Calculate yield based on conditions and base yield
-        self.data['yield'] = self.data.apply(
-            lambda row: base_yields[row['crop_type']] * 
-            (1 + 0.1 * (row['temperature'] - 25) / 5) *
-            (1 + 0.2 * (row['rainfall'] - 150) / 30) *
-            (1 + 0.15 * (row['soil_quality'] - 7)), axis=1
+        base = np.array([self.base_yields[c] for c in self.label_encoder_crop.classes_])
+        return (
+            base[data['crop_type_encoded'].to_numpy()] *
+            (1 + 0.1 * (data['temperature'].to_numpy() - 25) / 5) *
+            (1 + 0.2 * (data['rainfall'].to_numpy() - 150) / 30) *
+            (1 + 0.15 * (data['soil_quality'].to_numpy() - 7))
         )
-        
-        # Train linear regression model
-        X = self.data[['crop_type_encoded', 'region_encoded', 'temperature', 'rainfall', 'soil_quality']]
-        y = self.data['yield']
-        self.model = LinearRegression()
-        self.model.fit(X, y)
 
     def predict(self, crop_type, region):
         X = self.preprocess_input(crop_type, region)
-        return max(0, self.model.predict(X)[0])
+        return max(0, self.predict_rows(X)[0])
 
 class DemandPredictor(BasePredictor):
-    def train_model(self):
-        # Generate demand data (tons)
-        base_demand = {
-            'wheat': 1000,
-            'rice': 1200,
-            'corn': 1500,
-            'soybeans': 800,
-            'cotton': 600
-        }
-        
+    model_name = 'demand'
+    model_params = {'n_estimators': 100, 'random_state': 42}
+    target = 'demand'
+    compact = True
+
+    # Base demand (tons)
+    base_demand = {
+        'wheat': 1000,
+        'rice': 1200,
+        'corn': 1500,
+        'soybeans': 800,
+        'cotton': 600
+    }
+    high_demand_regions = ['central', 'north']
+
+    def build_model(self):
+        return RandomForestRegressor(**self.model_params)
+
+    def compute_target(self, data, rng):
         # Calculate demand based on conditions and base demand
-        self.data['demand'] = self.data.apply(
-            lambda row: base_demand[row['crop_type']] * 
-            (1 + 0.2 * np.random.randn()) *  # Random market fluctuation
-            (1 + 0.1 * (row['temperature'] - 25) / 5) *  # Temperature effect
-            (1.2 if row['region'] in ['central', 'north'] else 1.0),  # Region effect
-            axis=1
+        base = np.array([self.base_demand[c] for c in self.label_encoder_crop.classes_], dtype=np.float64)
+        region_effect = np.where(np.isin(self.label_encoder_region.classes_, self.high_demand_regions), 1.2, 1.0)
+        return (
+            base[data['crop_type_encoded'].to_numpy()] *
+            (1 + 0.2 * rng.standard_normal(len(data))) *  # Random market fluctuation
+            (1 + 0.1 * (data['temperature'].to_numpy() - 25) / 5) *  # Temperature effect
+            region_effect[data['region_encoded'].to_numpy()]  # Region effect
         )
-        
-        # Train random forest model
-        X = self.data[['crop_type_encoded', 'region_encoded', 'temperature', 'rainfall', 'soil_quality']]
-        y = self.data['demand']
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.model.fit(X, y)
 
     def predict(self, crop_type, region):
         X = self.preprocess_input(crop_type, region)
-        return max(0, self.model.predict(X)[0])
\ No newline at end of file
+        return max(0, self.predict_rows(X)[0])
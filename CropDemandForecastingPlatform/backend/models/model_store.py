@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent / 'store'
+
+class ModelStore:
+    """
+    Versioned on-disk store for fitted predictor artifacts.
+
+    Each version lives in ``<root>/<name>/<fingerprint[:16]>/`` and holds the
+    fitted model, the crop/region label encoders and a ``metadata.json`` with
+    the full training fingerprint. Versions are written to a temporary
+    directory and renamed into place, so concurrent workers never observe a
+    half-written artifact.
+    """
+
+    ARTIFACTS = ('model', 'label_encoder_crop', 'label_encoder_region')
+    # Saved when provided, loaded when present; older versions lack them
+    OPTIONAL_ARTIFACTS = ('compact_model',)
+
+    def __init__(self, root: Optional[str] = None, mmap_mode: Optional[str] = 'r'):
+        self.root = Path(root or os.environ.get('CROP_MODEL_STORE', DEFAULT_STORE_DIR))
+        self.mmap_mode = mmap_mode
+
+    @staticmethod
+    def fingerprint(X: pd.DataFrame, y, model_class: str, model_params: Dict[str, Any]) -> str:
+        """
+        Hash the training matrix, target and hyperparameters
+        """
+        digest = hashlib.sha256()
+        header = {
+            'model_class': model_class,
+            'model_params': model_params,
+            'columns': list(X.columns),
+            'sklearn_version': sklearn.__version__,
+        }
+        digest.update(json.dumps(header, sort_keys=True).encode('utf-8'))
+        digest.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+        digest.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+        return digest.hexdigest()
+
+    def version_dir(self, name: str, fingerprint: str) -> Path:
+        return self.root / name / fingerprint[:16]
+
+    def load(self, name: str, fingerprint: str, skip: Tuple[str, ...] = ()) -> Optional[Dict[str, Any]]:
+        """
+        Load the artifacts stored for a fingerprint, or None if absent; ``skip`` leaves artifacts for load_artifact
+        """
+        path = self.version_dir(name, fingerprint)
+        metadata_path = path / 'metadata.json'
+        if not metadata_path.exists():
+            return None
+
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        if metadata.get('fingerprint') != fingerprint:
+            return None
+
+        artifacts = {
+            key: joblib.load(path / f'{key}.joblib', mmap_mode=self.mmap_mode)
+            for key in self.ARTIFACTS + self.OPTIONAL_ARTIFACTS
+            if key not in skip and (key in self.ARTIFACTS or (path / f'{key}.joblib').exists())
+        }
+        artifacts['metadata'] = metadata
+        return artifacts
+
+    def load_artifact(self, name: str, fingerprint: str, key: str) -> Any:
+        return joblib.load(self.version_dir(name, fingerprint) / f'{key}.joblib', mmap_mode=self.mmap_mode)
+
+    def save(self, name: str, fingerprint: str, artifacts: Dict[str, Any],
+             metadata: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        Persist a fitted model and its encoders under a new version
+        """
+        final_path = self.version_dir(name, fingerprint)
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = Path(tempfile.mkdtemp(prefix=f'.{final_path.name}-', dir=final_path.parent))
+        try:
+            for key in self.ARTIFACTS:
+                joblib.dump(artifacts[key], tmp_path / f'{key}.joblib')
+            for key in self.OPTIONAL_ARTIFACTS:
+                if artifacts.get(key) is not None:
+                    joblib.dump(artifacts[key], tmp_path / f'{key}.joblib')
+            with open(tmp_path / 'metadata.json', 'w') as f:
+                json.dump({
+                    'name': name,
+                    'fingerprint': fingerprint,
+                    'created_at': time.time(),
+                    **(metadata or {})
+                }, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, final_path)
+        except OSError:
+            # Another worker published the same version first
+            if not (final_path / 'metadata.json').exists():
+                raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        return final_path
@@ -1,10 +1,30 @@
-import requests
-from typing import Dict, Any
+import asyncio
+import os
+from typing import Dict, Any, Iterable, List
+from datetime import date, timedelta
+from api.weather_cache import WeatherCache
+from api.weather_client import ingest_forecasts
+from api.weather_stub_server import simulated_day
 
 class WeatherAPI:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, base_url: str = None):
         self.api_key = api_key
-        self.base_url = "https://api.example.com/weather"  # Replace with actual weather API
+        # Point WEATHER_API_URL at the real service or at api.weather_stub_server
+        self.base_url = base_url or os.environ.get('WEATHER_API_URL', "https://api.example.com/weather")
+        self.history_cache = WeatherCache(self.fetch_history_range)
+
+    def fetch_history_range(self, region: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        Daily readings for a region between two dates (inclusive)
+        """
+        # Simulated, but stable per region and day so cached days stay valid
+        return [simulated_day(region, start + timedelta(days=i)) for i in range((end - start).days + 1)]
+
+    def refresh_forecasts(self, db, regions: Iterable[str], days: int = 7, **client_options) -> Dict[str, Any]:
+        """
+        Fetch forecasts for many regions concurrently and bulk insert them into weather_history
+        """
+        return asyncio.run(ingest_forecasts(db, self.base_url, regions, days, api_key=self.api_key, **client_options))
 
     def get_weather_forecast(self, region: str, days: int = 7) -> Dict[str, Any]:
         """
@@ -31,19 +51,11 @@ class WeatherAPI:
         """
         Get historical weather data for a specific region
         """
-        # Simulated historical data for demo purposes
-        import random
-        
-        history = []
-        for _ in range(days_back):
-            history.append({
-                "temperature": random.uniform(15, 35),
-                "rainfall": random.uniform(0, 100),
-                "humidity": random.uniform(30, 90),
-                "soil_moisture": random.uniform(20, 60)
-            })
+        # Only days after the last cached one are fetched; aggregates are kept up to date incrementally
+        history, aggregates = self.history_cache.history(region, days_back)
         
         return {
             "region": region,
-            "history": history
+            "history": history,
+            "aggregates": aggregates
         }
\ No newline at end of file
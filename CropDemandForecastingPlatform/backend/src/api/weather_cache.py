@@ -0,0 +1,151 @@
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+from collections import OrderedDict, deque
+from datetime import date, timedelta
+import threading
+
+# fetch(region, start, end) -> daily readings with an ISO 'date' key, both ends inclusive
+FetchRange = Callable[[str, date, date], List[Dict[str, Any]]]
+
+class RollingWindow:
+    """
+    Running sum over the last ``size`` values; each push is O(1)
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values: deque = deque()
+        self.total = 0.0
+
+    def push(self, value: float):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / len(self.values) if self.values else None
+
+class RegionWeather:
+    """
+    Cached daily readings for one region plus incrementally maintained aggregates
+    """
+
+    def __init__(self, windows: Sequence[int], max_days: int):
+        self.windows = tuple(windows)
+        self.max_days = max_days
+        self.days: 'OrderedDict[date, Dict[str, Any]]' = OrderedDict()
+        self.temperature = {n: RollingWindow(n) for n in self.windows}
+        self.rainfall = {n: RollingWindow(n) for n in self.windows}
+        self.cumulative_rainfall = 0.0
+
+    @property
+    def first_date(self) -> Optional[date]:
+        return next(iter(self.days)) if self.days else None
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return next(reversed(self.days)) if self.days else None
+
+    def append(self, reading: Dict[str, Any]):
+        day = date.fromisoformat(reading['date'])
+        if self.days and day <= self.last_date:
+            return
+        self.days[day] = reading
+        while len(self.days) > self.max_days:
+            self.days.popitem(last=False)
+        temperature = reading.get('temperature') or 0.0
+        rainfall = reading.get('rainfall') or 0.0
+        for n in self.windows:
+            self.temperature[n].push(temperature)
+            self.rainfall[n].push(rainfall)
+        self.cumulative_rainfall += rainfall
+
+    def aggregates(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {'as_of': self.last_date.isoformat() if self.days else None}
+        for n in self.windows:
+            result[f'temperature_mean_{n}d'] = self.temperature[n].mean
+            result[f'rainfall_total_{n}d'] = self.rainfall[n].total
+        result['cumulative_rainfall'] = self.cumulative_rainfall
+        return result
+
+class WeatherCache:
+    """
+    Incremental per-region cache of daily weather.
+
+    The first request for a region fetches its whole window. Later requests
+    only fetch the days after the last cached one, so a daily refresh costs
+    one day of I/O per region instead of the full window. Rolling aggregates
+    (mean temperature and rainfall totals per window, plus the rainfall of
+    every day appended since the region was last fetched in full, including
+    days since evicted) are updated as days are appended rather than
+    recomputed. Asking for more history than is cached refetches the
+    region's window and rebuilds its aggregates.
+
+    Fetches run outside the cache lock under a per-region lock, so one slow
+    region does not hold up the others and concurrent requests for the same
+    region share a single fetch.
+    """
+
+    def __init__(self, fetch: FetchRange, windows: Sequence[int] = (7, 30), max_days: int = 366,
+                 today: Callable[[], date] = date.today):
+        self.fetch = fetch
+        self.windows = tuple(windows)
+        self.max_days = max(max_days, *self.windows)
+        self.today = today
+        self._regions: Dict[str, RegionWeather] = {}
+        self._lock = threading.Lock()
+        self._region_locks: Dict[str, threading.Lock] = {}
+        self._stats = {'requests': 0, 'fetches': 0, 'days_fetched': 0, 'rebuilds': 0}
+
+    def _fetch(self, region: str, start: date, end: date) -> List[Dict[str, Any]]:
+        readings = sorted(self.fetch(region, start, end), key=lambda r: r['date'])
+        with self._lock:
+            self._stats['fetches'] += 1
+            self._stats['days_fetched'] += len(readings)
+        return readings
+
+    def history(self, region: str, days_back: int = 30) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Daily readings for the ``days_back`` complete days before today, and the region's aggregates
+        """
+        end = self.today() - timedelta(days=1)
+        start = end - timedelta(days=days_back - 1)
+
+        with self._lock:
+            self._stats['requests'] += 1
+            region_lock = self._region_locks.setdefault(region, threading.Lock())
+
+        with region_lock:
+            # Only this thread changes the region's state while it holds region_lock
+            state = self._regions.get(region)
+            if state is None or not state.days or start < state.first_date:
+                rebuilt = RegionWeather(self.windows, max(self.max_days, days_back))
+                for reading in self._fetch(region, start, end):
+                    rebuilt.append(reading)
+                with self._lock:
+                    if state is not None and state.days:
+                        self._stats['rebuilds'] += 1
+                    self._regions[region] = state = rebuilt
+            elif state.last_date < end:
+                readings = self._fetch(region, state.last_date + timedelta(days=1), end)
+                with self._lock:
+                    for reading in readings:
+                        state.append(reading)
+
+            history = []
+            for day, reading in reversed(state.days.items()):
+                if day < start:
+                    break
+                history.append(reading)
+            history.reverse()
+            return history, state.aggregates()
+
+    def aggregates(self, region: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._regions.get(region)
+            return state.aggregates() if state is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'regions': len(self._regions)}
@@ -0,0 +1,222 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+import asyncio
+import json
+import logging
+import random
+import ssl
+import time
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class WeatherAPIError(Exception):
+    """Raised when a weather request fails after all retries"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class HTTPConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to a single host, built on asyncio streams.
+
+    At most ``max_connections`` sockets are open at once; a finished request
+    returns its socket to the idle list unless the server asked to close it.
+    Only what the weather endpoints need is supported: GET requests with
+    Content-Length or chunked JSON responses.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 20, timeout: float = 10.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == 'https' else 80)
+        self.base_path = parts.path.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.connects = 0
+        self.reuses = 0
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reuses += 1
+                return reader, writer
+            writer.close()
+        self.connects += 1
+        ssl_context = ssl.create_default_context() if self.scheme == 'https' else None
+        return await asyncio.open_connection(self.host, self.port, ssl=ssl_context)
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        target = self.base_path + path + (f'?{urlencode(params)}' if params else '')
+        async with self._slots:
+            reader, writer = await self._open()
+            try:
+                status, body, keep_alive = await asyncio.wait_for(self._roundtrip(reader, writer, target), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, body
+
+    async def _roundtrip(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         target: str) -> Tuple[int, bytes, bool]:
+        writer.write(
+            f'GET {target} HTTP/1.1\r\nHost: {self.host}\r\nAccept: application/json\r\n'
+            f'Connection: keep-alive\r\n\r\n'.encode('latin-1')
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed before a response was received')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        else:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+        keep_alive = headers.get('connection', '').lower() != 'close' and status_line.startswith(b'HTTP/1.1')
+        return status, body, keep_alive
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+class AsyncWeatherClient:
+    """
+    Fan-out weather client for many regions.
+
+    Requests share a keep-alive connection pool, at most ``max_concurrency``
+    run at once, failures are retried with exponential backoff and jitter,
+    and concurrent requests for the same (region, days) share one in-flight
+    fetch. Use as an async context manager so pooled sockets are closed.
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, max_connections: int = 20,
+                 max_concurrency: int = 50, retries: int = 3, backoff: float = 0.1, timeout: float = 10.0):
+        self.pool = HTTPConnectionPool(base_url, max_connections=max_connections, timeout=timeout)
+        self.api_key = api_key
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._stats = {'requests': 0, 'retries': 0, 'coalesced': 0, 'failures': 0}
+
+    async def __aenter__(self) -> 'AsyncWeatherClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, 'connects': self.pool.connects, 'reuses': self.pool.reuses}
+
+    async def _request(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self.api_key:
+            params = {**params, 'key': self.api_key}
+        for attempt in range(self.retries + 1):
+            error: Exception
+            try:
+                async with self._semaphore:
+                    self._stats['requests'] += 1
+                    status, body = await self.pool.get(path, params)
+                if status == 200:
+                    return json.loads(body)
+                error = WeatherAPIError(f'Weather API returned {status} for {path}', status)
+                if status not in RETRY_STATUSES:
+                    break
+            except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                error = WeatherAPIError(f'Weather API request failed: {e!r}')
+            if attempt < self.retries:
+                self._stats['retries'] += 1
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+        self._stats['failures'] += 1
+        raise error
+
+    async def fetch_forecast(self, region: str, days: int = 7) -> Dict[str, Any]:
+        key = (region, days)
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._request('/forecast', {'region': region, 'days': days})
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a forecast nobody else awaited does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def fetch_many(self, regions: Iterable[str], days: int = 7) -> Dict[str, Any]:
+        """
+        Fetch forecasts for many regions; failed regions map to their exception
+        """
+        regions = list(regions)
+        results = await asyncio.gather(*(self.fetch_forecast(r, days) for r in regions), return_exceptions=True)
+        return dict(zip(regions, results))
+
+def forecast_records(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flatten a forecast payload into weather_history rows
+    """
+    region = payload['region']
+    return [{'region': region, 'date': day['date'], 'temperature': day.get('temperature'),
+             'rainfall': day.get('rainfall'), 'humidity': day.get('humidity'),
+             'soil_moisture': day.get('soil_moisture')}
+            for day in payload.get('forecast', [])]
+
+async def ingest_forecasts(db, base_url: str, regions: Iterable[str], days: int = 7,
+                           **client_options) -> Dict[str, Any]:
+    """
+    Fetch forecasts for all regions and store them in weather_history in one bulk insert
+    """
+    start = time.perf_counter()
+    async with AsyncWeatherClient(base_url, **client_options) as client:
+        results = await client.fetch_many(regions, days)
+        stats = client.stats()
+
+    records, failed = [], []
+    for region, result in results.items():
+        if isinstance(result, Exception):
+            logging.warning(f'Weather fetch failed for {region}: {result}')
+            failed.append(region)
+        else:
+            records.extend(forecast_records(result))
+
+    inserted = db.store_weather(records) if records else 0
+    return {**stats, 'regions': len(results), 'failed': failed, 'rows': inserted,
+            'seconds': time.perf_counter() - start}
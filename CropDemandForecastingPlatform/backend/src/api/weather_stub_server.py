@@ -0,0 +1,121 @@
+"""
+Local stand-in for the weather service, for offline tests and benchmarks.
+
+Serves ``GET /forecast?region=<r>&days=<n>`` over keep-alive HTTP/1.1 with
+deterministic values per (region, date). ``latency`` adds a per-request
+delay and ``failure_rate`` answers that fraction of requests with 503 so the
+client's retry path can be exercised.
+
+Usage: python -m api.weather_stub_server [--port 8081] [--latency 0.02] [--failure-rate 0.0]
+"""
+from typing import Dict, Any, Optional, Set
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import json
+import random
+import zlib
+
+def simulated_day(region: str, day: date) -> Dict[str, Any]:
+    rng = random.Random(zlib.crc32(f'{region}:{day.isoformat()}'.encode('utf-8')))
+    return {
+        'date': day.isoformat(),
+        'temperature': round(rng.uniform(15, 35), 2),
+        'rainfall': round(rng.uniform(0, 100), 2),
+        'humidity': round(rng.uniform(30, 90), 2),
+        'soil_moisture': round(rng.uniform(20, 60), 2)
+    }
+
+class WeatherStubServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 failure_rate: float = 0.0, start_date: Optional[date] = None, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.start_date = start_date or date.today()
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    async def start(self) -> 'WeatherStubServer':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> 'WeatherStubServer':
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def respond(self, target: str):
+        parts = urlsplit(target)
+        if parts.path != '/forecast':
+            return 404, {'error': 'not found'}
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            return 503, {'error': 'temporarily unavailable'}
+        query = parse_qs(parts.query)
+        region = query.get('region', [''])[0]
+        if not region:
+            return 400, {'error': 'region is required'}
+        days = int(query.get('days', ['7'])[0])
+        forecast = [simulated_day(region, self.start_date + timedelta(days=i)) for i in range(days)]
+        return 200, {'region': region, 'forecast': forecast}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                status, payload = self.respond(request_line.split()[1].decode('latin-1'))
+                body = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\n'
+                    f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+                    f'Connection: keep-alive\r\n\r\n'.encode('latin-1') + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+async def serve(port: int, latency: float, failure_rate: float):
+    async with WeatherStubServer(port=port, latency=latency, failure_rate=failure_rate) as server:
+        print(f'Weather stub server listening on {server.base_url}')
+        await asyncio.Event().wait()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.latency, args.failure_rate))
@@ -1,10 +1,28 @@
-from flask import Flask, request, jsonify, send_from_directory, make_response
+from flask import Flask, request, jsonify, send_file, send_from_directory, Response, g
 from flask_cors import CORS
+from concurrent.futures import TimeoutError as VerificationTimeout
 import os
+import calendar
+import importlib
+import json
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 import logging
+from core.auth import AuthBusy, SessionCache
 from core.database import Database
+from core.feature_store import FeatureStore
+from core.forecasting import get_crop_forecast
+from core.jobs import JobManager, JobNotFound, TERMINAL_STATUSES
+from core.metrics import SamplingProfiler, metrics
+from core.model_registry import ModelRegistry, DEFAULT_KEY
+from core.recommendation_engine import RecommendationEngine
+from core.result_cache import cache_from_env, cache_key
+from core.seasonal import SeasonalForecaster, SeasonalUnavailable
+from core.sensor_ingestion import SensorBackpressure, SensorIngestor, parse_lines
+from core.static_assets import StaticAssets
+from core.training import ModelUpdater
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,48 +33,196 @@ FRONTEND_DIR = Path(__file__).resolve().parent.parent.parent / 'frontend' / 'pub
 app = Flask(__name__, static_folder=str(FRONTEND_DIR))
 CORS(app)  # Enable CORS for all routes
 
-# Initialize database
+# Fingerprinted, precompressed pages and assets from `python -m core.static_assets`; without a
+# build the files under frontend/public are sent as they are. USE_X_SENDFILE=1 hands file bodies
+# to a front proxy that supports X-Sendfile instead of sending them from Python.
+static_assets = StaticAssets()
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '0') == '1'
+
+# Initialize database; the file and schema are set up on first use or by warmup()
 db = Database()
 
-print("Starting Flask server...")
-print(f"Frontend directory: {FRONTEND_DIR}")
+# Verified logins get a short-lived token so API calls skip PBKDF2
+session_cache = SessionCache(
+    ttl=float(os.environ.get('SESSION_TTL_SECONDS', 900)),
+    max_entries=int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+)
+
+# Upper bound on scenarios accepted by /api/forecast/batch
+MAX_BATCH_SIZE = int(os.environ.get('FORECAST_BATCH_LIMIT', 1000))
+
+# Every published crop/region model is loaded once for the life of the process, by warmup() or on first lookup
+model_registry = ModelRegistry()
+
+# Seasonal price, yield and demand models of every crop/region, loaded from their cache or fitted
+# from the history on first use; they forecast unmodelled pairs and set peak months and trends
+seasonal_forecaster = SeasonalForecaster()
+recommendation_engine = RecommendationEngine(seasonal_forecaster)
+
+# New yield observations are folded into the published and seasonal models in the background; 0 disables the thread
+model_updater = ModelUpdater(db, model_registry, interval=float(os.environ.get('MODEL_UPDATE_INTERVAL', 300)),
+                             seasonal=seasonal_forecaster)
+
+# Latest weather and prices fill in features a request leaves out
+feature_store = FeatureStore()
+
+# Identical crop/region/feature/model-version requests reuse the formatted response
+forecast_cache = cache_from_env()
+
+# Scenario sweeps run on a worker process pool; results are persisted for paging
+job_manager = JobManager(
+    db,
+    chunk_size=int(os.environ.get('JOB_CHUNK_SIZE', 2000)),
+    max_scenarios=int(os.environ.get('JOB_MAX_SCENARIOS', 100000))
+)
+# Seconds a progress stream stays open without the job changing
+JOB_STREAM_TIMEOUT = float(os.environ.get('JOB_STREAM_TIMEOUT', 600))
+
+# Live IoT readings; their latest window means override stored humidity and soil moisture
+sensor_ingestor = SensorIngestor(
+    db,
+    batch_size=int(os.environ.get('SENSOR_BATCH_SIZE', 5000)),
+    max_pending=int(os.environ.get('SENSOR_MAX_PENDING', 100000))
+)
+
+# Component stats are exported as gauges next to the stage histograms at /api/metrics
+metrics.register_stats('db_pool', db.pool_stats)
+metrics.register_stats('auth', db.verifier.stats)
+metrics.register_stats('forecast_cache', forecast_cache.stats)
+metrics.register_stats('sensor_ingestion', sensor_ingestor.stats)
+metrics.register_stats('model_updates', model_updater.stats)
+metrics.register_stats('seasonal', seasonal_forecaster.stats)
+
+# Requests may ask for a sampling profile (X-Profile: 1 or ?profile=1) only when this is set
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 1)) / 1000
+
+# When models, the schema and the ML libraries are loaded:
+#   eager      - while this module is imported; with a server that imports the app before forking
+#                workers (gunicorn --preload), the workers share the loaded pages copy-on-write
+#   background - in a thread, while requests that do not need them are already served
+#   off        - on first use
+APP_WARMUP = os.environ.get('APP_WARMUP', 'background')
+startup_stats = {'warm': False, 'warmup_seconds': 0.0}
+metrics.register_stats('startup', lambda: dict(startup_stats))
+
+_services_lock = threading.Lock()
+_services_started = False
+
+def warmup():
+    """
+    Load everything a forecast needs ahead of the first forecast request. Starts
+    no threads, and pooled connections are reopened after a fork, so it can run
+    in a parent process before workers are forked.
+    """
+    start = time.perf_counter()
+    for module in ('pandas', 'joblib', 'sklearn.ensemble', 'core.incremental'):
+        importlib.import_module(module)
+    db.prepare()
+    job_manager.prepare()
+    model_updater.prepare()
+    model_registry.ensure_loaded()
+    recommendation_engine.refresh_conditions()
+    entry = model_registry.resolve(*DEFAULT_KEY)
+    if entry is not None:
+        # The first predict imports and initialises more of sklearn
+        entry.forecaster.get_forecast({})
+    startup_stats['warmup_seconds'] = time.perf_counter() - start
+    startup_stats['warm'] = True
+    logging.info(f"Warmed up in {startup_stats['warmup_seconds'] * 1000:.0f} ms")
+
+def start_services():
+    """
+    Start background threads in the serving process; runs on its first request, after any fork
+    """
+    global _services_started
+    with _services_lock:
+        if _services_started:
+            return
+        _services_started = True
+    model_updater.prepare()
+    if model_updater.interval > 0:
+        model_updater.start()
+
+def send_static(path: str, source_dir: Path, filename: str, cache_control: str = None):
+    """
+    Send a built file in the encoding the client prefers, or the source file when it is not in the build.
+    Bodies go out through the WSGI server's file wrapper (sendfile where supported), not through Python.
+    """
+    variant = static_assets.select(path, request.headers.get('Accept-Encoding'))
+    if variant is None:
+        response = send_from_directory(str(source_dir), filename)
+    else:
+        # ETag/If-None-Match and Range are handled by send_file
+        try:
+            response = send_file(variant.path, mimetype=variant.content_type, etag=variant.etag, conditional=True)
+        except FileNotFoundError:
+            # A rebuild replaced the files since the manifest was last read
+            if not static_assets.refresh():
+                raise
+            return send_static(path, source_dir, filename, cache_control)
+        response.headers['Cache-Control'] = variant.cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+        if variant.encoding and response.status_code != 304:
+            response.headers['Content-Encoding'] = variant.encoding
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
 
 # Route handlers for static pages
 @app.route('/')
 @app.route('/index.html')
 def serve_index():
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_static('index.html', FRONTEND_DIR, 'index.html')
 
 @app.route('/welcome')
 @app.route('/welcome.html')
 def serve_welcome():
-    response = make_response(send_from_directory(app.static_folder, 'welcome.html'))
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    return response
+    return send_static('welcome.html', FRONTEND_DIR, 'welcome.html',
+                       cache_control='no-store, no-cache, must-revalidate, max-age=0')
 
 @app.route('/dashboard')
 @app.route('/dashboard.html')
 def serve_dashboard():
-    return send_from_directory(app.static_folder, 'dashboard.html')
+    return send_static('dashboard.html', FRONTEND_DIR, 'dashboard.html')
 
-# Static asset routes
-@app.route('/assets/css/<path:filename>')
-def serve_css(filename):
-    return send_from_directory(str(FRONTEND_DIR / 'assets' / 'css'), filename)
-
-@app.route('/assets/images/<path:filename>')
-def serve_images(filename):
-    return send_from_directory(str(FRONTEND_DIR / 'assets' / 'images'), filename)
+# Static asset routes; fingerprinted names from the build are cached as immutable
+@app.route('/assets/<path:filename>')
+def serve_assets(filename):
+    return send_static(f'assets/{filename}', FRONTEND_DIR / 'assets', filename)
 
 @app.route('/js/<path:filename>')
 def serve_javascript(filename):
-    return send_from_directory(str(FRONTEND_DIR / 'js'), filename)
+    return send_static(f'js/{filename}', FRONTEND_DIR / 'js', filename)
 
 @app.route('/src/<path:path>')
 def serve_src(path):
     return send_from_directory(str(Path(FRONTEND_DIR).parent / 'src'), path)
 
 # Error handlers
+@app.before_request
+def start_request_instrumentation():
+    if not _services_started:
+        start_services()
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+    if PROFILING_ENABLED and '1' in (request.headers.get('X-Profile'), request.args.get('profile')):
+        g.profiler = SamplingProfiler(interval=PROFILE_INTERVAL).start()
+
+@app.after_request
+def finish_request_instrumentation(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profile_id = metrics.add_profile(profiler.stop().to_dict(), method=request.method, path=request.path,
+                                         status=response.status_code)
+        response.headers['X-Profile-Id'] = str(profile_id)
+    start = g.pop('request_start', None)
+    if start is not None:
+        metrics.observe('http_request_seconds', time.perf_counter() - start, 'Request handling time by endpoint',
+                        endpoint=request.endpoint or 'unmatched', method=request.method,
+                        status=response.status_code)
+    return response
+
 @app.errorhandler(404)
 def not_found_error(error):
     return jsonify({'error': 'The requested URL was not found on the server.'}), 404
@@ -65,6 +231,19 @@ def not_found_error(error):
 def internal_error(error):
     return jsonify({'error': 'An internal server error occurred.'}), 500
 
+def session_error(required: bool = False):
+    """
+    Validate the bearer token; returns an error response for unknown or expired tokens,
+    or for a missing one when the endpoint requires a session
+    """
+    header = request.headers.get('Authorization', '')
+    if not header:
+        return (jsonify({'error': 'Authentication required'}), 401) if required else None
+    token = header[7:] if header.startswith('Bearer ') else ''
+    if not token or session_cache.get(token) is None:
+        return jsonify({'error': 'Invalid or expired session token'}), 401
+    return None
+
 @app.route('/api/login', methods=['POST'])
 def login():
     try:
@@ -74,14 +253,17 @@ def login():
         if not data or 'email' not in data or 'password' not in data:
             return jsonify({'error': 'Email and password are required'}), 400
 
-        # For testing, check hardcoded credentials
-        if data['email'] == 'mahesha@gmail.com' and data['password'] == 'm@123':
+        # Verification runs on the password worker pool; fail fast when it is saturated
+        user = db.authenticate(data['email'], data['password'])
+        if user:
             logging.info("Login successful")
             response = jsonify({
                 'success': True,
+                'token': session_cache.issue(user),
+                'expires_in': int(session_cache.ttl),
                 'user': {
-                    'email': data['email'],
-                    'name': 'Mahesh'
+                    'email': user['email'],
+                    'name': user['name']
                 }
             })
             response.headers.add('Access-Control-Allow-Origin', '*')
@@ -89,14 +271,267 @@ def login():
         
         logging.info("Login failed - invalid credentials")
         return jsonify({'error': 'Invalid email or password'}), 401
+    except (AuthBusy, VerificationTimeout) as e:
+        reason = 'verification queue full' if isinstance(e, AuthBusy) else 'verification timed out'
+        logging.warning(f"Login rejected, {reason}: {str(e)}")
+        response = jsonify({'error': 'Server busy, please retry shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
     except Exception as e:
         logging.error(f"Login error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def format_forecast_response(crop_type: str, predicted_yield: float, predicted_demand: float,
+                             model_version: str = None, prediction: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Attach recommendations to a yield/demand prediction. With the model's prediction, its
+    intervals are included and the confidence level follows from their width.
+    """
+    prediction = prediction or {}
+    confidence = prediction.get('confidence')
+    recommendations = recommendation_engine.get_recommendation(crop_type, predicted_yield, predicted_demand)
+    planting = recommendations['planting_recommendation']
+    selling = recommendations['selling_strategy']
+    distribution = recommendations['distribution_strategy']
+
+    if confidence is None:
+        confidence = planting['confidence']
+
+    return {
+        'yield': predicted_yield,
+        'demand': predicted_demand,
+        'yield_interval': prediction.get('yield_interval'),
+        'demand_interval': prediction.get('demand_interval'),
+        'model_version': model_version,
+        'market_insights': ' '.join(recommendations['market_analysis']['market_insights']) or 'Market conditions are stable.',
+        'planting_advice': planting['advice'],
+        'best_regions': planting['best_regions'],
+        'confidence_level': int(round(confidence * 100)),
+        'selling_timing': selling['timing'],
+        'peak_months': [calendar.month_name[m] for m in selling['peak_months']],
+        'storage_advice': selling['storage_duration'],
+        'recommended_markets': distribution['recommended_markets'],
+        'transportation_tips': distribution['transportation_tips']
+    }
+
+def demo_forecast_response(crop_type: str, region: str) -> Dict[str, Any]:
+    # No published model yet; fall back to the seasonal forecast
+    seasonal = get_crop_forecast(crop_type, region, seasonal_forecaster.model())
+    return format_forecast_response(crop_type, seasonal['predicted_yield'], seasonal['predicted_demand'],
+                                    prediction={'confidence': seasonal['confidence_score']})
+
+def build_forecast_response(crop_type: str, region: str, features: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Predict yield and demand with the registered model and attach recommendations
+    """
+    entry = model_registry.resolve(crop_type, region)
+    if entry is None:
+        return demo_forecast_response(crop_type, region)
+
+    with metrics.span('forecast.resolve_features'):
+        live = sensor_ingestor.aggregator.features(region)
+        if not features:
+            stored = entry.forecaster.features_from_store(feature_store, crop_type, region) if feature_store.exists() else {}
+            features = {**stored, **live}
+        elif live:
+            # Explicit request values take precedence over sensor readings
+            features = {**live, **features}
+
+    key = cache_key(crop_type, region, entry.version, features)
+    response = forecast_cache.get(key)
+    if response is None:
+        prediction = entry.forecaster.get_forecast(features)
+        response = format_forecast_response(
+            crop_type, round(prediction['yield'], 2), round(prediction['demand']), entry.version, prediction
+        )
+        forecast_cache.set(key, response)
+    return response
+
+def build_forecast_batch_response(items: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Forecast many crop/region scenarios, calling predict once per resolved model.
+    Cached scenarios are served without predicting. Results keep the input
+    order; invalid items carry an error message.
+    """
+    results: List[Dict[str, Any]] = [None] * len(items)
+    keys: List[str] = [None] * len(items)
+    groups: Dict[Any, Any] = {}
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('crop_type') or not item.get('region'):
+            results[i] = {'error': 'Missing required parameters'}
+            continue
+        entry = model_registry.resolve(item['crop_type'], item['region'])
+        if entry is not None:
+            keys[i] = cache_key(item['crop_type'], item['region'], entry.version, item.get('features') or {})
+            results[i] = forecast_cache.get(keys[i])
+            if results[i] is not None:
+                continue
+        key = (entry.crop_type, entry.region) if entry is not None else None
+        groups.setdefault(key, (entry, []))[1].append(i)
+
+    for entry, indexes in groups.values():
+        if entry is None:
+            for i in indexes:
+                try:
+                    results[i] = demo_forecast_response(items[i]['crop_type'], items[i]['region'])
+                except SeasonalUnavailable as e:
+                    results[i] = {'error': str(e)}
+            continue
+
+        predictions = entry.forecaster.get_forecast_batch([items[i].get('features') or {} for i in indexes])
+        for i, prediction in zip(indexes, predictions):
+            if 'error' in prediction:
+                results[i] = prediction
+            else:
+                results[i] = format_forecast_response(
+                    items[i]['crop_type'], round(prediction['yield'], 2), round(prediction['demand']), entry.version,
+                    prediction
+                )
+                forecast_cache.set(keys[i], results[i])
+
+    return results
+
+@app.route('/api/database/stats', methods=['GET'])
+def database_stats():
+    return jsonify({'pool': db.pool_stats(), 'auth': db.verifier.stats(), 'sessions': len(session_cache)})
+
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    return jsonify({'models': model_registry.stats(), 'updates': model_updater.stats()})
+
+@app.route('/api/models/reload', methods=['POST'])
+def reload_models():
+    error = session_error(required=True)
+    if error:
+        return error
+    swapped = model_registry.refresh()
+    # Stale entries are keyed by the old version and can no longer be hit
+    logging.info(f'Hot-swapped {len(swapped)} model(s)')
+    return jsonify({'swapped': [entry.to_dict() for entry in swapped]})
+
+@app.route('/api/models/update', methods=['POST'])
+def update_models():
+    """
+    Apply newly stored yield observations now instead of waiting for the next background pass
+    """
+    error = session_error(required=True)
+    if error:
+        return error
+    published = model_updater.poll()
+    logging.info(f'Incrementally updated {len(published)} model(s)')
+    return jsonify({'published': published, 'updates': model_updater.stats()})
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Submit a what-if sweep; returns the job immediately with 202
+    """
+    error = session_error()
+    if error:
+        return error
+    try:
+        job = job_manager.submit(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = jsonify(job)
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        return jsonify(job_manager.get(job_id))
+    except JobNotFound:
+        return jsonify({'error': 'Job not found'}), 404
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', 1000, type=int), 10000)
+    try:
+        job = job_manager.get(job_id)
+        results = job_manager.results(job_id, offset, limit)
+    except JobNotFound:
+        return jsonify({'error': 'Job not found'}), 404
+    next_offset = results[-1]['index'] + 1 if len(results) == limit else None
+    return jsonify({'job': job, 'results': results, 'next_offset': next_offset})
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """
+    Server-sent progress events until the job finishes, its owner process is gone
+    or it makes no progress for JOB_STREAM_TIMEOUT seconds
+    """
+    try:
+        job_manager.get(job_id)
+    except JobNotFound:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        last = None
+        deadline = time.monotonic() + JOB_STREAM_TIMEOUT
+        while True:
+            job = job_manager.check(job_id)
+            if job != last:
+                yield f"data: {json.dumps(job)}\n\n"
+                last = job
+                deadline = time.monotonic() + JOB_STREAM_TIMEOUT
+            if job['status'] in TERMINAL_STATUSES:
+                return
+            if time.monotonic() >= deadline:
+                yield f"event: timeout\ndata: {json.dumps(job)}\n\n"
+                return
+            time.sleep(0.5)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/sensors/readings', methods=['POST'])
+def ingest_sensor_readings():
+    """
+    Accept line-delimited JSON sensor readings; they are written to sensor_data in the background
+    """
+    readings, rejected = parse_lines(request.get_data().splitlines())
+    try:
+        accepted = sensor_ingestor.submit(readings)
+    except SensorBackpressure as e:
+        logging.warning(f'Sensor ingestion backlog full: {str(e)}')
+        response = jsonify({'error': 'Sensor ingestion is behind, please retry shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    return jsonify({'accepted': accepted, 'rejected': rejected}), 202
+
+@app.route('/api/sensors/aggregates', methods=['GET'])
+def sensor_aggregates():
+    region = request.args.get('region')
+    regions = [region] if region else sensor_ingestor.aggregator.regions()
+    return jsonify({
+        'windows': {r: sensor_ingestor.aggregator.windows(r) for r in regions},
+        'stats': sensor_ingestor.stats()
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/profiles', methods=['GET'])
+def request_profiles():
+    # Profiles carry request paths and call stacks; keep them to signed-in users
+    error = session_error(required=True)
+    if error:
+        return error
+    return jsonify({'enabled': PROFILING_ENABLED, 'profiles': metrics.profiles()})
+
+@app.route('/api/forecast/cache', methods=['GET'])
+def forecast_cache_stats():
+    return jsonify({'cache': forecast_cache.stats()})
+
 @app.route('/api/forecast', methods=['POST'])
 def forecast():
     try:
         logging.info('Received forecast request')
+        error = session_error()
+        if error:
+            return error
         data = request.get_json()
         
         # Validate input
@@ -113,38 +548,16 @@ def forecast():
             
         logging.info(f'Processing forecast for crop: {crop_type}, region: {region}')
 
-        # Import required modules and classes
-        from core.forecasting import get_crop_forecast
-        from core.recommendation_engine import RecommendationEngine
-
-        # Get forecasting data
-        forecast_data = get_crop_forecast(crop_type, region)
-        
-        # Initialize recommendation engine
-        recommendation_engine = RecommendationEngine()
-        recommendations = recommendation_engine.get_recommendation(crop_type, region, forecast_data)
-
-        # Prepare comprehensive response
-        response = {
-            'yield': forecast_data['predicted_yield'],
-            'demand': forecast_data['predicted_demand'],
-            'market_insights': recommendations['market_analysis'],
-            'planting_advice': recommendations['planting_advice'],
-            'best_regions': recommendations['suitable_regions'],
-            'confidence_level': int(recommendations['confidence_score'] * 100),
-            'selling_timing': recommendations['selling_strategy']['timing_advice'],
-            'peak_months': recommendations['selling_strategy']['peak_months'],
-            'storage_advice': recommendations['selling_strategy']['storage_guidance'],
-            'recommended_markets': recommendations['distribution_strategy']['target_markets'],
-            'transportation_tips': recommendations['distribution_strategy']['logistics_advice']
-        }
+        response = build_forecast_response(crop_type, region, data.get('features') or {})
 
         logging.info('Successfully generated forecast and recommendations')
-        return jsonify(response)
+        with metrics.span('forecast.serialize'):
+            return jsonify(response)
 
-    except ImportError as e:
-        logging.error(f'Failed to import required modules: {str(e)}')
-        return jsonify({'error': 'Internal server configuration error'}), 500
+    except SeasonalUnavailable as e:
+        # Neither a published model nor seasonal history; nothing the client can change
+        logging.warning(f'No forecast available for {crop_type}/{region}: {str(e)}')
+        return jsonify({'error': 'Forecasting is not available yet: no trained or seasonal model'}), 503
     except ValueError as e:
         logging.error(f'Invalid input data: {str(e)}')
         return jsonify({'error': str(e)}), 400
@@ -152,5 +565,37 @@ def forecast():
         logging.error(f'Unexpected error in forecast endpoint: {str(e)}')
         return jsonify({'error': 'An unexpected error occurred'}), 500
 
+@app.route('/api/forecast/batch', methods=['POST'])
+def forecast_batch():
+    try:
+        error = session_error()
+        if error:
+            return error
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else None
+
+        if not isinstance(items, list) or not items:
+            logging.error('Batch forecast request without items')
+            return jsonify({'error': 'A non-empty list of items is required'}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} items are allowed per batch'}), 400
+
+        logging.info(f'Processing batch forecast for {len(items)} items')
+        return jsonify({'results': build_forecast_batch_response(items)})
+
+    except ValueError as e:
+        logging.error(f'Invalid input data: {str(e)}')
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f'Unexpected error in batch forecast endpoint: {str(e)}')
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+
+if APP_WARMUP == 'eager':
+    warmup()
+elif APP_WARMUP == 'background':
+    threading.Thread(target=warmup, name='warmup', daemon=True).start()
+
 if __name__ == '__main__':
+    print("Starting Flask server...")
+    print(f"Frontend directory: {FRONTEND_DIR}")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,138 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+DEFAULT_ALGORITHM = 'pbkdf2_sha512'
+DEFAULT_ITERATIONS = int(os.environ.get('PASSWORD_ITERATIONS', 100000))
+LEGACY_ITERATIONS = 100000
+
+class AuthBusy(Exception):
+    """Raised when the password verification queue is full"""
+
+def hash_password(password: str, iterations: int = DEFAULT_ITERATIONS, salt: Optional[str] = None) -> str:
+    """
+    Hash a password as ``pbkdf2_sha512$<iterations>$<salt>$<hash>``
+    """
+    salt = salt or hashlib.sha256(os.urandom(60)).hexdigest()
+    pwdhash = hashlib.pbkdf2_hmac('sha512', password.encode('utf-8'), salt.encode('ascii'), iterations)
+    pwdhash = hashlib.sha256(pwdhash).hexdigest()
+    return f'{DEFAULT_ALGORITHM}${iterations}${salt}${pwdhash}'
+
+def parse_password_hash(stored_password: str) -> Tuple[int, str, str]:
+    """
+    Split a stored hash into (iterations, salt, hash); bare 128-character
+    hashes from before per-user parameters use the original 100,000 rounds
+    """
+    if '$' in stored_password:
+        algorithm, iterations, salt, pwdhash = stored_password.split('$')
+        if algorithm != DEFAULT_ALGORITHM:
+            raise ValueError(f'Unsupported password hash algorithm: {algorithm}')
+        return int(iterations), salt, pwdhash
+    return LEGACY_ITERATIONS, stored_password[:64], stored_password[64:]
+
+def verify_password(stored_password: str, provided_password: str) -> bool:
+    iterations, salt, expected = parse_password_hash(stored_password)
+    pwdhash = hashlib.pbkdf2_hmac('sha512', provided_password.encode('utf-8'), salt.encode('ascii'), iterations)
+    return hmac.compare_digest(hashlib.sha256(pwdhash).hexdigest(), expected)
+
+def needs_rehash(stored_password: str, iterations: int = DEFAULT_ITERATIONS) -> bool:
+    return '$' not in stored_password or parse_password_hash(stored_password)[0] != iterations
+
+class PasswordVerifier:
+    """
+    Runs PBKDF2 verification on a bounded thread pool.
+
+    ``hashlib.pbkdf2_hmac`` releases the GIL, so worker threads hash in
+    parallel while request threads only wait on a future. Once
+    ``max_pending`` verifications are queued or running, ``submit`` raises
+    ``AuthBusy`` immediately so callers can answer 503 instead of stalling.
+    Other hashing work goes through ``run`` under the same limit.
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        self.max_workers = max_workers or int(os.environ.get('AUTH_WORKERS', min(4, os.cpu_count() or 1)))
+        self.max_pending = max_pending or int(os.environ.get('AUTH_MAX_PENDING', self.max_workers * 8))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='auth')
+        return self._executor
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Run ``fn(*args)`` on the pool, raising AuthBusy when the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise AuthBusy(f'{self._pending} password verifications already queued')
+            self._pending += 1
+            executor = self._get_executor()
+        future = executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def submit(self, stored_password: str, provided_password: str) -> Future:
+        return self.run(verify_password, stored_password, provided_password)
+
+    def verify(self, stored_password: str, provided_password: str, timeout: float = 10.0) -> bool:
+        return self.submit(stored_password, provided_password).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'workers': self.max_workers, 'max_pending': self.max_pending,
+                'pending': self._pending, 'rejected': self.rejected}
+
+class SessionCache:
+    """
+    Short-lived session tokens for already verified users.
+
+    Entries expire after ``ttl`` seconds and the cache holds at most
+    ``max_entries`` tokens, evicting the least recently used one.
+    """
+
+    def __init__(self, ttl: float = 900.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._sessions: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def issue(self, user: Dict[str, Any]) -> str:
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (time.monotonic() + self.ttl, user)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._sessions[token]
+                return None
+            self._sessions.move_to_end(token)
+            return user
+
+    def revoke(self, token: str):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
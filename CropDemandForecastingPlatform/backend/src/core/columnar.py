@@ -0,0 +1,111 @@
+from __future__ import annotations
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from core.startup import lazy_import
+
+pd = lazy_import('pandas')
+
+MANIFEST = 'manifest.json'
+
+class ColumnarWriter:
+    """
+    Append-only writer for a directory of raw, fixed-width column files.
+
+    Numeric columns are stored as flat binary arrays in the declared dtype and
+    categorical columns as integer codes plus a dictionary kept in the
+    manifest. Rows are appended chunk by chunk, so memory stays bounded by the
+    chunk size. The directory is written under a temporary name and renamed
+    into place on close.
+    """
+
+    def __init__(self, path: str, columns: Dict[str, str], categorical: Optional[List[str]] = None,
+                 dictionaries: Optional[Dict[str, List[str]]] = None):
+        self.path = Path(path)
+        self.columns = dict(columns)
+        self.categorical = list(categorical or [])
+        self.dictionaries = {name: list((dictionaries or {}).get(name, [])) for name in self.categorical}
+        self._codes = {name: {value: i for i, value in enumerate(values)} for name, values in self.dictionaries.items()}
+        self.rows = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = Path(tempfile.mkdtemp(prefix=f'.{self.path.name}-', dir=self.path.parent))
+        self._files = {name: open(self._tmp_path / f'{name}.bin', 'wb') for name in self.columns}
+
+    def encode(self, name: str, values: pd.Series) -> np.ndarray:
+        """
+        Map categorical values to dictionary codes, growing the dictionary as needed
+        """
+        codes = self._codes[name]
+        uniques, inverse = np.unique(values.astype(str).to_numpy(), return_inverse=True)
+        for value in uniques:
+            if value not in codes:
+                codes[value] = len(self.dictionaries[name])
+                self.dictionaries[name].append(value)
+        lookup = np.array([codes[value] for value in uniques], dtype=self.columns[name])
+        return lookup[inverse]
+
+    def append(self, df: pd.DataFrame):
+        for name, dtype in self.columns.items():
+            if name in self.categorical:
+                values = self.encode(name, df[name])
+            else:
+                values = np.ascontiguousarray(df[name].to_numpy(), dtype=dtype)
+            values.tofile(self._files[name])
+        self.rows += len(df)
+
+    def close(self, metadata: Optional[Dict[str, Any]] = None) -> Path:
+        for f in self._files.values():
+            f.close()
+        with open(self._tmp_path / MANIFEST, 'w') as f:
+            json.dump({
+                'rows': self.rows,
+                'columns': self.columns,
+                'dictionaries': self.dictionaries,
+                'metadata': metadata or {}
+            }, f, indent=2)
+
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        for f in self._files.values():
+            f.close()
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(Path(path) / MANIFEST, 'r') as f:
+        return json.load(f)
+
+def read_column(path: str, name: str, manifest: Optional[Dict[str, Any]] = None, mmap: bool = True) -> np.ndarray:
+    """
+    Read one column, memory-mapped by default
+    """
+    manifest = manifest or read_manifest(path)
+    dtype = np.dtype(manifest['columns'][name])
+    column_path = Path(path) / f'{name}.bin'
+    if manifest['rows'] == 0:
+        return np.empty(0, dtype=dtype)
+    if mmap:
+        return np.memmap(column_path, dtype=dtype, mode='r', shape=(manifest['rows'],))
+    return np.fromfile(column_path, dtype=dtype)
+
+def read_columns(path: str, columns: Optional[List[str]] = None, mmap: bool = True) -> pd.DataFrame:
+    """
+    Read a columnar directory as a DataFrame; categorical columns are decoded as pd.Categorical
+    """
+    manifest = read_manifest(path)
+    data = {}
+    for name in columns or list(manifest['columns']):
+        values = read_column(path, name, manifest, mmap=mmap)
+        if name in manifest['dictionaries']:
+            data[name] = pd.Categorical.from_codes(np.asarray(values), manifest['dictionaries'][name])
+        else:
+            data[name] = values
+    return pd.DataFrame(data)
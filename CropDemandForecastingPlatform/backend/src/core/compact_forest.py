@@ -0,0 +1,132 @@
+import numpy as np
+
+class CompactForest:
+    """
+    Inference-only copy of a fitted single-output regression forest.
+
+    The nodes of all trees are packed into shared arrays: ``feature``
+    (int16, -1 at leaves), ``threshold`` (float32), ``children`` holding the
+    left and right child of each node side by side (int32; a leaf's children
+    are itself) and ``value`` (float32 leaf means); ``roots`` holds each
+    tree's first node. ``predict`` walks every (tree, row) pair down one
+    level per step as one vectorized operation. Pairs that reached a leaf are
+    dropped from the working set once they make up half of it.
+
+    sklearn compares float32 inputs against float64 thresholds. Thresholds
+    here are rounded down to the nearest float32, which gives the same branch
+    for every float32 input, so each row reaches the same leaves as in
+    sklearn. Only the float32 leaf values differ. Predictions therefore
+    match ``RandomForestRegressor.predict`` within a relative error of
+    ``RTOL``. Inputs with missing values are rejected.
+    """
+
+    RTOL = 1e-6
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, n_features_in: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.n_features_in = n_features_in
+
+    @classmethod
+    def from_forest(cls, forest) -> 'CompactForest':
+        """
+        Flatten a fitted RandomForestRegressor (or any forest of sklearn regression trees)
+        """
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compacted")
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+
+        feature, threshold, children, value = [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            is_leaf = tree.children_left < 0
+            feature.append(np.where(is_leaf, -1, tree.feature))
+            # Largest float32 not above the float64 threshold keeps float32 comparisons exact
+            rounded = tree.threshold.astype(np.float32)
+            rounded = np.where(rounded > tree.threshold, np.nextafter(rounded, np.float32(-np.inf)), rounded)
+            threshold.append(np.where(is_leaf, 0, rounded))
+            # Leaves are their own children, so pairs that reached one can keep stepping in place
+            own = np.arange(tree.node_count) + offset
+            children.append(np.where(is_leaf[:, None], own[:, None],
+                                     np.column_stack([tree.children_left, tree.children_right]) + offset))
+            value.append(tree.value[:, 0, 0])
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int16 if forest.n_features_in_ < 2 ** 15 else np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(value).astype(np.float32),
+            roots=offsets[:-1].astype(np.int32),
+            n_features_in=int(forest.n_features_in_)
+        )
+
+    @property
+    def left(self) -> np.ndarray:
+        return self.children[:, 0]
+
+    @property
+    def right(self) -> np.ndarray:
+        return self.children[:, 1]
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.value)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.value, self.roots))
+
+    def _validate(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in:
+            raise ValueError(f"Expected a 2D input with {self.n_features_in} features")
+        if np.isnan(X).any():
+            raise ValueError("Input contains missing values")
+        return X
+
+    def apply(self, X) -> np.ndarray:
+        """
+        Leaf node reached in every tree, as an n_trees x n_rows array of global node indices
+        """
+        X = self._validate(X)
+        n_rows = len(X)
+        leaves = np.empty(self.n_trees * n_rows, dtype=np.int32)
+        # Pairs still descending: their node, offset of their row in X and slot in ``leaves``
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.int32) * self.n_features_in, self.n_trees)
+        slot = np.arange(len(node), dtype=np.int32)
+        feature = self.feature[node]
+        flat_X = X.reshape(-1)
+        children = self.children.reshape(-1)
+        while node.size:
+            at_leaf = feature < 0
+            finished = np.count_nonzero(at_leaf)
+            if finished == len(node) or finished * 2 >= len(node):
+                leaves[slot[at_leaf]] = node[at_leaf]
+                descending = ~at_leaf
+                node, row_offset, slot = node[descending], row_offset[descending], slot[descending]
+                feature = feature[descending]
+                if not node.size:
+                    break
+            # Leaves index a neighbouring value with feature -1 and step onto themselves
+            go_right = flat_X[row_offset + feature] > self.threshold[node]
+            node = children[2 * node + go_right]
+            feature = self.feature[node]
+        return leaves.reshape(self.n_trees, n_rows)
+
+    def predict_trees(self, X) -> np.ndarray:
+        """
+        Every tree's prediction, as an n_trees x n_rows float32 array
+        """
+        return self.value[self.apply(X)]
+
+    def predict(self, X) -> np.ndarray:
+        return self.predict_trees(X).mean(axis=0, dtype=np.float64)
@@ -1,29 +1,432 @@
+from __future__ import annotations
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
-import hashlib
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+import logging
 import os
+import threading
+import time
+import weakref
+import numpy as np
+from core import auth
+from core.metrics import metrics
+from core.startup import lazy_import
+
+pd = lazy_import('pandas')
+
+# Per-connection settings for bulk loads and range scans
+PRAGMAS = (
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA foreign_keys = ON',
+)
+
+# CSV file -> (table, {csv column: table column}, has crop column)
+HISTORICAL_IMPORTS = {
+    'weather_history.csv': ('weather_history', {'temperature': 'temperature', 'rainfall': 'rainfall',
+                                                'humidity': 'humidity'}, False),
+    'crop_yields.csv': ('crop_yields', {'yield': 'yield_amount', 'demand': 'demand'}, True),
+    'market_prices.csv': ('market_prices', {'price': 'price_per_ton'}, True),
+}
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free in time"""
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections shared by the threads of one process.
+
+    ``connection()`` is a re-entrant context manager: nested use on the same
+    thread returns the connection already checked out. Idle connections are
+    kept per thread where possible (a thread gets back the connection it used
+    last), so each thread's statement cache stays warm. Any transaction left
+    open is rolled back on release. After a fork the child drops the parent's
+    connections and starts a fresh pool with its own lock, since a lock held
+    by another parent thread at fork time would never be released there.
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection], max_size: int = 8, timeout: float = 5.0):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            pool = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: pool() is not None and pool()._reset())
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._idle: List[sqlite3.Connection] = []
+        self._size = 0
+        self._local = threading.local()
+        self._stats = {'checkouts': 0, 'connects': 0, 'affinity_hits': 0, 'waits': 0,
+                       'wait_seconds': 0.0, 'timeouts': 0}
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._cond:
+            self._stats['checkouts'] += 1
+
+            preferred = getattr(self._local, 'last', None)
+            if preferred is not None and preferred in self._idle:
+                self._idle.remove(preferred)
+                self._stats['affinity_hits'] += 1
+                return preferred
+
+            if not self._idle and self._size >= self.max_size:
+                self._stats['waits'] += 1
+                start = time.perf_counter()
+                deadline = start + self.timeout
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._stats['wait_seconds'] += time.perf_counter() - start
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                    self._cond.wait(remaining)
+                self._stats['wait_seconds'] += time.perf_counter() - start
+
+            if self._idle:
+                return self._idle.pop()
+            self._size += 1
+            self._stats['connects'] += 1
+
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: sqlite3.Connection, pid: int):
+        if pid != self._pid:
+            # Checked out before a fork; it belongs to the parent's pool
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection; drop it instead of returning it to the pool
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held = getattr(self._local, 'held', None)
+        if held is not None:
+            yield held
+            return
+
+        pid = self._pid
+        conn = self._acquire()
+        self._local.held, self._local.last = conn, conn
+        try:
+            yield conn
+        finally:
+            self._local.held = None
+            self._release(conn, pid)
+
+    def close_all(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, 'size': self._size, 'idle': len(self._idle),
+                    'in_use': self._size - len(self._idle), 'max_size': self.max_size}
 
 class Database:
-    def __init__(self):
+    def __init__(self, db_path: Optional[str] = None, schema_path: Optional[str] = None,
+                 pool_size: int = None, pool_timeout: float = 5.0, password_iterations: int = None,
+                 verifier: Optional[auth.PasswordVerifier] = None):
         base_dir = Path(__file__).resolve().parent.parent.parent
-        self.db_path = base_dir / 'database' / 'agritech.db'
-        self.schema_path = base_dir / 'database' / 'schema.sql'
-        print(f"Database path: {self.db_path}")
-        print(f"Schema path: {self.schema_path}")
-        
-        # Ensure database directory exists
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Initialize database
-        self.init_db()
+        self.db_path = Path(db_path or os.environ.get('DATABASE_PATH', base_dir / 'database' / 'agritech.db'))
+        self.schema_path = Path(schema_path) if schema_path else base_dir / 'database' / 'schema.sql'
+        if not self.schema_path.exists():
+            # The schema lives in the project-level database directory
+            self.schema_path = base_dir.parent / 'database' / 'schema.sql'
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._ids_lock = threading.Lock()
+        # New hashes use this cost; existing rows keep the parameters stored with them
+        self.password_iterations = password_iterations or auth.DEFAULT_ITERATIONS
+        self.verifier = verifier or auth.PasswordVerifier()
+        # Connections are opened lazily on first use
+        self.pool = ConnectionPool(
+            self.get_data_connection,
+            max_size=pool_size or int(os.environ.get('DB_POOL_SIZE', 8)),
+            timeout=pool_timeout
+        )
+        # Constructing a Database touches nothing; the file and schema are set up by the first connection
+        self._prepared = False
+        self._preparing = False
+        self._prepare_lock = threading.RLock()
+
+    def prepare(self):
+        """Create the database directory, schema and default user if missing; runs once per instance"""
+        if self._prepared:
+            return
+        with self._prepare_lock:
+            # init_db opens connections itself; those calls return here straight away
+            if self._prepared or self._preparing:
+                return
+            self._preparing = True
+            try:
+                logging.info(f"Database path: {self.db_path}")
+                logging.info(f"Schema path: {self.schema_path}")
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self.init_db()
+                self._prepared = True
+            finally:
+                self._preparing = False
 
     def get_db_connection(self):
+        self.prepare()
         conn = sqlite3.connect(str(self.db_path))
         conn.row_factory = sqlite3.Row
         return conn
 
+    def get_data_connection(self):
+        """Connection tuned for pooling, bulk loads and typed range queries (plain tuples, WAL)"""
+        self.prepare()
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode = WAL')
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def ensure_schema(self):
+        """Create missing tables and indexes, and add columns newer than the stored schema"""
+        with self.pool.connection() as conn:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(crop_yields)')}
+            if columns and 'demand' not in columns:
+                conn.execute('ALTER TABLE crop_yields ADD COLUMN demand FLOAT')
+            with open(self.schema_path, 'r') as f:
+                conn.executescript(f.read())
+            conn.commit()
+
+    def lookup_id(self, conn, table: str, name: str, create: bool = False) -> Optional[int]:
+        """Resolve a crop or region name to its id, optionally inserting it"""
+        key = (table, name)
+        if key in self._ids:
+            return self._ids[key]
+        row = conn.execute(f'SELECT id FROM {table} WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            if not create:
+                return None
+            row = (conn.execute(f'INSERT INTO {table} (name) VALUES (?)', (name,)).lastrowid,)
+        with self._ids_lock:
+            self._ids[key] = row[0]
+        return row[0]
+
+    @metrics.timed('db.bulk_insert')
+    def bulk_insert(self, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+                    conn=None) -> int:
+        """Insert many rows with executemany; commits unless an open connection is passed in"""
+        placeholders = ', '.join('?' for _ in columns)
+        sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})'
+        if conn is not None:
+            return conn.executemany(sql, rows).rowcount
+
+        with self.pool.connection() as conn:
+            try:
+                rowcount = conn.executemany(sql, rows).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return rowcount
+
+    @metrics.timed('db.store_weather')
+    def store_weather(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Bulk insert weather readings given as dicts with a region name and the weather_history columns"""
+        columns = ['region_id', 'date', 'temperature', 'rainfall', 'humidity', 'soil_moisture']
+        with self.pool.connection() as conn:
+            try:
+                rows = [(self.lookup_id(conn, 'regions', r['region'], create=True), r['date'], r.get('temperature'),
+                         r.get('rainfall'), r.get('humidity'), r.get('soil_moisture')) for r in records]
+                rowcount = self.bulk_insert('weather_history', columns, rows, conn=conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                with self._ids_lock:
+                    self._ids.clear()
+                raise
+        return rowcount
+
+    @metrics.timed('db.store_sensor_readings')
+    def store_sensor_readings(self, readings: List[Dict[str, Any]]) -> int:
+        """Bulk insert parsed sensor readings (with a region name) into sensor_data in one transaction"""
+        columns = ['sensor_id', 'region_id', 'timestamp', 'temperature', 'humidity', 'soil_moisture',
+                   'soil_ph', 'light_intensity']
+        with self.pool.connection() as conn:
+            try:
+                region_ids = {region: self.lookup_id(conn, 'regions', region, create=True)
+                              for region in {r['region'] for r in readings}}
+                rows = [(r['sensor_id'], region_ids[r['region']], r['timestamp'], r.get('temperature'),
+                         r.get('humidity'), r.get('soil_moisture'), r.get('soil_ph'), r.get('light_intensity'))
+                        for r in readings]
+                rowcount = self.bulk_insert('sensor_data', columns, rows, conn=conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                with self._ids_lock:
+                    self._ids.clear()
+                raise
+        return rowcount
+
+    def import_historical_data(self, source_dir: str, chunksize: int = 50000) -> Dict[str, int]:
+        """
+        Bulk load the historical CSVs in one transaction, streaming them in chunks. Rows already
+        stored for the same crop/region keys and date range are replaced, so re-running an import
+        leaves the tables as one import would.
+        """
+        self.ensure_schema()
+        source_dir = Path(source_dir)
+        counts = {}
+        with self.pool.connection() as conn:
+            self._import_historical_data(conn, source_dir, chunksize, counts)
+        return counts
+
+    def _import_historical_data(self, conn, source_dir: Path, chunksize: int, counts: Dict[str, int]):
+        try:
+            conn.execute('BEGIN')
+            for filename, (table, value_columns, has_crop) in HISTORICAL_IMPORTS.items():
+                key_columns = (['crop_id'] if has_crop else []) + ['region_id']
+                columns = key_columns + ['date'] + list(value_columns.values())
+                counts[table] = 0
+                # Rows from earlier imports have lower ids; those written by this one are kept
+                last_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+                conditions = ' AND '.join(f'{column} = ?' for column in key_columns)
+                delete_sql = f'DELETE FROM {table} WHERE id <= ? AND {conditions} AND date BETWEEN ? AND ?'
+                for chunk in pd.read_csv(source_dir / filename, chunksize=chunksize):
+                    region_ids = {name: self.lookup_id(conn, 'regions', name, create=True)
+                                  for name in chunk['region'].unique()}
+                    frame = {'region_id': chunk['region'].map(region_ids).astype(np.int64),
+                             'date': chunk['date'].astype(str)}
+                    if has_crop:
+                        crop_ids = {name: self.lookup_id(conn, 'crops', name, create=True)
+                                    for name in chunk['crop_type'].unique()}
+                        frame['crop_id'] = chunk['crop_type'].map(crop_ids).astype(np.int64)
+                    for csv_column, column in value_columns.items():
+                        frame[column] = chunk[csv_column].astype(float)
+                    data = pd.DataFrame(frame)[columns]
+                    ranges = data.groupby(key_columns)['date'].agg(['min', 'max']).reset_index()
+                    conn.executemany(delete_sql, ((last_id, *key) for key in ranges.itertuples(index=False, name=None)))
+                    rows = data.itertuples(index=False, name=None)
+                    counts[table] += self.bulk_insert(table, columns, rows, conn=conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            with self._ids_lock:
+                self._ids.clear()
+            raise
+
+    def _range_query(self, sql: str, params: Sequence[Any], fields: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        table = np.array(rows, dtype=[('date', 'U10')] + fields)
+        result = {'date': table['date'].astype('datetime64[D]')}
+        for name, _ in fields:
+            result[name] = table[name]
+        return result
+
+    def _resolve(self, crop_type: Optional[str], region: str) -> Tuple[Optional[int], Optional[int]]:
+        with self.pool.connection() as conn:
+            crop_id = self.lookup_id(conn, 'crops', crop_type) if crop_type is not None else None
+            region_id = self.lookup_id(conn, 'regions', region)
+        return crop_id, region_id
+
+    @metrics.timed('db.query_weather')
+    def query_weather(self, region: str, start: str, end: str) -> Dict[str, np.ndarray]:
+        """Weather readings for a region between two ISO dates (inclusive)"""
+        _, region_id = self._resolve(None, region)
+        return self._range_query(
+            'SELECT date, temperature, rainfall, humidity, soil_moisture FROM weather_history '
+            'WHERE region_id = ? AND date BETWEEN ? AND ? ORDER BY date',
+            (region_id, str(start), str(end)),
+            [('temperature', 'f8'), ('rainfall', 'f8'), ('humidity', 'f8'), ('soil_moisture', 'f8')]
+        )
+
+    @metrics.timed('db.query_yields')
+    def query_yields(self, crop_type: str, region: str, start: str, end: str) -> Dict[str, np.ndarray]:
+        """Yield and demand observations for a crop/region between two ISO dates (inclusive)"""
+        crop_id, region_id = self._resolve(crop_type, region)
+        return self._range_query(
+            'SELECT date, yield_amount, demand FROM crop_yields '
+            'WHERE crop_id = ? AND region_id = ? AND date BETWEEN ? AND ? ORDER BY date',
+            (crop_id, region_id, str(start), str(end)),
+            [('yield_amount', 'f8'), ('demand', 'f8')]
+        )
+
+    @metrics.timed('db.query_prices')
+    def query_prices(self, crop_type: str, region: str, start: str, end: str) -> Dict[str, np.ndarray]:
+        """Market prices for a crop/region between two ISO dates (inclusive)"""
+        crop_id, region_id = self._resolve(crop_type, region)
+        return self._range_query(
+            'SELECT date, price_per_ton FROM market_prices '
+            'WHERE crop_id = ? AND region_id = ? AND date BETWEEN ? AND ? ORDER BY date',
+            (crop_id, region_id, str(start), str(end)),
+            [('price_per_ton', 'f8')]
+        )
+
+    @metrics.timed('db.query_new_observations')
+    def query_new_observations(self, after_id: int, limit: int = 50000, price_window: int = 7) -> pd.DataFrame:
+        """
+        crop_yields rows with id > after_id, in id order, with the features the training set joins onto them:
+        that day's price, the mean and last of up to price_window earlier prices, and the day's mean weather
+        """
+        sql = '''
+            WITH new AS (
+                SELECT id, crop_id, region_id, date, yield_amount, demand FROM crop_yields
+                WHERE id > ? ORDER BY id LIMIT ?
+            )
+            SELECT new.id, new.date, crops.name, regions.name, new.yield_amount, new.demand,
+                (SELECT price_per_ton FROM market_prices p
+                 WHERE p.crop_id = new.crop_id AND p.region_id = new.region_id AND p.date = new.date
+                 ORDER BY p.id DESC LIMIT 1),
+                (SELECT AVG(price_per_ton) FROM (
+                    SELECT price_per_ton FROM market_prices p
+                    WHERE p.crop_id = new.crop_id AND p.region_id = new.region_id AND p.date < new.date
+                    ORDER BY p.date DESC LIMIT ?)),
+                (SELECT price_per_ton FROM market_prices p
+                 WHERE p.crop_id = new.crop_id AND p.region_id = new.region_id AND p.date < new.date
+                 ORDER BY p.date DESC LIMIT 1),
+                AVG(w.temperature), AVG(w.rainfall), AVG(w.humidity), AVG(w.soil_moisture)
+            FROM new
+            JOIN crops ON crops.id = new.crop_id
+            JOIN regions ON regions.id = new.region_id
+            LEFT JOIN weather_history w ON w.region_id = new.region_id AND w.date = new.date
+            GROUP BY new.id ORDER BY new.id
+        '''
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, (after_id, limit, price_window)).fetchall()
+        columns = ['id', 'date', 'crop_type', 'region', 'yield', 'demand', 'price_per_ton', 'price_moving_avg',
+                   'previous_price', 'temperature', 'rainfall', 'humidity', 'soil_moisture']
+        return pd.DataFrame(rows, columns=columns)
+
+    def has_schema(self):
+        conn = self.get_db_connection()
+        try:
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+            ).fetchone() is not None
+        finally:
+            conn.close()
+
     def init_db(self):
-        if not self.db_path.exists():
+        if not self.db_path.exists() or not self.has_schema():
             conn = self.get_db_connection()
             with open(self.schema_path, 'r') as f:
                 conn.executescript(f.read())
@@ -34,50 +437,87 @@ class Database:
 
     def hash_password(self, password):
         """Hash a password for storing."""
-        salt = hashlib.sha256(os.urandom(60)).hexdigest().encode('ascii')
-        pwdhash = hashlib.pbkdf2_hmac('sha512', password.encode('utf-8'), 
-                                     salt, 100000)
-        pwdhash = hashlib.sha256(pwdhash).hexdigest()
-        return (salt + pwdhash.encode('ascii')).decode('ascii')
+        return auth.hash_password(password, self.password_iterations)
 
     def verify_password(self, stored_password, provided_password):
         """Verify a stored password against one provided by user"""
-        salt = stored_password[:64]
-        stored_password = stored_password[64:]
-        pwdhash = hashlib.pbkdf2_hmac('sha512', 
-                                     provided_password.encode('utf-8'), 
-                                     salt.encode('ascii'), 
-                                     100000)
-        pwdhash = hashlib.sha256(pwdhash).hexdigest()
-        return pwdhash == stored_password
+        return auth.verify_password(stored_password, provided_password)
 
+    @metrics.timed('db.create_user')
     def create_user(self, email, password, name=None):
         """Create a new user."""
-        conn = self.get_db_connection()
-        try:
-            hashed_password = self.hash_password(password)
-            conn.execute(
-                'INSERT INTO users (email, password, name) VALUES (?, ?, ?)',
-                (email, hashed_password, name)
-            )
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-        finally:
-            conn.close()
+        # Hash before checking out a connection so the pool isn't held during PBKDF2
+        hashed_password = self.hash_password(password)
+        with self.pool.connection() as conn:
+            try:
+                conn.execute(
+                    'INSERT INTO users (email, password, name) VALUES (?, ?, ?)',
+                    (email, hashed_password, name)
+                )
+                conn.commit()
+                return True
+            except sqlite3.IntegrityError:
+                return False
 
-    def verify_user(self, email, password):
-        """Verify user credentials."""
-        conn = self.get_db_connection()
-        try:
-            user = conn.execute(
+    @metrics.timed('db.get_user')
+    def get_user(self, email):
+        """Fetch a user row by email."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            return cursor.execute(
                 'SELECT * FROM users WHERE email = ?',
                 (email,)
             ).fetchone()
 
-            if user and self.verify_password(user['password'], password):
-                return {'id': user['id'], 'email': user['email'], 'name': user['name']}
+    def verify_user(self, email, password):
+        """Verify user credentials."""
+        user = self.get_user(email)
+        if user and self.verify_password(user['password'], password):
+            return {'id': user['id'], 'email': user['email'], 'name': user['name']}
+        return None
+
+    @metrics.timed('db.authenticate')
+    def authenticate(self, email, password, timeout=10.0):
+        """Verify user credentials on the password worker pool.
+
+        A hash stored with other parameters than the current ones is replaced
+        in the background after a successful check. Raises auth.AuthBusy when too many
+        verifications are already queued.
+        """
+        user = self.get_user(email)
+        if user is None:
             return None
-        finally:
-            conn.close()
\ No newline at end of file
+        if self.verifier.verify(user['password'], password, timeout=timeout):
+            if auth.needs_rehash(user['password'], self.password_iterations):
+                self.rehash_password(user['id'], user['password'], password)
+            return {'id': user['id'], 'email': user['email'], 'name': user['name']}
+        return None
+
+    def rehash_password(self, user_id, stored_password, password):
+        """Queue a new hash of a verified password on the password worker pool.
+
+        Returns the future of the update, or None when the pool is busy; the
+        upgrade is then retried on the next login.
+        """
+        try:
+            return self.verifier.run(self._store_rehash, user_id, stored_password, password)
+        except auth.AuthBusy:
+            logging.info(f"Password hash upgrade for user {user_id} deferred, verification queue full")
+            return None
+
+    def _store_rehash(self, user_id, stored_password, password):
+        """Store a new hash of a verified password, unless the row changed meanwhile."""
+        try:
+            hashed_password = self.hash_password(password)
+            with self.pool.connection() as conn:
+                conn.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                             (hashed_password, user_id, stored_password))
+                conn.commit()
+        except Exception as e:
+            # The login already succeeded; the upgrade is retried on the next one
+            logging.warning(f"Could not upgrade password hash for user {user_id}: {str(e)}")
+
+    def pool_stats(self):
+        """Connection pool statistics."""
+        return self.pool.stats()
\ No newline at end of file
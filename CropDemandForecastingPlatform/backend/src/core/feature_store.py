@@ -0,0 +1,301 @@
+from __future__ import annotations
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Union
+from collections import OrderedDict
+from pathlib import Path
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from core.columnar import ColumnarWriter, read_column, read_manifest
+from core.ingestion import DATA_DIR, HISTORICAL_DIR, iter_date_batches
+from core.startup import lazy_import
+
+pd = lazy_import('pandas')
+
+FEATURE_STORE_DIR = DATA_DIR / 'processed' / 'feature_store'
+TABLE_MANIFEST = '_table.json'
+
+# Partition keys (region, year) are not stored as columns
+TABLES = OrderedDict([
+    ('weather', {
+        'source': 'weather_history.csv',
+        'dtype': {'region': str, 'temperature': np.float64, 'rainfall': np.float64, 'humidity': np.float64},
+        'columns': OrderedDict([('date', 'int32'), ('temperature', 'float32'),
+                                ('rainfall', 'float32'), ('humidity', 'float32')]),
+    }),
+    ('prices', {
+        'source': 'market_prices.csv',
+        'dtype': {'crop_type': str, 'region': str, 'price': np.float64},
+        'columns': OrderedDict([('date', 'int32'), ('crop_type', 'int16'), ('price', 'float32')]),
+    }),
+    ('yields', {
+        'source': 'crop_yields.csv',
+        'dtype': {'crop_type': str, 'region': str, 'yield': np.float64, 'demand': np.float64},
+        'columns': OrderedDict([('date', 'int32'), ('crop_type', 'int16'),
+                                ('yield', 'float32'), ('demand', 'float32')]),
+    }),
+])
+
+Values = Union[str, int, Sequence[Union[str, int]], None]
+
+def to_day(value: Any) -> int:
+    """
+    Convert a date-like value to days since the Unix epoch
+    """
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+def _as_list(values: Values) -> Optional[List[Any]]:
+    if values is None:
+        return None
+    if isinstance(values, (str, int, np.integer)):
+        return [values]
+    return list(values)
+
+class FeatureStore:
+    """
+    Columnar on-disk store for the historical tables, partitioned by region and year.
+
+    Each partition is a directory of fixed-width column files
+    (``<table>/region=<r>/year=<y>/``). ``crop_type`` is dictionary-encoded
+    with one dictionary per table so codes agree across partitions.
+    ``read`` prunes partitions by region/year, narrows rows by binary search
+    on the sorted date column and filters crops on the integer codes, reading
+    every column through a memory map. Only the pages a query touches are
+    faulted in. Manifests and open memory maps are kept between reads and
+    dropped when a table's manifest changes on disk, so repeated lookups on
+    the serving path do no file I/O beyond one stat per table. ``exists``
+    remembers built tables and looks for missing ones again only after
+    ``check_interval`` seconds.
+    """
+
+    def __init__(self, root: Optional[str] = None, check_interval: float = 10.0):
+        self.root = Path(root or os.environ.get('FEATURE_STORE_DIR', FEATURE_STORE_DIR))
+        self.check_interval = check_interval
+        self._present: set = set()
+        # Table -> monotonic time it was last found missing
+        self._missing: Dict[str, float] = {}
+        self._manifests: Dict[str, Dict[str, Any]] = {}
+        self._mtimes: Dict[str, int] = {}
+        # Per table: partition path -> (partition manifest, open columns)
+        self._partitions: Dict[str, Dict[str, tuple]] = {}
+
+    def exists(self, table: Optional[str] = None) -> bool:
+        for name in [table] if table else list(TABLES):
+            if name in self._present:
+                continue
+            missing_since = self._missing.get(name)
+            if missing_since is not None and time.monotonic() - missing_since < self.check_interval:
+                return False
+            if not (self.root / name / TABLE_MANIFEST).exists():
+                self._missing[name] = time.monotonic()
+                return False
+            self._present.add(name)
+            self._missing.pop(name, None)
+        return True
+
+    def manifest(self, table: str) -> Dict[str, Any]:
+        """
+        The table's manifest, reloaded (with its partitions' column maps) when the file changes
+        """
+        path = self.root / table / TABLE_MANIFEST
+        mtime = os.stat(path).st_mtime_ns
+        if self._mtimes.get(table) != mtime or table not in self._manifests:
+            with open(path, 'r') as f:
+                manifest = json.load(f)
+            self._partitions[table] = {}
+            self._manifests[table] = manifest
+            self._mtimes[table] = mtime
+        return self._manifests[table]
+
+    def _partition(self, table: str, path: str) -> tuple:
+        partitions = self._partitions.setdefault(table, {})
+        if path not in partitions:
+            partitions[path] = (read_manifest(path), {})
+        return partitions[path]
+
+    def _column(self, table: str, path: str, name: str) -> np.ndarray:
+        part_manifest, columns = self._partition(table, path)
+        if name not in columns:
+            columns[name] = read_column(path, name, part_manifest)
+        return columns[name]
+
+    def build(self, source_dir: Optional[str] = None, chunksize: int = 50000,
+              tables: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Convert the historical CSVs into partitioned column files, streaming in chunks
+        """
+        source_dir = Path(source_dir or HISTORICAL_DIR)
+        rows = {}
+        for table in tables or list(TABLES):
+            spec = TABLES[table]
+            batches = iter_date_batches(str(source_dir / spec['source']), spec['dtype'], chunksize)
+            rows[table] = self.write_table(table, batches)
+            logging.info(f'Feature store table {table}: {rows[table]} rows')
+        return rows
+
+    def write_table(self, table: str, batches: Iterator[pd.DataFrame]) -> int:
+        """
+        Write date-ordered batches (with a datetime ``date`` column) into region/year partitions
+        """
+        spec = TABLES[table]
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_root = Path(tempfile.mkdtemp(prefix=f'.{table}-', dir=self.root))
+        crop_codes: Dict[str, int] = {}
+        writers: Dict[tuple, ColumnarWriter] = {}
+        total = 0
+
+        try:
+            for batch in batches:
+                batch = batch.assign(
+                    year=batch['date'].dt.year,
+                    date=batch['date'].to_numpy().astype('datetime64[D]').astype(np.int64).astype(np.int32)
+                )
+                if 'crop_type' in spec['columns']:
+                    uniques, inverse = np.unique(batch['crop_type'].to_numpy(dtype=str), return_inverse=True)
+                    for crop_type in uniques:
+                        crop_codes.setdefault(crop_type, len(crop_codes))
+                    batch['crop_type'] = np.array([crop_codes[c] for c in uniques], dtype=np.int16)[inverse]
+
+                for (region, year), part in batch.groupby(['region', 'year'], sort=False):
+                    key = (str(region), int(year))
+                    if key not in writers:
+                        writers[key] = ColumnarWriter(
+                            str(tmp_root / f'region={key[0]}' / f'year={key[1]}'), spec['columns']
+                        )
+                    writers[key].append(part)
+                total += len(batch)
+
+            partitions = []
+            for (region, year), writer in sorted(writers.items()):
+                path = writer.close()
+                dates = read_column(str(path), 'date')
+                partitions.append({
+                    'region': region, 'year': year, 'rows': writer.rows,
+                    'min_date': int(dates[0]), 'max_date': int(dates[-1])
+                })
+            with open(tmp_root / TABLE_MANIFEST, 'w') as f:
+                json.dump({
+                    'table': table,
+                    'columns': spec['columns'],
+                    'dictionaries': {'crop_type': sorted(crop_codes, key=crop_codes.get)} if crop_codes else {},
+                    'partitions': partitions,
+                    'rows': total
+                }, f, indent=2)
+        except Exception:
+            for writer in writers.values():
+                writer.abort()
+            shutil.rmtree(tmp_root, ignore_errors=True)
+            raise
+
+        final = self.root / table
+        if final.exists():
+            shutil.rmtree(final)
+        os.replace(tmp_root, final)
+        self._present.add(table)
+        self._missing.pop(table, None)
+        self._manifests.pop(table, None)
+        self._partitions.pop(table, None)
+        return total
+
+    def partitions(self, table: str, region: Values = None, year: Values = None) -> List[Dict[str, Any]]:
+        """
+        Partitions that can match the region/year predicates
+        """
+        regions = _as_list(region)
+        years = [int(y) for y in _as_list(year) or []] or None
+        return [
+            p for p in self.manifest(table)['partitions']
+            if (regions is None or p['region'] in regions) and (years is None or p['year'] in years)
+        ]
+
+    def read_arrays(self, table: str, columns: Optional[List[str]] = None, crop_type: Values = None,
+                    region: Values = None, year: Values = None, start: Any = None,
+                    end: Any = None) -> Dict[str, np.ndarray]:
+        """
+        Read raw column arrays matching the predicates; ``region`` and ``year`` are added per row
+        """
+        manifest = self.manifest(table)
+        columns = columns or list(manifest['columns'])
+        start_day = to_day(start) if start is not None else None
+        end_day = to_day(end) if end is not None else None
+
+        crop_codes = None
+        if crop_type is not None:
+            dictionary = manifest['dictionaries'].get('crop_type', [])
+            crop_codes = [dictionary.index(c) for c in _as_list(crop_type) if c in dictionary]
+
+        pieces: Dict[str, List[np.ndarray]] = {name: [] for name in columns + ['region', 'year']}
+        for partition in self.partitions(table, region, year):
+            if start_day is not None and partition['max_date'] < start_day:
+                continue
+            if end_day is not None and partition['min_date'] > end_day:
+                continue
+
+            path = str(self.root / table / f"region={partition['region']}" / f"year={partition['year']}")
+
+            # Dates are sorted within a partition, so a date range is a slice
+            lo, hi = 0, partition['rows']
+            if start_day is not None or end_day is not None:
+                dates = self._column(table, path, 'date')
+                if start_day is not None:
+                    lo = int(np.searchsorted(dates, start_day, side='left'))
+                if end_day is not None:
+                    hi = int(np.searchsorted(dates, end_day, side='right'))
+            if hi <= lo:
+                continue
+
+            selector: Union[slice, np.ndarray] = slice(lo, hi)
+            if crop_codes is not None:
+                codes = self._column(table, path, 'crop_type')[lo:hi]
+                selector = lo + np.flatnonzero(np.isin(codes, crop_codes))
+                if not len(selector):
+                    continue
+
+            n_rows = 0
+            for name in columns:
+                values = np.asarray(self._column(table, path, name)[selector])
+                pieces[name].append(values)
+                n_rows = len(values)
+            pieces['region'].append(np.full(n_rows, partition['region'], dtype=object))
+            pieces['year'].append(np.full(n_rows, partition['year'], dtype=np.int16))
+
+        result = {}
+        for name, arrays in pieces.items():
+            if arrays:
+                result[name] = np.concatenate(arrays)
+            else:
+                dtype = object if name == 'region' else manifest['columns'].get(name, 'int16')
+                result[name] = np.empty(0, dtype=dtype)
+        return result
+
+    def read(self, table: str, columns: Optional[List[str]] = None, **predicates) -> pd.DataFrame:
+        """
+        Read matching rows as a DataFrame with decoded dates and categorical crop/region
+        """
+        arrays = self.read_arrays(table, columns, **predicates)
+        manifest = self.manifest(table)
+        data = {}
+        for name, values in arrays.items():
+            if name == 'date':
+                data[name] = values.astype('datetime64[D]')
+            elif name == 'crop_type':
+                data[name] = pd.Categorical.from_codes(values, manifest['dictionaries']['crop_type'])
+            elif name == 'region':
+                data[name] = pd.Categorical(values)
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+    def latest_date(self, table: str, region: Values = None) -> Optional[pd.Timestamp]:
+        partitions = self.partitions(table, region)
+        if not partitions:
+            return None
+        return pd.Timestamp(np.datetime64(max(p['max_date'] for p in partitions), 'D'))
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    store = FeatureStore()
+    print(f"Built feature store at {store.root}: {store.build()}")
@@ -1,29 +1,69 @@
-from typing import Dict, Any, List
-import pandas as pd
+from __future__ import annotations
+from typing import Dict, Any, List, Optional
+from statistics import NormalDist
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import LinearRegression
-import joblib
-import random  # For demo data
+import threading
+from core.metrics import metrics
+from core.seasonal import MEASURES, TREND_HORIZON, SeasonalModel, SeasonalUnavailable, month_names
+from core.startup import lazy_import
 
-def get_crop_forecast(crop_type: str, region: str) -> Dict[str, Any]:
+# Only needed once models are loaded or DataFrames built, not to import this module
+pd = lazy_import('pandas')
+joblib = lazy_import('joblib')
+ensemble = lazy_import('sklearn.ensemble')
+
+# Quantiles reported with every yield and demand prediction: an 80% interval and the median
+QUANTILES = (0.1, 0.5, 0.9)
+QUANTILE_NAMES = ('p10', 'p50', 'p90')
+# Standard normal quantiles for the residual-based yield intervals
+NORMAL_QUANTILES = np.array([NormalDist().inv_cdf(q) for q in QUANTILES])
+# Up to this many rows a CompactForest export beats walking the sklearn trees one by one
+COMPACT_MAX_ROWS = 256
+
+def get_crop_forecast(crop_type: str, region: str, model: Optional[SeasonalModel],
+                      horizon: int = 30) -> Dict[str, Any]:
     """
-    Generate crop forecast for demo purposes
+    Seasonal crop forecast for the ``horizon`` days after the last observed day,
+    used while no trained model is published for a crop/region. Raises
+    SeasonalUnavailable without a model.
     """
-    # Demo data generation
-    predicted_yield = random.uniform(3.5, 8.5)  # tons per hectare
-    predicted_demand = random.uniform(1000, 5000)  # units
-    
+    if model is None:
+        raise SeasonalUnavailable("No price or yield history to forecast from")
+
+    forecast = model.forecast(crop_type, region, horizon)
+    predicted_yield = float(forecast['yield'].mean())  # tons per hectare
+    predicted_demand = float(forecast['demand'].mean())  # units
+    demand_trend = model.trend_direction(crop_type, 'demand', region)
+    price_change = model.relative_change(crop_type, 'price', region)
+
+    # One-step error relative to the level of the demand series
+    demand, yields = list(MEASURES).index('demand'), list(MEASURES).index('yield')
+    rows = model.rows(crop_type, region)
+    demand_level = float(np.abs(model.level[demand, rows]).mean())
+    demand_rmse = float(np.nanmean(model.rmse[demand, rows]))
+    confidence = float(np.clip(1 - demand_rmse / demand_level, 0, 1)) if demand_level > 0 else 0.0
+
+    # Regions of the crop with the highest forecast yield
+    regions = [i for i, key in enumerate(model.keys) if key[0] == crop_type]
+    regional_yields = model.forecast_all(horizon)[yields, regions].mean(axis=1)
+    suitable_regions = [model.keys[regions[i]][1] for i in np.argsort(-regional_yields)[:3]]
+
+    peak_months = model.peak_months(crop_type, region)
+    last_month = int(np.datetime64(model.last_day, 'D').astype('datetime64[M]').astype(np.int64) % 12) + 1
+    months_to_peak = min((m - last_month) % 12 for m in peak_months)
+
     return {
         'predicted_yield': round(predicted_yield, 2),
         'predicted_demand': round(predicted_demand),
-        'market_analysis': f"Market demand for {crop_type} in {region} region shows positive trends with steady growth.",
+        'market_analysis': f"Market demand for {crop_type} in {region} region is {demand_trend}; prices are "
+                           f"forecast to move {price_change:+.1%} over the next {TREND_HORIZON} days.",
         'planting_advice': f"Optimal planting time for {crop_type} in {region} region is approaching. Consider early preparation.",
-        'suitable_regions': [region, "Adjacent Region 1", "Adjacent Region 2"],
-        'confidence_score': random.uniform(0.7, 0.95),
+        'suitable_regions': suitable_regions or [region],
+        'confidence_score': round(confidence, 3),
         'selling_strategy': {
-            'timing_advice': "Optimal selling window in 3-4 months",
-            'peak_months': ["July", "August", "September"],
+            'timing_advice': f"Optimal selling window in {months_to_peak} months" if months_to_peak
+                             else "Prices are in their seasonal peak",
+            'peak_months': month_names(peak_months),
             'storage_guidance': "Maintain humidity levels below 14% for optimal storage"
         },
         'distribution_strategy': {
@@ -32,42 +72,162 @@ def get_crop_forecast(crop_type: str, region: str) -> Dict[str, Any]:
         }
     }
 
+def is_regression_forest(model: Any) -> bool:
+    return isinstance(model, (ensemble.RandomForestRegressor, ensemble.ExtraTreesRegressor)) and model.n_outputs_ == 1
+
+def tree_predictions(model: Any, X: np.ndarray, compact: Any = None) -> Optional[np.ndarray]:
+    """
+    Every tree's prediction for the rows of X, as an n_trees x n_rows array, or None
+    if the model is not a regression forest. The trees get the same float32
+    input as in the forest's own predict, so their mean is its prediction.
+    Small batches are read from ``compact``, a CompactForest export of the
+    model, when one is given; it reaches the same leaves. Both paths reject
+    the same inputs.
+    """
+    use_compact = compact is not None and len(X) <= COMPACT_MAX_ROWS
+    if not use_compact and not is_regression_forest(model):
+        return None
+    n_features = compact.n_features_in if use_compact else model.n_features_in_
+    if X.shape[1] != n_features:
+        raise ValueError(f"Expected {n_features} features, got {X.shape[1]}")
+    if np.isnan(X).any():
+        raise ValueError("Features contain missing values")
+    if use_compact:
+        return compact.predict_trees(X).astype(np.float64)
+    X32 = np.ascontiguousarray(X, dtype=np.float32)
+    trees = np.empty((len(model.estimators_), len(X32)))
+    for i, estimator in enumerate(model.estimators_):
+        trees[i] = estimator.tree_.predict(X32)[:, 0]
+    return trees
+
+def tree_quantiles(trees: np.ndarray) -> np.ndarray:
+    """
+    QUANTILES of each column of a per-tree prediction array, as n_rows x len(QUANTILES).
+    Same linear interpolation as np.quantile, without its overhead on small batches.
+    """
+    position = np.asarray(QUANTILES) * (len(trees) - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, len(trees) - 1)
+    weight = (position - lower)[:, None]
+    ordered = np.sort(trees, axis=0)
+    return (ordered[lower] * (1 - weight) + ordered[upper] * weight).T
+
+def interval(quantiles: Optional[np.ndarray], digits: int = 2) -> Optional[Dict[str, float]]:
+    """
+    One row of a quantile array as {"p10": ..., "p50": ..., "p90": ...}, or None
+    without quantiles or with non-finite ones (not valid JSON)
+    """
+    if quantiles is None or not np.isfinite(quantiles).all():
+        return None
+    return {name: round(float(value), digits) for name, value in zip(QUANTILE_NAMES, quantiles)}
+
+def interval_confidence(*intervals: Optional[Dict[str, float]]) -> Optional[float]:
+    """
+    One minus the widest relative half-width (p90 - p10) / 2|p50| of the given intervals, clipped to [0, 1]
+    """
+    widths = [(i['p90'] - i['p10']) / (2 * abs(i['p50'])) for i in intervals if i is not None and i['p50']]
+    if not widths:
+        return None
+    return float(np.clip(1 - max(widths), 0.0, 1.0))
+
+class FeatureEncoder:
+    """
+    Encode feature dicts into a reusable float64 matrix.
+
+    Column indexes for the fixed feature list are resolved once. Rows are
+    written into a per-thread buffer, so the returned arrays are only valid
+    until the next encode call on the same thread.
+    """
+
+    DERIVED = ('price_moving_avg', 'price_change')
+
+    def __init__(self, features: List[str]):
+        self.features = list(features)
+        self.index = {feature: i for i, feature in enumerate(self.features)}
+        self.direct = [(feature, i) for feature, i in self.index.items() if feature not in self.DERIVED]
+        self.avg_index = self.index.get('price_moving_avg')
+        self.change_index = self.index.get('price_change')
+        self._local = threading.local()
+
+    def _buffer(self, n_rows: int) -> np.ndarray:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < n_rows:
+            buffer = np.empty((max(n_rows, 1), len(self.features)), dtype=np.float64)
+            self._local.buffer = buffer
+        return buffer[:n_rows]
+
+    def encode_into(self, data: Dict[str, Any], row: np.ndarray):
+        """
+        Write one feature dict into a preallocated row
+        """
+        for feature, i in self.direct:
+            value = data.get(feature)
+            row[i] = 0.0 if value is None else value
+
+        price = data.get('price_per_ton', 0)
+        if 'price_history' in data:
+            history = np.asarray(data['price_history'], dtype=np.float64)
+            moving_avg = history.mean()
+            change = (price - history[-1]) / history[-1]
+        else:
+            moving_avg = price
+            change = 0.0
+
+        if self.avg_index is not None:
+            row[self.avg_index] = moving_avg
+        if self.change_index is not None:
+            row[self.change_index] = change
+
+    def encode(self, data: Dict[str, Any]) -> np.ndarray:
+        """
+        Encode one feature dict as a 1 x n_features matrix
+        """
+        X = self._buffer(1)
+        self.encode_into(data, X[0])
+        return X
+
+    def encode_batch(self, items: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Encode many feature dicts as an n_items x n_features matrix
+        """
+        X = self._buffer(len(items))
+        for row, data in zip(X, items):
+            self.encode_into(data, row)
+        return X
+
 class Forecasting:
     def __init__(self):
         self.yield_model = None
         self.demand_model = None
+        # Optional CompactForest export of demand_model for small batches
+        self.compact_demand_model = None
         self.features = [
             'temperature', 'rainfall', 'humidity', 'soil_moisture',
             'month', 'price_per_ton', 'price_moving_avg', 'price_change'
         ]
+        self.encoder = FeatureEncoder(self.features)
 
-    def load_models(self, yield_model_path: str, demand_model_path: str):
+    def load_models(self, yield_model_path: str, demand_model_path: str, mmap_mode: str = None,
+                    compact_model_path: str = None):
         """
         Load trained models from files
         """
-        self.yield_model = joblib.load(yield_model_path)
-        self.demand_model = joblib.load(demand_model_path)
+        self.yield_model = joblib.load(yield_model_path, mmap_mode=mmap_mode)
+        self.demand_model = joblib.load(demand_model_path, mmap_mode=mmap_mode)
+        if compact_model_path is not None:
+            self.compact_demand_model = joblib.load(compact_model_path, mmap_mode=mmap_mode)
 
     def prepare_features(self, data: Dict[str, Any]) -> pd.DataFrame:
         """
         Prepare features for prediction
         """
-        df = pd.DataFrame([data])
-        
-        # Add derived features
-        if 'price_history' in data:
-            df['price_moving_avg'] = np.mean(data['price_history'])
-            df['price_change'] = (data['price_per_ton'] - data['price_history'][-1]) / data['price_history'][-1]
-        else:
-            df['price_moving_avg'] = data['price_per_ton']
-            df['price_change'] = 0
-
-        # Ensure all required features are present
-        for feature in self.features:
-            if feature not in df.columns:
-                df[feature] = 0
+        return pd.DataFrame(self.encoder.encode(data).copy(), columns=self.features)
 
-        return df[self.features]
+    def _predict(self, model: Any, X: np.ndarray) -> np.ndarray:
+        # Models fitted on a DataFrame expect named columns
+        if getattr(model, 'feature_names_in_', None) is not None:
+            X = pd.DataFrame(X, columns=self.features)
+        return model.predict(X)
 
     def predict_yield(self, features: Dict[str, Any]) -> float:
         """
@@ -76,8 +236,8 @@ class Forecasting:
         if self.yield_model is None:
             raise ValueError("Yield model not loaded")
 
-        X = self.prepare_features(features)
-        return float(self.yield_model.predict(X)[0])
+        X = self.encoder.encode(features)
+        return float(self._predict(self.yield_model, X)[0])
 
     def predict_demand(self, features: Dict[str, Any]) -> float:
         """
@@ -86,18 +246,141 @@ class Forecasting:
         if self.demand_model is None:
             raise ValueError("Demand model not loaded")
 
-        X = self.prepare_features(features)
-        return float(self.demand_model.predict(X)[0])
+        X = self.encoder.encode(features)
+        return float(self._predict(self.demand_model, X)[0])
 
-    def get_forecast(self, features: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_arrays(self, X: np.ndarray, span_prefix: str = 'forecast.') -> Dict[str, Any]:
         """
-        Get both yield and demand forecasts
+        Point predictions and QUANTILES for every row of an encoded feature matrix.
+
+        Each model is evaluated once, and its intervals come from the same pass:
+        demand is the mean of the forest's per-tree predictions, and its
+        quantiles are those of the tree predictions. The yield regression adds
+        normal quantiles of its prediction error, estimated from the training
+        residuals. Models without residual statistics (plain LinearRegression)
+        give no yield quantiles. Quantile arrays are n_rows x len(QUANTILES).
         """
-        predicted_yield = self.predict_yield(features)
-        predicted_demand = self.predict_demand(features)
+        with metrics.span(span_prefix + 'yield_predict'):
+            yields = self._predict(self.yield_model, X)
+            std = self.yield_model.prediction_std(X) if hasattr(self.yield_model, 'prediction_std') else None
+            yield_quantiles = yields[:, None] + std[:, None] * NORMAL_QUANTILES if std is not None else None
+        with metrics.span(span_prefix + 'demand_predict'):
+            trees = tree_predictions(self.demand_model, X, self.compact_demand_model)
+            if trees is None:
+                demands, demand_quantiles = self._predict(self.demand_model, X), None
+            else:
+                demands = trees.mean(axis=0)
+                demand_quantiles = tree_quantiles(trees)
+        return {"yield": yields, "demand": demands,
+                "yield_quantiles": yield_quantiles, "demand_quantiles": demand_quantiles}
 
+    @staticmethod
+    def _result(arrays: Dict[str, Any], i: int) -> Dict[str, Any]:
+        yield_interval = interval(arrays['yield_quantiles'][i] if arrays['yield_quantiles'] is not None else None)
+        demand_interval = interval(arrays['demand_quantiles'][i] if arrays['demand_quantiles'] is not None else None, 0)
         return {
-            "yield": predicted_yield,
-            "demand": predicted_demand,
-            "features_used": self.features
-        }
\ No newline at end of file
+            "yield": float(arrays['yield'][i]),
+            "demand": float(arrays['demand'][i]),
+            "yield_interval": yield_interval,
+            "demand_interval": demand_interval,
+            "confidence": interval_confidence(yield_interval, demand_interval)
+        }
+
+    def get_forecast(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get both yield and demand forecasts with their intervals
+        """
+        if self.yield_model is None:
+            raise ValueError("Yield model not loaded")
+        if self.demand_model is None:
+            raise ValueError("Demand model not loaded")
+
+        with metrics.span('forecast.encode'):
+            X = self.encoder.encode(features)
+        result = self._result(self.predict_arrays(X), 0)
+        result["features_used"] = self.features
+        return result
+
+    def features_from_store(self, store: Any, crop_type: str, region: str, date: Any = None,
+                            window: int = 7) -> Dict[str, Any]:
+        """
+        Build a feature dict for a crop/region from a FeatureStore, defaulting to its latest date
+        """
+        date = pd.Timestamp(date) if date is not None else store.latest_date('prices', region)
+        if date is None:
+            raise ValueError(f"No stored prices for region '{region}'")
+
+        weather = store.read_arrays('weather', ['temperature', 'rainfall', 'humidity'],
+                                    region=region, start=date, end=date)
+        prices = store.read_arrays('prices', ['price'], crop_type=crop_type, region=region,
+                                   start=date - pd.Timedelta(days=window), end=date)
+
+        features: Dict[str, Any] = {'month': date.month}
+        for name in ('temperature', 'rainfall', 'humidity'):
+            if len(weather[name]):
+                features[name] = float(weather[name].mean())
+        if len(prices['price']):
+            features['price_per_ton'] = float(prices['price'][-1])
+            if len(prices['price']) > 1:
+                features['price_history'] = prices['price'][:-1].astype(np.float64).tolist()
+        return features
+
+    def validate_features(self, data: Dict[str, Any]):
+        """
+        Raise ValueError if a feature dict cannot be encoded
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Features must be an object")
+
+        for feature in self.features + ['price_per_ton']:
+            value = data.get(feature)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"Feature '{feature}' must be numeric")
+
+        if 'price_history' in data:
+            history = data['price_history']
+            if not isinstance(history, list) or not history:
+                raise ValueError("price_history must be a non-empty list")
+            if any(isinstance(p, bool) or not isinstance(p, (int, float)) for p in history):
+                raise ValueError("price_history must contain only numbers")
+            if 'price_per_ton' not in data:
+                raise ValueError("price_per_ton is required with price_history")
+            if history[-1] == 0:
+                raise ValueError("Last price in price_history must be non-zero")
+
+    def prepare_features_batch(self, items: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Prepare one feature matrix for many feature dicts
+        """
+        return pd.DataFrame(self.encoder.encode_batch(items).copy(), columns=self.features)
+
+    def get_forecast_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Get yield and demand forecasts and intervals for many feature dicts with one pass per model.
+        Results are returned in input order; invalid items carry an "error" instead.
+        """
+        if self.yield_model is None:
+            raise ValueError("Yield model not loaded")
+        if self.demand_model is None:
+            raise ValueError("Demand model not loaded")
+
+        results: List[Dict[str, Any]] = [None] * len(items)
+        valid_index = []
+        valid_items = []
+        for i, data in enumerate(items):
+            try:
+                self.validate_features(data)
+            except ValueError as e:
+                results[i] = {"error": str(e)}
+                continue
+            valid_index.append(i)
+            valid_items.append(data)
+
+        if valid_items:
+            with metrics.span('forecast.batch_encode'):
+                X = self.encoder.encode_batch(valid_items)
+            arrays = self.predict_arrays(X, 'forecast.batch_')
+            for row, i in enumerate(valid_index):
+                results[i] = self._result(arrays, row)
+
+        return results
\ No newline at end of file
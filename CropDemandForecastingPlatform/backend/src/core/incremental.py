@@ -0,0 +1,127 @@
+from typing import Any, Dict, Optional
+import copy
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+class IncrementalLinearRegression(LinearRegression):
+    """
+    Least-squares regression that can absorb new rows without seeing old ones.
+
+    ``fit`` keeps the normal-equation sums X'X and X'y next to the
+    coefficients, and ``partial_fit`` adds the new rows' sums and re-solves.
+    The result is the recursive least squares solution, equal to a batch fit
+    on all rows seen so far, at a cost of O(rows * features^2) per update.
+    With ``forgetting`` below 1, the existing sums are scaled by
+    ``forgetting ** n_new_rows`` before each update, so older observations
+    fade out gradually. Prediction is inherited from LinearRegression.
+
+    A triangular QR factor R of [X y] is kept as well (R'R is the augmented
+    normal matrix, updated by factoring the decayed R stacked on the new
+    rows). Its last diagonal entry is the residual norm of the least-squares
+    fit, which gives the residual variance without the cancellation of
+    y'y - 2b'X'y + b'X'Xb on large targets, and with it ``prediction_std``
+    for residual-based prediction intervals.
+    """
+
+    def __init__(self, *, forgetting: float = 1.0, fit_intercept: bool = True):
+        self.forgetting = forgetting
+        self.fit_intercept = fit_intercept
+        self.copy_X = True
+        self.n_jobs = None
+        self.positive = False
+
+    def _design(self, X: Any) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        return np.column_stack([X, np.ones(len(X))]) if self.fit_intercept else X
+
+    def _update_factor(self, A: np.ndarray, y: np.ndarray, decay: Optional[float] = None):
+        rows = np.column_stack([A, y])
+        if decay is not None:
+            rows = np.vstack([np.sqrt(decay) * self.r_, rows])
+        r = np.linalg.qr(rows, mode='r')
+        # Fewer rows than columns give a short factor; pad it to square
+        self.r_ = np.zeros((rows.shape[1], rows.shape[1]))
+        self.r_[:len(r)] = r
+
+    def _solve(self):
+        theta = np.linalg.lstsq(self.xtx_, self.xty_, rcond=None)[0]
+        if self.fit_intercept:
+            self.coef_, self.intercept_ = theta[:-1], float(theta[-1])
+        else:
+            self.coef_, self.intercept_ = theta, 0.0
+        # Models saved before the factor was kept have no residual statistics
+        if hasattr(self, 'r_'):
+            dof = self.n_effective_ - len(theta)
+            self.residual_variance_ = float(self.r_[-1, -1] ** 2 / dof) if dof > 0 else None
+            self.xtx_pinv_ = np.linalg.pinv(self.xtx_)
+
+    def fit(self, X: Any, y: Any, sample_weight: Any = None) -> 'IncrementalLinearRegression':
+        if sample_weight is not None:
+            raise ValueError("IncrementalLinearRegression does not support sample weights")
+        A = self._design(X)
+        y = np.asarray(y, dtype=np.float64)
+        self.n_features_in_ = A.shape[1] - self.fit_intercept
+        self.xtx_ = A.T @ A
+        self.xty_ = A.T @ y
+        self._update_factor(A, y)
+        self.n_samples_seen_ = len(A)
+        self.n_effective_ = float(len(A))
+        self._solve()
+        return self
+
+    def partial_fit(self, X: Any, y: Any) -> 'IncrementalLinearRegression':
+        if not hasattr(self, 'xtx_'):
+            return self.fit(X, y)
+        A = self._design(X)
+        if A.shape[1] - self.fit_intercept != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {A.shape[1] - self.fit_intercept}")
+        y = np.asarray(y, dtype=np.float64)
+        decay = self.forgetting ** len(A)
+        self.xtx_ = decay * self.xtx_ + A.T @ A
+        self.xty_ = decay * self.xty_ + A.T @ y
+        if hasattr(self, 'r_'):
+            self._update_factor(A, y, decay)
+            self.n_effective_ = decay * self.n_effective_ + len(A)
+        self.n_samples_seen_ += len(A)
+        self._solve()
+        return self
+
+    def prediction_std(self, X: Any) -> Optional[np.ndarray]:
+        """
+        Standard deviation of the error in predicting a new observation at each row of X:
+        residual variance plus the variance of the fitted mean there. None without residual statistics.
+        """
+        variance = getattr(self, 'residual_variance_', None)
+        if variance is None or not np.isfinite(variance):
+            return None
+        A = self._design(X)
+        leverage = np.einsum('ij,jk,ik->i', A, self.xtx_pinv_, A)
+        return np.sqrt(variance * (1 + np.maximum(leverage, 0.0)))
+
+def update_linear(model: IncrementalLinearRegression, X: np.ndarray, y: np.ndarray) -> IncrementalLinearRegression:
+    """
+    Copy of ``model`` updated with new rows; the served model is never modified
+    """
+    if not hasattr(model, 'partial_fit'):
+        raise TypeError(f"{type(model).__name__} cannot be updated incrementally; retrain it first")
+    return copy.deepcopy(model).partial_fit(X, y)
+
+def grow_forest(forest: RandomForestRegressor, X: np.ndarray, y: np.ndarray, n_trees: int,
+                max_trees: Optional[int] = None, random_state: Optional[int] = None,
+                params: Optional[Dict[str, Any]] = None, n_jobs: Optional[int] = None) -> RandomForestRegressor:
+    """
+    Copy of ``forest`` with ``n_trees`` new trees fitted on (X, y) only.
+
+    Once the forest holds more than ``max_trees`` (by default its current
+    size) the oldest trees are dropped, so predictions drift towards recent
+    data while the cost depends only on the new rows.
+    """
+    params = {k: v for k, v in (params or {}).items() if k not in ('n_estimators', 'random_state', 'n_jobs')}
+    new = RandomForestRegressor(n_estimators=n_trees, random_state=random_state, n_jobs=n_jobs, **params).fit(X, y)
+    max_trees = max_trees or len(forest.estimators_)
+
+    grown = copy.copy(forest)
+    grown.estimators_ = (list(forest.estimators_) + new.estimators_)[-max_trees:]
+    grown.n_estimators = len(grown.estimators_)
+    return grown
@@ -0,0 +1,184 @@
+from __future__ import annotations
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import logging
+import numpy as np
+from core.columnar import ColumnarWriter, read_columns
+from core.startup import lazy_import
+
+pd = lazy_import('pandas')
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / 'data'
+HISTORICAL_DIR = DATA_DIR / 'historical'
+TRAINING_SET_DIR = DATA_DIR / 'processed' / 'training_set'
+
+SOURCES = OrderedDict([
+    ('yields', ('crop_yields.csv', {'crop_type': str, 'region': str, 'yield': np.float64, 'demand': np.float64})),
+    ('prices', ('market_prices.csv', {'crop_type': str, 'region': str, 'price': np.float64})),
+    ('weather', ('weather_history.csv', {'region': str, 'temperature': np.float64,
+                                         'rainfall': np.float64, 'humidity': np.float64})),
+])
+
+SERIES_KEYS = ['crop_type', 'region']
+WEATHER_FEATURES = ['temperature', 'rainfall', 'humidity', 'soil_moisture']
+
+TRAINING_SET_COLUMNS = OrderedDict([
+    ('date', 'int32'),  # days since the Unix epoch
+    ('crop_type', 'int16'),
+    ('region', 'int16'),
+    ('temperature', 'float32'),
+    ('rainfall', 'float32'),
+    ('humidity', 'float32'),
+    ('soil_moisture', 'float32'),
+    ('month', 'float32'),
+    ('price_per_ton', 'float32'),
+    ('price_moving_avg', 'float32'),
+    ('price_change', 'float32'),
+    ('yield', 'float32'),
+    ('demand', 'float32'),
+])
+
+def iter_date_batches(path: str, dtype: Dict[str, Any], chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream a date-ordered CSV in chunks, only yielding dates that are complete.
+    Rows of the last date in a chunk are carried into the next chunk.
+    """
+    carry = None
+    for chunk in pd.read_csv(path, dtype=dtype, parse_dates=['date'], chunksize=chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        complete = chunk['date'] < chunk['date'].iloc[-1]
+        carry = chunk[~complete]
+        if complete.any():
+            yield chunk[complete]
+    if carry is not None and len(carry):
+        yield carry
+
+def iter_aligned_batches(streams: List[Iterator[pd.DataFrame]]) -> Iterator[Tuple[pd.DataFrame, ...]]:
+    """
+    Align several date-ordered streams so each yielded tuple covers the same dates.
+    At most one chunk per stream is buffered beyond the emitted range.
+    """
+    buffers: List[Optional[pd.DataFrame]] = [None] * len(streams)
+    exhausted = [False] * len(streams)
+
+    while True:
+        for i, stream in enumerate(streams):
+            if not exhausted[i] and (buffers[i] is None or buffers[i].empty):
+                batch = next(stream, None)
+                if batch is None:
+                    exhausted[i] = True
+                else:
+                    buffers[i] = batch
+
+        live = [b for i, b in enumerate(buffers) if b is not None and not b.empty]
+        if not live:
+            return
+
+        # Emit everything up to the earliest last-date among streams that can still grow
+        growing = [b['date'].iloc[-1] for i, b in enumerate(buffers)
+                   if not exhausted[i] and b is not None and not b.empty]
+        cutoff = min(growing) if growing else max(b['date'].iloc[-1] for b in live)
+
+        emitted = []
+        for i, buffer in enumerate(buffers):
+            if buffer is None or buffer.empty:
+                emitted.append(None)
+                continue
+            mask = buffer['date'] <= cutoff
+            emitted.append(buffer[mask])
+            buffers[i] = buffer[~mask]
+        yield tuple(emitted)
+
+class PriceFeatureState:
+    """
+    Rolling price features per (crop, region) series, carried across chunks.
+
+    ``price_moving_avg`` is the mean of up to ``window`` previous prices and
+    ``price_change`` the relative change from the previous price, matching
+    how ``Forecasting`` derives them from ``price_history`` at serving time.
+    Only the last ``window`` prices of each series are kept between chunks.
+    """
+
+    def __init__(self, window: int = 7):
+        self.window = window
+        self.tail: Optional[pd.DataFrame] = None
+
+    def transform(self, prices: pd.DataFrame) -> pd.DataFrame:
+        prices = prices.assign(_new=True)
+        if self.tail is not None:
+            prices = pd.concat([self.tail.assign(_new=False), prices], ignore_index=True)
+        prices = prices.sort_values(SERIES_KEYS + ['date'], kind='stable', ignore_index=True)
+
+        previous = prices.groupby(SERIES_KEYS, sort=False)['price'].shift(1)
+        moving_avg = previous.groupby([prices[k] for k in SERIES_KEYS], sort=False).transform(
+            lambda s: s.rolling(self.window, min_periods=1).mean()
+        )
+        prices['price_per_ton'] = prices['price']
+        prices['price_moving_avg'] = moving_avg.fillna(prices['price'])
+        prices['price_change'] = ((prices['price'] - previous) / previous).fillna(0.0)
+
+        self.tail = prices.groupby(SERIES_KEYS, sort=False).tail(self.window)[['date'] + SERIES_KEYS + ['price']]
+        return prices.loc[prices['_new'], ['date'] + SERIES_KEYS + ['price_per_ton', 'price_moving_avg', 'price_change']]
+
+def join_batch(yields: pd.DataFrame, price_features: Optional[pd.DataFrame],
+               weather: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Join one date-aligned batch of price features and weather onto yields
+    """
+    joined = yields
+    if price_features is not None:
+        joined = joined.merge(price_features, on=['date'] + SERIES_KEYS, how='left')
+    else:
+        joined = joined.assign(price_per_ton=np.nan, price_moving_avg=np.nan, price_change=np.nan)
+
+    if weather is not None and not weather.empty:
+        # Weather is reported several times per region and day; average the readings
+        daily = weather.groupby(['date', 'region'], as_index=False, sort=False).mean(numeric_only=True)
+        joined = joined.merge(daily, on=['date', 'region'], how='left')
+
+    for feature in WEATHER_FEATURES:
+        if feature not in joined.columns:
+            joined[feature] = np.nan
+
+    joined['month'] = joined['date'].dt.month
+    joined['date'] = (joined['date'].to_numpy().astype('datetime64[D]').astype(np.int64)).astype(np.int32)
+    # Forecasting treats missing features as zero
+    return joined.fillna(0.0)
+
+def build_training_set(source_dir: Optional[str] = None, output_dir: Optional[str] = None,
+                       chunksize: int = 50000, window: int = 7) -> Path:
+    """
+    Stream the historical CSVs, join them by (date, region, crop) and write a columnar training set
+    """
+    source_dir = Path(source_dir or HISTORICAL_DIR)
+    output_dir = Path(output_dir or TRAINING_SET_DIR)
+
+    streams = [
+        iter_date_batches(str(source_dir / filename), dtype, chunksize)
+        for filename, dtype in SOURCES.values()
+    ]
+    price_state = PriceFeatureState(window)
+    writer = ColumnarWriter(str(output_dir), TRAINING_SET_COLUMNS, categorical=SERIES_KEYS)
+
+    try:
+        for yields, prices, weather in iter_aligned_batches(streams):
+            # Price windows advance even for dates without yield rows
+            price_features = price_state.transform(prices) if prices is not None and not prices.empty else None
+            if yields is None or yields.empty:
+                continue
+            writer.append(join_batch(yields, price_features, weather))
+    except Exception:
+        writer.abort()
+        raise
+
+    path = writer.close(metadata={'source_dir': str(source_dir), 'price_window': window})
+    logging.info(f'Wrote training set with {writer.rows} rows to {path}')
+    return path
+
+def load_training_set(path: Optional[str] = None, mmap: bool = True) -> pd.DataFrame:
+    """
+    Load a training set written by build_training_set
+    """
+    return read_columns(str(path or TRAINING_SET_DIR), mmap=mmap)
@@ -0,0 +1,307 @@
+from typing import Dict, Any, List, Optional
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+import itertools
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+import numpy as np
+
+# The synthetic predictors live in backend/models
+BACKEND_DIR = str(Path(__file__).resolve().parent.parent.parent)
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from core.startup import lazy_import
+
+# Imported with sklearn when a job is validated or a worker starts
+crop_models = lazy_import('models.crop_models')
+
+WEATHER_FIELDS = ['temperature', 'rainfall', 'soil_quality']
+WEATHER_DEFAULTS = {'temperature': 25.0, 'rainfall': 150.0, 'soil_quality': 7.0}
+TERMINAL_STATUSES = ('completed', 'failed')
+
+class JobNotFound(Exception):
+    """Raised for an unknown job id"""
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def expand_sweep(spec: Dict[str, Any], max_scenarios: int) -> Dict[str, Any]:
+    """
+    Turn a sweep request into scenario columns.
+
+    ``spec`` holds either ``scenarios`` (a list of objects with crop_type,
+    region and optional weather values) or ``grid`` (lists per field whose
+    cartesian product is swept). Missing weather values use the defaults.
+    """
+    if not isinstance(spec, dict) or ('scenarios' in spec) == ('grid' in spec):
+        raise ValueError("Provide either 'scenarios' or 'grid'")
+
+    if 'grid' in spec:
+        grid = spec['grid']
+        if not isinstance(grid, dict):
+            raise ValueError("grid must be an object")
+        axes = []
+        for field in ['crop_type', 'region'] + WEATHER_FIELDS:
+            values = grid.get(field, [WEATHER_DEFAULTS.get(field)] if field in WEATHER_DEFAULTS else None)
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"grid.{field} must be a non-empty list")
+            axes.append(values)
+        total = int(np.prod([len(a) for a in axes]))
+        if total > max_scenarios:
+            raise ValueError(f"Sweep has {total} scenarios; at most {max_scenarios} are allowed")
+        scenarios = [dict(zip(['crop_type', 'region'] + WEATHER_FIELDS, values)) for values in itertools.product(*axes)]
+    else:
+        scenarios = spec['scenarios']
+        if not isinstance(scenarios, list) or not scenarios:
+            raise ValueError("scenarios must be a non-empty list")
+        if len(scenarios) > max_scenarios:
+            raise ValueError(f"Sweep has {len(scenarios)} scenarios; at most {max_scenarios} are allowed")
+
+    columns: Dict[str, Any] = {'crop_type': [], 'region': []}
+    weather = {field: np.empty(len(scenarios)) for field in WEATHER_FIELDS}
+    for i, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise ValueError(f"Scenario {i} must be an object")
+        if scenario.get('crop_type') not in crop_models.CROPS:
+            raise ValueError(f"Scenario {i}: crop_type must be one of {', '.join(crop_models.CROPS)}")
+        if scenario.get('region') not in crop_models.REGIONS:
+            raise ValueError(f"Scenario {i}: region must be one of {', '.join(crop_models.REGIONS)}")
+        columns['crop_type'].append(scenario['crop_type'])
+        columns['region'].append(scenario['region'])
+        for field in WEATHER_FIELDS:
+            value = scenario.get(field, WEATHER_DEFAULTS[field])
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Scenario {i}: {field} must be numeric")
+            weather[field][i] = value
+    columns.update(weather)
+    return columns
+
+# Loaded once per worker process and reused by every chunk it runs
+_worker_models = None
+
+def _init_worker():
+    global _worker_models
+    _worker_models = (crop_models.YieldPredictor(), crop_models.DemandPredictor())
+
+def predict_chunk(columns: Dict[str, Any]):
+    """
+    Predict yield and demand for a chunk of scenario columns in two vectorized calls
+    """
+    if _worker_models is None:
+        _init_worker()
+    yield_model, demand_model = _worker_models
+    args = [columns['crop_type'], columns['region']] + [columns[f] for f in WEATHER_FIELDS]
+    return yield_model.predict_batch(*args), demand_model.predict_batch(*args)
+
+class JobManager:
+    """
+    Runs scenario sweeps in the background and persists their results.
+
+    A submitted sweep is split into chunks of ``chunk_size`` scenarios that
+    run on a process pool. Each worker loads the predictors once, so a
+    chunk costs two ``predict`` calls. As chunks finish, their rows are
+    written to ``forecast_job_results`` and the job's progress in
+    ``forecast_jobs`` advances, so clients can poll, stream progress or page
+    through results, including after reconnecting. Each job records the
+    process that owns it; before the first job is read or submitted,
+    unfinished jobs whose owner process on this host is gone are marked
+    failed, and ``check`` does the same for one job at any time.
+    """
+
+    def __init__(self, db, max_workers: Optional[int] = None, chunk_size: int = 2000,
+                 max_scenarios: int = 100000, executor: Optional[Executor] = None):
+        self.db = db
+        self.max_workers = max_workers or int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1))
+        self.chunk_size = chunk_size
+        self.max_scenarios = max_scenarios
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._futures: Dict[str, List[Future]] = {}
+        # Jobs still having chunks submitted; their futures are kept until every chunk is in
+        self._submitting = set()
+        self.host = socket.gethostname()
+        self._prepared = False
+
+    @property
+    def owner(self) -> str:
+        # The process running the jobs, which may have been forked after this manager was built
+        return f'{self.host}:{os.getpid()}'
+
+    def prepare(self):
+        """
+        Create the job tables and fail jobs orphaned by a restart; runs once
+        """
+        if self._prepared:
+            return
+        with self._lock:
+            if not self._prepared:
+                self.db.ensure_schema()
+                self._recover()
+                self._prepared = True
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                # spawn rather than fork: the server process runs threads that may hold locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def _recover(self, job_id: Optional[str] = None):
+        with self.db.pool.connection() as conn:
+            query = "SELECT id, owner FROM forecast_jobs WHERE status IN ('queued', 'running')"
+            if job_id is None:
+                rows = conn.execute(query).fetchall()
+            else:
+                rows = conn.execute(query + ' AND id = ?', (job_id,)).fetchall()
+            orphaned = []
+            for job_id, owner in rows:
+                host, _, pid = (owner or '').rpartition(':')
+                if host == self.host and pid.isdigit() and not _process_alive(int(pid)):
+                    orphaned.append((job_id,))
+            if orphaned:
+                conn.executemany("UPDATE forecast_jobs SET status = 'failed', error = 'Interrupted by a restart', "
+                                 "finished_at = CURRENT_TIMESTAMP WHERE id = ?", orphaned)
+                logging.warning(f'Marked {len(orphaned)} interrupted forecast job(s) as failed')
+            conn.commit()
+
+    def submit(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        self.prepare()
+        columns = expand_sweep(spec, self.max_scenarios)
+        total = len(columns['crop_type'])
+        job_id = uuid.uuid4().hex
+        with self.db.pool.connection() as conn:
+            conn.execute("INSERT INTO forecast_jobs (id, status, total, owner) VALUES (?, 'queued', ?, ?)",
+                         (job_id, total, self.owner))
+            conn.commit()
+
+        executor = self._get_executor()
+        futures: List[Future] = []
+        with self._lock:
+            self._futures[job_id] = futures
+            self._submitting.add(job_id)
+        try:
+            for start in range(0, total, self.chunk_size):
+                chunk = {name: values[start:start + self.chunk_size] for name, values in columns.items()}
+                future = executor.submit(predict_chunk, chunk)
+                future.add_done_callback(lambda f, s=start, c=chunk: self._chunk_done(job_id, s, c, f))
+                futures.append(future)
+        finally:
+            with self._lock:
+                self._submitting.discard(job_id)
+            # Chunks that finished while later ones were being submitted left the futures in place
+            self._forget_if_finished(job_id)
+        logging.info(f'Job {job_id}: {total} scenarios in {len(futures)} chunks')
+        return self.get(job_id)
+
+    def _chunk_done(self, job_id: str, start: int, chunk: Dict[str, Any], future: Future):
+        try:
+            if future.cancelled():
+                # Cancelled by _fail after another chunk of the job failed
+                return
+            yields, demands = future.result()
+            rows = zip(itertools.repeat(job_id), range(start, start + len(yields)), chunk['crop_type'],
+                       chunk['region'], *(chunk[f].tolist() for f in WEATHER_FIELDS),
+                       yields.tolist(), demands.tolist())
+            with self.db.pool.connection() as conn:
+                try:
+                    self.db.bulk_insert('forecast_job_results', [
+                        'job_id', 'idx', 'crop_type', 'region', 'temperature', 'rainfall', 'soil_quality',
+                        'predicted_yield', 'predicted_demand'
+                    ], rows, conn=conn)
+                    conn.execute('''
+                        UPDATE forecast_jobs SET
+                            completed = completed + ?,
+                            status = CASE WHEN completed + ? >= total THEN 'completed' ELSE 'running' END,
+                            started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+                            finished_at = CASE WHEN completed + ? >= total THEN CURRENT_TIMESTAMP END
+                        WHERE id = ? AND status != 'failed'
+                    ''', (len(yields), len(yields), len(yields), job_id))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            logging.error(f'Job {job_id} chunk at {start} failed: {str(e)}')
+            self._fail(job_id, str(e))
+        finally:
+            self._forget_if_finished(job_id)
+
+    def _forget_if_finished(self, job_id: str):
+        with self._lock:
+            futures = self._futures.get(job_id)
+            if futures is not None and job_id not in self._submitting and all(f.done() for f in futures):
+                del self._futures[job_id]
+
+    def _fail(self, job_id: str, error: str):
+        with self._lock:
+            futures = list(self._futures.get(job_id, []))
+        # Cancelling runs the pending chunks' done callbacks in this thread, and they take the lock
+        for future in futures:
+            future.cancel()
+        with self.db.pool.connection() as conn:
+            conn.execute("UPDATE forecast_jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP "
+                         "WHERE id = ? AND status != 'failed'", (error, job_id))
+            conn.commit()
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        self.prepare()
+        with self.db.pool.connection() as conn:
+            row = conn.execute('SELECT id, status, total, completed, error, created_at, started_at, finished_at '
+                               'FROM forecast_jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        job = dict(zip(['id', 'status', 'total', 'completed', 'error', 'created_at', 'started_at', 'finished_at'], row))
+        job['progress'] = job['completed'] / job['total'] if job['total'] else 1.0
+        return job
+
+    def check(self, job_id: str) -> Dict[str, Any]:
+        """
+        The job, after marking it failed if it is unfinished and its owner process on this host is gone
+        """
+        self.prepare()
+        self._recover(job_id)
+        return self.get(job_id)
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Results with scenario index >= offset, in order; only finished chunks are visible while a job runs
+        """
+        self.get(job_id)
+        with self.db.pool.connection() as conn:
+            rows = conn.execute(
+                'SELECT idx, crop_type, region, temperature, rainfall, soil_quality, predicted_yield, predicted_demand '
+                'FROM forecast_job_results WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?',
+                (job_id, offset, limit)
+            ).fetchall()
+        fields = ['index', 'crop_type', 'region'] + WEATHER_FIELDS + ['yield', 'demand']
+        return [dict(zip(fields, row)) for row in rows]
+
+    def wait(self, job_id: str, timeout: float = 60.0, interval: float = 0.05) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job['status'] in TERMINAL_STATUSES or time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,276 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from collections import Counter, deque
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+
+# Histogram upper bounds in seconds, from feature encoding (tens of microseconds) to slow queries
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds, safe to update from many threads
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        # Prometheus buckets are "less than or equal"; the last slot is +Inf
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        Cumulative bucket counts (ending with +Inf), sum and count
+        """
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        return list(itertools.accumulate(counts)), total, count
+
+class _Span:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self) -> '_Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+NULL_SPAN = _NullSpan()
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Sequence[Tuple[str, Any]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """
+    In-process latency histograms and gauges rendered in the Prometheus text format.
+
+    ``span(name)`` times a block into the ``<namespace>_span_seconds``
+    histogram under ``span="<name>"``. While disabled it returns a shared
+    no-op context manager, so an instrumented call only pays for one
+    attribute check. Gauges are read from registered stats callables at
+    render time, so they cost nothing between scrapes.
+    """
+
+    def __init__(self, enabled: bool = True, namespace: str = 'agritech',
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, max_profiles: int = 50):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._spans: Dict[str, Histogram] = {}
+        self._stats: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+        self._profiles = deque(maxlen=max_profiles)
+        self._profile_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str = '', **labels: Any) -> Histogram:
+        """
+        The histogram for a metric name and label set, created on first use
+        """
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        series = self._histograms.get(name)
+        histogram = series.get(key) if series is not None else None
+        if histogram is None:
+            with self._lock:
+                series = self._histograms.setdefault(name, {})
+                histogram = series.setdefault(key, Histogram(self.buckets))
+                if help:
+                    self._help.setdefault(name, help)
+        return histogram
+
+    def observe(self, name: str, seconds: float, help: str = '', **labels: Any):
+        if self.enabled:
+            self.histogram(name, help, **labels).observe(seconds)
+
+    def span(self, name: str):
+        """
+        Context manager timing a block into the span histogram
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        histogram = self._spans.get(name)
+        if histogram is None:
+            histogram = self._spans[name] = self.histogram(
+                'span_seconds', 'Time spent in instrumented stages', span=name)
+        return _Span(histogram)
+
+    def timed(self, name: str) -> Callable:
+        """
+        Decorator timing every call of a function as a span
+        """
+        def decorate(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def register_stats(self, prefix: str, stats: Callable[[], Dict[str, Any]]):
+        """
+        Export the numeric entries of a stats() dict as ``<namespace>_<prefix>_<key>`` gauges
+        """
+        with self._lock:
+            self._stats.append((prefix, stats))
+
+    def add_profile(self, profile: Dict[str, Any], **info: Any) -> int:
+        profile_id = next(self._profile_ids)
+        self._profiles.append({'id': profile_id, **info, **profile})
+        return profile_id
+
+    def profiles(self) -> List[Dict[str, Any]]:
+        """
+        Recently captured request profiles, newest first
+        """
+        return list(reversed(self._profiles))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._spans.clear()
+            self._profiles.clear()
+
+    def render(self) -> str:
+        """
+        All histograms and gauges in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            stats = list(self._stats)
+
+        for name in sorted(histograms):
+            metric = f'{self.namespace}_{name}'
+            lines.append(f'# HELP {metric} {self._help.get(name, name)}')
+            lines.append(f'# TYPE {metric} histogram')
+            for labels, histogram in sorted(histograms[name].items()):
+                counts, total, count = histogram.snapshot()
+                bounds = [_format_value(float(b)) for b in histogram.buckets] + ['+Inf']
+                for bound, cumulative in zip(bounds, counts):
+                    lines.append(f'{metric}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{metric}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{metric}_count{_format_labels(labels)} {count}')
+
+        for prefix, source in stats:
+            for key, value in sorted(source().items()):
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                metric = f'{self.namespace}_{prefix}_{key}'
+                lines.append(f'# TYPE {metric} gauge')
+                lines.append(f'{metric} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread, such as the thread serving a request.
+
+    A helper thread reads the target's Python stack every ``interval``
+    seconds through ``sys._current_frames`` and counts it in collapsed form
+    ("file:function;file:function", root first), the input format of
+    flame graph tools. The target runs unmodified, so the cost is that of
+    the sampler thread only. Samples land when the sampler gets the GIL,
+    so long-running C calls that hold it show up as a single stack.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.001, max_depth: int = 64):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start = 0.0
+
+    def start(self) -> 'SamplingProfiler':
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._start
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def to_dict(self, top: int = 20) -> Dict[str, Any]:
+        """
+        Sample counts for the most frequent stacks and for the functions on top of them
+        """
+        functions: Counter = Counter()
+        for stack, count in self.stacks.items():
+            functions[stack.rsplit(';', 1)[-1]] += count
+        return {
+            'duration_ms': round(self.duration * 1000, 3),
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'functions': [{'function': name, 'samples': count} for name, count in functions.most_common(top)],
+            'stacks': [{'stack': stack, 'samples': count} for stack, count in self.stacks.most_common(top)]
+        }
+
+def metrics_from_env() -> Metrics:
+    """
+    Build the process metrics from METRICS_ENABLED (on unless set to 0)
+    """
+    return Metrics(enabled=os.environ.get('METRICS_ENABLED', '1') != '0')
+
+# Process-wide instance shared by the instrumented modules and /api/metrics
+metrics = metrics_from_env()
@@ -0,0 +1,247 @@
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+import numpy as np
+
+from core.compact_forest import CompactForest
+from core.forecasting import Forecasting, is_regression_forest
+from core.startup import lazy_import
+
+joblib = lazy_import('joblib')
+
+DEFAULT_REGISTRY_DIR = Path(__file__).resolve().parent.parent.parent / 'models' / 'registry'
+COMPACT_MODEL = 'demand_compact.joblib'
+# Id of the last crop_yields row an incrementally updated version includes
+LAST_YIELD_ID = 'last_yield_id'
+DEFAULT_KEY = ('default', 'default')
+
+@dataclass(frozen=True)
+class ModelEntry:
+    crop_type: str
+    region: str
+    version: str
+    forecaster: Forecasting
+    load_seconds: float
+    memory_bytes: int
+    loaded_at: float
+    last_yield_id: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'crop_type': self.crop_type,
+            'region': self.region,
+            'version': self.version,
+            'load_seconds': round(self.load_seconds, 6),
+            'memory_bytes': self.memory_bytes,
+            'loaded_at': self.loaded_at,
+            'last_yield_id': self.last_yield_id
+        }
+
+def estimate_memory(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    Approximate the memory held by a fitted model, counting NumPy buffers once
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(estimate_memory(item, seen) for item in obj.flat)
+        return size
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_memory(k, seen) + estimate_memory(v, seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_memory(item, seen) for item in obj)
+    if isinstance(obj, (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)):
+        return 0
+
+    # Fitted estimators (and Cython trees) expose their arrays through pickling state
+    try:
+        state = obj.__getstate__()
+    except Exception:
+        state = getattr(obj, '__dict__', None)
+    return sys.getsizeof(obj) + (estimate_memory(state, seen) if state is not None else 0)
+
+class ModelRegistry:
+    """
+    Process-wide registry of per-(crop, region) forecasting models.
+
+    Models are published to ``<root>/<crop>/<region>/<version>/`` and the
+    active version is named by the ``CURRENT`` file next to them. Publishing
+    renames a fully written version directory into place and then replaces
+    ``CURRENT`` atomically, so readers never see a partial model. A forest
+    demand model is stored with a CompactForest export that serves its
+    per-tree predictions for small batches. In-process lookups read an
+    immutable mapping that is swapped as a whole. The first lookup loads
+    every published model unless ``load_all`` ran before, so a server can
+    start without paying for them.
+    """
+
+    def __init__(self, root: Optional[str] = None, mmap_mode: Optional[str] = 'r'):
+        self.root = Path(root or os.environ.get('MODEL_REGISTRY_DIR', DEFAULT_REGISTRY_DIR))
+        self.mmap_mode = mmap_mode
+        self._entries: Dict[Tuple[str, str], ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key_dir(self, crop_type: str, region: str) -> Path:
+        return self.root / crop_type / region
+
+    def _read_current(self, crop_type: str, region: str) -> Optional[str]:
+        current = self._key_dir(crop_type, region) / 'CURRENT'
+        if not current.exists():
+            return None
+        return current.read_text().strip() or None
+
+    def _load_version(self, crop_type: str, region: str, version: str) -> ModelEntry:
+        version_dir = self._key_dir(crop_type, region) / version
+        start = time.perf_counter()
+        forecaster = Forecasting()
+        # Versions published before compact exports predict with the forest alone
+        compact_path = version_dir / COMPACT_MODEL
+        forecaster.load_models(
+            str(version_dir / 'yield_model.joblib'),
+            str(version_dir / 'demand_model.joblib'),
+            mmap_mode=self.mmap_mode,
+            compact_model_path=str(compact_path) if compact_path.exists() else None
+        )
+        load_seconds = time.perf_counter() - start
+        last_yield_id = version_dir / LAST_YIELD_ID
+
+        return ModelEntry(
+            crop_type=crop_type,
+            region=region,
+            version=version,
+            forecaster=forecaster,
+            load_seconds=load_seconds,
+            memory_bytes=(estimate_memory(forecaster.yield_model) + estimate_memory(forecaster.demand_model)
+                          + estimate_memory(forecaster.compact_demand_model)),
+            loaded_at=time.time(),
+            last_yield_id=int(last_yield_id.read_text()) if last_yield_id.exists() else None
+        )
+
+    def _swap(self, entry: ModelEntry):
+        with self._lock:
+            entries = dict(self._entries)
+            entries[(entry.crop_type, entry.region)] = entry
+            self._entries = entries
+
+    def _load_changed(self) -> List[ModelEntry]:
+        # Callers hold _load_lock; a version that fails to load is logged and skipped
+        loaded = []
+        for current in sorted(self.root.glob('*/*/CURRENT')) if self.root.exists() else []:
+            region_dir = current.parent
+            crop_type, region = region_dir.parent.name, region_dir.name
+            version = self._read_current(crop_type, region)
+            entry = self._entries.get((crop_type, region))
+            if version is None or (entry is not None and entry.version == version):
+                continue
+            try:
+                entry = self._load_version(crop_type, region, version)
+            except Exception as e:
+                logging.error(f'Failed to load model {crop_type}/{region}@{version}: {str(e)}')
+                continue
+            self._swap(entry)
+            loaded.append(entry)
+            logging.info(
+                f'Loaded model {crop_type}/{region}@{version} in {entry.load_seconds * 1000:.1f} ms '
+                f'({entry.memory_bytes / 1024:.0f} KiB)'
+            )
+        return loaded
+
+    def load_all(self) -> List[ModelEntry]:
+        """
+        Load the current version of every published model not already loaded
+        """
+        with self._load_lock:
+            loaded = self._load_changed()
+            self._loaded = True
+        return loaded
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load_all()
+
+    def refresh(self) -> List[ModelEntry]:
+        """
+        Hot-swap any model whose published version changed on disk
+        """
+        with self._load_lock:
+            return self._load_changed()
+
+    def publish(self, crop_type: str, region: str, yield_model: Any, demand_model: Any,
+                version: Optional[str] = None, compact_model: Optional[CompactForest] = None,
+                last_yield_id: Optional[int] = None) -> ModelEntry:
+        """
+        Write a new model version to disk and make it current. ``compact_model``
+        is an existing export of ``demand_model`` to reuse; without it a forest
+        is exported here. ``last_yield_id`` records the last crop_yields row an
+        incremental update applied.
+        """
+        version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        key_dir = self._key_dir(crop_type, region)
+        key_dir.mkdir(parents=True, exist_ok=True)
+        if compact_model is None and is_regression_forest(demand_model):
+            compact_model = CompactForest.from_forest(demand_model)
+
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f'.{version}-', dir=key_dir))
+        try:
+            joblib.dump(yield_model, tmp_dir / 'yield_model.joblib')
+            joblib.dump(demand_model, tmp_dir / 'demand_model.joblib')
+            if compact_model is not None:
+                joblib.dump(compact_model, tmp_dir / COMPACT_MODEL)
+            if last_yield_id is not None:
+                (tmp_dir / LAST_YIELD_ID).write_text(str(last_yield_id))
+            os.replace(tmp_dir, key_dir / version)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        fd, tmp_current = tempfile.mkstemp(prefix='.CURRENT-', dir=key_dir)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.replace(tmp_current, key_dir / 'CURRENT')
+
+        entry = self._load_version(crop_type, region, version)
+        self._swap(entry)
+        return entry
+
+    def entry(self, crop_type: str, region: str) -> Optional[ModelEntry]:
+        self.ensure_loaded()
+        return self._entries.get((crop_type, region))
+
+    def get(self, crop_type: str, region: str) -> Optional[Forecasting]:
+        entry = self.entry(crop_type, region)
+        return entry.forecaster if entry is not None else None
+
+    def resolve(self, crop_type: str, region: str) -> Optional[ModelEntry]:
+        """
+        Return the specialised entry for a crop/region, falling back to the default model
+        """
+        if not self._loaded:
+            self.ensure_loaded()
+        entries = self._entries
+        return entries.get((crop_type, region)) or entries.get(DEFAULT_KEY)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        self.ensure_loaded()
+        return [entry.to_dict() for entry in self._entries.values()]
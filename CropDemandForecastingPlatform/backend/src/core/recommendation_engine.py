@@ -1,8 +1,42 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Union
+from datetime import datetime
+import logging
+import threading
 import numpy as np
+from core.metrics import metrics
+from core.seasonal import SeasonalForecaster, SeasonalModel
+
+# Demand/supply ratio bands, in the order the advice checks them
+HIGH_DEMAND, OVERSUPPLY, BALANCED = 0, 1, 2
+HIGH_DEMAND_RATIO = 1.2
+OVERSUPPLY_RATIO = 0.8
+
+def ratio_band(ratio: float) -> int:
+    if ratio > HIGH_DEMAND_RATIO:
+        return HIGH_DEMAND
+    if ratio < OVERSUPPLY_RATIO:
+        return OVERSUPPLY
+    return BALANCED
 
 class RecommendationEngine:
-    def __init__(self):
+    """
+    Rule-based planting, selling and distribution advice.
+
+    Everything except the yield/demand figures depends only on the crop, the
+    current month and the demand/supply ratio band, so the advice is
+    precomputed at start-up into a table indexed by (crop, month, band).
+    Shared lists inside the returned dictionaries must be treated as read-only.
+
+    With a SeasonalForecaster, peak months and price/demand trends come from
+    the fitted price and demand series. They replace the defaults below
+    whenever a seasonal model is installed: the forecaster calls
+    ``use_model`` on the thread that fitted or updated it, which rebuilds
+    the table and swaps it in. Lookups never fit or rebuild anything;
+    ``refresh_conditions`` fits the seasonal model ahead of them at warmup.
+    """
+
+    def __init__(self, seasonal: Optional[SeasonalForecaster] = None):
+        # Defaults for crops without history; storage life and best regions are not in the data
         self.market_conditions = {
             'wheat': {
                 'peak_months': [6, 7, 8],
@@ -49,24 +83,59 @@ class RecommendationEngine:
             'central': ['Madhya Pradesh Mandi', 'Chhattisgarh Agricultural Market', 'UP Trading Center']
         }
 
-    def get_recommendation(self, crop_type: str, predicted_yield: float, predicted_demand: float) -> Dict[str, Any]:
+        self.seasonal = seasonal
+        self._seasonal_version = None
+        self._refresh_lock = threading.Lock()
+        self.table = self._build_table()
+        if seasonal is not None:
+            seasonal.add_listener(self.use_model)
+
+    def _build_table(self) -> Dict[str, List[List[Dict[str, Any]]]]:
+        return {
+            crop_type: [[self._build_entry(crop_type, month, band) for band in (HIGH_DEMAND, OVERSUPPLY, BALANCED)]
+                        for month in range(1, 13)]
+            for crop_type in self.market_conditions
+        }
+
+    def refresh_conditions(self):
         """
-        Generate comprehensive recommendations including what to grow, when to sell, and where to distribute
+        Fit or load the seasonal model if needed; installing it updates the conditions through use_model
+        """
+        if self.seasonal is not None:
+            self.seasonal.model()
+
+    def use_model(self, model: SeasonalModel, version: int):
+        """
+        Take peak months and trends from a seasonal model and rebuild the advice table
+        """
+        with self._refresh_lock:
+            if self._seasonal_version is not None and version <= self._seasonal_version:
+                return
+            derived = model.market_conditions()
+            conditions = {crop_type: dict(info) for crop_type, info in self.market_conditions.items()}
+            for crop_type, info in derived.items():
+                conditions.setdefault(crop_type, {}).update(info)
+            self.market_conditions = conditions
+            self.table = self._build_table()
+            self._seasonal_version = version
+            logging.info(f'Market conditions derived from seasonal model version {version}')
+
+    def _build_entry(self, crop_type: str, current_month: int, band: int) -> Dict[str, Any]:
+        """
+        Advice for one (crop, month, ratio band) cell
         """
-        current_month = datetime.now().month
-        ratio = predicted_demand / predicted_yield if predicted_yield > 0 else 0
         crop_info = self.market_conditions.get(crop_type, {})
-        
+
         # Calculate months until peak season
         peak_months = crop_info.get('peak_months', [])
         next_peak = next((m for m in peak_months if m >= current_month), peak_months[0] if peak_months else current_month)
         months_to_peak = (next_peak - current_month) % 12
 
         # Generate planting recommendation
-        if ratio > 1.2:
+        if band == HIGH_DEMAND:
             planting_advice = f"High demand expected for {crop_type}. Recommended to increase production."
             confidence = 0.9
-        elif ratio < 0.8:
+        elif band == OVERSUPPLY:
             planting_advice = f"Market may be oversupplied for {crop_type}. Consider diversifying crops or reducing production."
             confidence = 0.8
         else:
@@ -93,7 +162,7 @@ class RecommendationEngine:
 
         # Generate distribution recommendation
         recommended_markets = []
-        if ratio > 1.2:
+        if band == HIGH_DEMAND:
             # High demand - recommend distant markets with better prices
             for region, markets in self.regional_markets.items():
                 if region not in crop_info.get('best_regions', []):
@@ -120,12 +189,63 @@ class RecommendationEngine:
             },
             "distribution_strategy": {
                 "recommended_markets": recommended_markets,
-                "transportation_tips": "Consider bulk transport to reduce costs" if ratio > 1.2 else "Focus on local markets to minimize transportation costs"
+                "transportation_tips": "Consider bulk transport to reduce costs" if band == HIGH_DEMAND else "Focus on local markets to minimize transportation costs"
             },
+            "market_insights": market_insights
+        }
+
+    def lookup(self, crop_type: str, month: int, band: int) -> Dict[str, Any]:
+        rows = self.table.get(crop_type)
+        if rows is None:
+            # Unknown crops get generic advice that names the crop; not cached so input cannot grow the table
+            return self._build_entry(crop_type, month, band)
+        return rows[month - 1][band]
+
+    @staticmethod
+    def _assemble(entry: Dict[str, Any], ratio: float, predicted_yield: float, predicted_demand: float) -> Dict[str, Any]:
+        return {
+            "planting_recommendation": entry["planting_recommendation"],
+            "selling_strategy": entry["selling_strategy"],
+            "distribution_strategy": entry["distribution_strategy"],
             "market_analysis": {
                 "demand_supply_ratio": float(ratio),
                 "predicted_yield": float(predicted_yield),
                 "predicted_demand": float(predicted_demand),
-                "market_insights": market_insights
+                "market_insights": entry["market_insights"]
             }
-        }
\ No newline at end of file
+        }
+
+    def get_recommendation(self, crop_type: str, predicted_yield: float, predicted_demand: float,
+                           month: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Generate comprehensive recommendations including what to grow, when to sell, and where to distribute
+        """
+        with metrics.span('recommendation'):
+            month = month or datetime.now().month
+            ratio = predicted_demand / predicted_yield if predicted_yield > 0 else 0
+            return self._assemble(self.lookup(crop_type, month, ratio_band(ratio)), ratio, predicted_yield, predicted_demand)
+
+    @metrics.timed('recommendation.batch')
+    def get_recommendations_batch(self, crop_types: Union[str, Sequence[str]], predicted_yields: Sequence[float],
+                                  predicted_demands: Sequence[float], month: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Recommendations for arrays of yields and demands; ratios and bands are computed in one vectorized pass
+        """
+        month = month or datetime.now().month
+        yields = np.asarray(predicted_yields, dtype=np.float64)
+        demands = np.asarray(predicted_demands, dtype=np.float64)
+        if isinstance(crop_types, str):
+            crop_types = [crop_types] * len(yields)
+        if not (len(crop_types) == len(yields) == len(demands)):
+            raise ValueError("crop_types, predicted_yields and predicted_demands must have the same length")
+
+        positive = yields > 0
+        ratios = np.divide(demands, yields, out=np.zeros_like(demands), where=positive)
+        bands = np.where(ratios > HIGH_DEMAND_RATIO, HIGH_DEMAND,
+                         np.where(ratios < OVERSUPPLY_RATIO, OVERSUPPLY, BALANCED))
+
+        return [
+            self._assemble(self.lookup(crop_type, month, band), ratio, y, d)
+            for crop_type, band, ratio, y, d in zip(crop_types, bands.tolist(), ratios.tolist(),
+                                                    yields.tolist(), demands.tolist())
+        ]
@@ -0,0 +1,159 @@
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+def cache_key(crop_type: str, region: str, model_version: Optional[str], features: Dict[str, Any]) -> str:
+    """
+    Stable key for a forecast: crop, region, model version and a digest of the feature snapshot
+    """
+    snapshot = json.dumps(features or {}, sort_keys=True, default=str, separators=(',', ':'))
+    digest = hashlib.sha1(snapshot.encode('utf-8')).hexdigest()
+    return f'{crop_type}|{region}|{model_version or "demo"}|{digest}'
+
+class SQLiteCacheBackend:
+    """
+    Shared second-level cache in a SQLite file so several workers reuse warm entries.
+
+    Values are stored as JSON with an absolute (wall clock) expiry, since
+    monotonic clocks are not comparable across processes. Writes delete the
+    expired rows at most once every ``purge_interval`` seconds per process,
+    keeping the table bounded by what is written within a TTL.
+    """
+
+    def __init__(self, path: str, purge_interval: float = 60.0):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._next_purge = time.monotonic() + purge_interval
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS forecast_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_forecast_cache_expires ON forecast_cache (expires_at)')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM forecast_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return row[1], json.loads(row[0])
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO forecast_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, json.dumps(value), expires_at))
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_interval
+            self.purge()
+
+    def purge(self) -> int:
+        with self._connection() as conn:
+            return conn.execute('DELETE FROM forecast_cache WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM forecast_cache')
+
+class ForecastCache:
+    """
+    Memoized forecast responses with a TTL and bounded LRU eviction.
+
+    Keys come from ``cache_key`` and include the model version, so publishing
+    or hot-swapping a model makes the old entries unreachable; they age out
+    through the LRU. An optional ``backend`` (``SQLiteCacheBackend``) is
+    consulted on a local miss and written through on every store, letting
+    workers share results. Cached values are treated as read-only.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1024, backend: Optional[SQLiteCacheBackend] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'shared_hits': 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+        if self.backend is not None:
+            shared = self.backend.get(key)
+            if shared is not None:
+                expires_at, value = shared
+                self._store(key, value, time.monotonic() + (expires_at - time.time()))
+                with self._lock:
+                    self._stats['hits'] += 1
+                    self._stats['shared_hits'] += 1
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def set(self, key: str, value: Any):
+        self._store(key, value, time.monotonic() + self.ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, time.time() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {**self._stats, 'size': len(self._entries), 'max_entries': self.max_entries,
+                    'ttl': self.ttl, 'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                    'shared': self.backend is not None}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def cache_from_env() -> ForecastCache:
+    """
+    Build the forecast cache from FORECAST_CACHE_TTL, FORECAST_CACHE_SIZE and FORECAST_CACHE_PATH
+    """
+    path = os.environ.get('FORECAST_CACHE_PATH')
+    return ForecastCache(
+        ttl=float(os.environ.get('FORECAST_CACHE_TTL', 300)),
+        max_entries=int(os.environ.get('FORECAST_CACHE_SIZE', 1024)),
+        backend=SQLiteCacheBackend(path) if path else None
+    )
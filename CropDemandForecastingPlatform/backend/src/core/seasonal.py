@@ -0,0 +1,506 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import calendar
+import csv
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from core.ingestion import DATA_DIR, HISTORICAL_DIR
+
+SEASONAL_MODEL_PATH = DATA_DIR / 'processed' / 'seasonal_model.npz'
+
+# Modelled measures and the historical file and column each is read from
+MEASURES = OrderedDict([
+    ('price', ('market_prices.csv', 'price')),
+    ('yield', ('crop_yields.csv', 'yield')),
+    ('demand', ('crop_yields.csv', 'demand')),
+])
+
+# Smoothing parameters searched for every series: level, trend and seasonal index
+ALPHAS = (0.01, 0.03, 0.1, 0.3)
+BETAS = (0.0, 0.0003, 0.003)
+GAMMAS = (0.01, 0.03, 0.1, 0.3)
+# Trend damping per day; a trend adds at most DAMPING / (1 - DAMPING) days of slope to any forecast
+DAMPING = 0.999
+# Days at the start of the history that set the initial level and are left out of the fitting error
+BURN_IN = 30
+# Forecast change over TREND_HORIZON days, relative to the level, above which a trend is reported
+TREND_HORIZON = 90
+TREND_THRESHOLD = 0.02
+
+# Observations per measure: parallel crop_type, region, day (since the Unix epoch) and value arrays
+History = Dict[str, Dict[str, np.ndarray]]
+
+class SeasonalUnavailable(Exception):
+    """Raised when there is no seasonal model to forecast from"""
+
+def month_of(days: Any) -> np.ndarray:
+    """
+    Month of year (0-11) of days since the Unix epoch
+    """
+    return np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12
+
+def read_history(source_dir: Optional[str] = None) -> History:
+    """
+    Daily observations of every measure from the historical CSVs
+    """
+    source_dir = Path(source_dir or HISTORICAL_DIR)
+    files: Dict[str, Dict[str, List[str]]] = {}
+    history: History = {}
+    for measure, (source, column) in MEASURES.items():
+        if source not in files:
+            with open(source_dir / source, newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                files[source] = dict(zip(header, zip(*reader)))
+        columns = files[source]
+        history[measure] = {
+            'crop_type': np.array(columns['crop_type']),
+            'region': np.array(columns['region']),
+            'day': np.array(columns['date'], dtype='datetime64[D]').astype(np.int64),
+            'value': np.array([value or 'nan' for value in columns[column]], dtype=np.float64),
+        }
+    return history
+
+def history_from_frame(frame: Any, columns: Optional[Dict[str, str]] = None) -> History:
+    """
+    Observations from a DataFrame with date, crop_type and region columns and one column per measure
+    """
+    columns = columns or {measure: measure for measure in MEASURES}
+    base = {
+        'crop_type': frame['crop_type'].to_numpy(dtype=str),
+        'region': frame['region'].to_numpy(dtype=str),
+        'day': frame['date'].to_numpy().astype('datetime64[D]').astype(np.int64),
+    }
+    return {measure: {**base, 'value': frame[column].to_numpy(dtype=np.float64)}
+            for measure, column in columns.items() if column in frame}
+
+def _key_names(crop_types: np.ndarray, regions: np.ndarray) -> np.ndarray:
+    return np.char.add(np.char.add(crop_types.astype(str), '\x00'), regions.astype(str))
+
+def _dense(history: History, names: np.ndarray, start_day: int, n_days: int) -> np.ndarray:
+    """
+    (measures, keys, days) array of daily means from ``start_day``, NaN where a day has no observation.
+    ``names`` are the sorted key names; observations of other keys or days are dropped.
+    """
+    n_keys = len(names)
+    size = len(MEASURES) * n_keys * n_days
+    sums = np.zeros(size)
+    counts = np.zeros(size)
+    for m, measure in enumerate(MEASURES):
+        observations = history.get(measure)
+        if observations is None or not len(observations['value']) or not n_keys:
+            continue
+        rows = _key_names(observations['crop_type'], observations['region'])
+        keys = np.minimum(np.searchsorted(names, rows), n_keys - 1)
+        offsets = observations['day'] - start_day
+        valid = ((names[keys] == rows) & (offsets >= 0) & (offsets < n_days)
+                 & ~np.isnan(observations['value']))
+        flat = (m * n_keys + keys[valid]) * n_days + offsets[valid]
+        sums += np.bincount(flat, weights=observations['value'][valid], minlength=size)
+        counts += np.bincount(flat, minlength=size)
+    with np.errstate(invalid='ignore'):
+        return (sums / counts).reshape(len(MEASURES), n_keys, n_days)
+
+def smooth(Y: np.ndarray, months: np.ndarray, level: np.ndarray, trend: np.ndarray, season: np.ndarray,
+           alpha: Any, beta: Any, gamma: Any, burn_in: int = 0,
+           active: Optional[np.ndarray] = None) -> Tuple[np.ndarray, ...]:
+    """
+    Run the damped additive Holt-Winters recursion over the days (last axis) of Y.
+
+    Every other axis is a batch of independent series: level and trend have
+    Y's shape without the day axis (or one that broadcasts against it, such
+    as a leading axis of parameter sets), season has 12 monthly indexes
+    after it, and the parameters broadcast against level. The loop runs over
+    days only. Days without an observation (NaN) carry the state forward.
+    ``active``, a boolean array shaped like Y, leaves a series' state as it
+    is on the days where it is False. Returns the final level, trend and season, and the sum and count of
+    one-step errors after ``burn_in`` days.
+    """
+    shape = np.broadcast_shapes(np.shape(level), np.shape(trend), np.shape(season)[:-1],
+                                np.shape(alpha), np.shape(beta), np.shape(gamma))
+    level = np.broadcast_to(np.asarray(level, dtype=np.float64), shape).copy()
+    trend = np.broadcast_to(np.asarray(trend, dtype=np.float64), shape).copy()
+    season = np.broadcast_to(np.asarray(season, dtype=np.float64), shape + (12,)).copy()
+    sse = np.zeros(level.shape)
+    n = np.zeros(level.shape)
+    for t in range(Y.shape[-1]):
+        month = months[t]
+        error = Y[..., t] - (level + DAMPING * trend + season[..., month])
+        observed = ~np.isnan(error)
+        error = np.where(observed, error, 0.0)
+        if t >= burn_in:
+            sse += error * error
+            n += observed
+        if active is None:
+            level += DAMPING * trend + alpha * error
+            trend *= DAMPING
+        else:
+            level += np.where(active[..., t], DAMPING * trend, 0.0) + alpha * error
+            trend *= np.where(active[..., t], DAMPING, 1.0)
+        trend += beta * error
+        season[..., month] += gamma * error
+    # Keep the indexes centred on zero so the level alone carries the series mean
+    shift = season.mean(axis=-1)
+    return level + shift, trend, season - shift[..., None], sse, n
+
+def _initial_state(Y: np.ndarray, months: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Starting level, trend and monthly indexes of every series from its first year.
+
+    A line plus two annual harmonics is fitted by least squares to each
+    series at once (batched normal equations with each series' missing days
+    weighted out). The harmonics keep the seasonal swing from being taken
+    for a trend when only one year is available. The monthly indexes are
+    the mean residuals from the line in each month.
+    """
+    days = min(Y.shape[-1], 366)
+    t = np.arange(days, dtype=np.float64)
+    angle = 2 * np.pi * t / 365.25
+    X = np.column_stack([np.ones(days), t, np.cos(angle), np.sin(angle), np.cos(2 * angle), np.sin(2 * angle)])
+    observed = ~np.isnan(Y[..., :days])
+    values = np.where(observed, Y[..., :days], 0.0)
+    weights = observed.astype(np.float64)
+    gram = np.einsum('...t,ti,tj->...ij', weights, X, X) + 1e-9 * np.eye(X.shape[1])
+    coef = np.linalg.solve(gram, np.einsum('...t,ti->...i', values, X)[..., None])[..., 0]
+    intercept, slope = coef[..., 0], coef[..., 1]
+
+    onehot = (months[:days, None] == np.arange(12)).astype(np.float64)
+    residuals = np.where(observed, values - intercept[..., None] - slope[..., None] * t, 0.0)
+    counts = weights @ onehot
+    with np.errstate(invalid='ignore', divide='ignore'):
+        monthly = (residuals @ onehot) / counts
+    # Indexes are centred over the observed months; months never observed get none
+    seen = counts > 0
+    shift = np.where(seen, monthly, 0.0).sum(axis=-1) / np.maximum(seen.sum(axis=-1), 1)
+    season = np.where(seen, monthly - shift[..., None], 0.0)
+    # The recursion's first forecast is level + trend, which should be the line at day 0
+    return intercept - slope + shift, slope, season
+
+class SeasonalModel:
+    """
+    Damped Holt-Winters models of daily price, yield and demand for every (crop, region).
+
+    Each series has a level, a damped trend and an additive seasonal index
+    per calendar month, so a single year of history is enough to start.
+    Every series is fitted in the same pass: the recursion steps through
+    the days once with arrays over all (parameter set, measure, crop,
+    region) combinations, and each series keeps the parameters with the
+    smallest one-step error. ``updated`` continues each series' recursion
+    over the days after its own last observed day only, so new observations
+    cost nothing per day of history, and a day reported in several batches
+    is applied key by key. ``last_days`` holds each series' state day and
+    ``last_day`` the latest of them. State arrays are indexed (measure, key)
+    and never modified; updates return a new model.
+    """
+
+    def __init__(self, keys: Sequence[Tuple[str, str]], last_day: int, level: np.ndarray, trend: np.ndarray,
+                 season: np.ndarray, params: np.ndarray, rmse: np.ndarray, observations: np.ndarray,
+                 last_days: Optional[np.ndarray] = None):
+        self.keys = [tuple(key) for key in keys]
+        self.names = _key_names(np.array([k[0] for k in self.keys], dtype=str),
+                                np.array([k[1] for k in self.keys], dtype=str))
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.last_day = int(last_day)
+        self.last_days = (np.full(np.shape(level), self.last_day, dtype=np.int64) if last_days is None
+                          else np.asarray(last_days, dtype=np.int64))
+        self.level = level
+        self.trend = trend
+        self.season = season
+        self.params = params  # (measure, key, [alpha, beta, gamma])
+        self.rmse = rmse
+        self.observations = observations
+
+    @classmethod
+    def fit(cls, history: History) -> 'SeasonalModel':
+        """
+        Fit every series in ``history``, choosing each one's smoothing parameters from the grid
+        """
+        pairs = set()
+        days = []
+        for observations in history.values():
+            pairs.update(zip(observations['crop_type'].tolist(), observations['region'].tolist()))
+            days.append(observations['day'])
+        if not pairs:
+            raise ValueError("No observations to fit")
+        keys = sorted(pairs)
+        days = np.concatenate(days)
+        start_day, last_day = int(days.min()), int(days.max())
+        names = _key_names(np.array([k[0] for k in keys]), np.array([k[1] for k in keys]))
+
+        Y = _dense(history, names, start_day, last_day - start_day + 1)
+        months = month_of(np.arange(start_day, last_day + 1))
+        level, trend, season = _initial_state(Y, months)
+
+        grid = np.array([(a, b, g) for a in ALPHAS for b in BETAS for g in GAMMAS])
+        shape = (len(grid), 1, 1)
+        level, trend, season, sse, n = smooth(Y, months, level, trend, season, grid[:, 0].reshape(shape),
+                                              grid[:, 1].reshape(shape), grid[:, 2].reshape(shape), BURN_IN)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mse = np.where(n > 0, sse / n, np.inf)
+        best = mse.argmin(axis=0)
+
+        def pick(values: np.ndarray) -> np.ndarray:
+            # The entry of each series' best parameter set along the leading grid axis
+            index = best.reshape((1,) + best.shape + (1,) * (values.ndim - best.ndim - 1))
+            return np.take_along_axis(values, index, axis=0)[0]
+
+        rmse = np.sqrt(pick(mse))
+        return cls(keys, last_day, pick(level), pick(trend), pick(season), grid[best],
+                   np.where(np.isfinite(rmse), rmse, np.nan), (~np.isnan(Y)).sum(axis=-1))
+
+    def updated(self, history: History) -> Tuple['SeasonalModel', int]:
+        """
+        The model advanced over the new days in ``history``, and the number of days the recursion ran over.
+
+        Each series takes its observations after its own entry of ``last_days``
+        and moves up to the last of them, so a key reported later for a day
+        another key already reported is still applied. Observations on or
+        before a series' day and of keys the model was not fitted on are ignored.
+        """
+        ends = [int(obs['day'].max()) for obs in history.values() if len(obs['day'])]
+        start = int(self.last_days.min()) + 1 if self.last_days.size else self.last_day + 1
+        end = max(ends) if ends else self.last_day
+        if end < start:
+            return self, 0
+        days = np.arange(start, end + 1)
+        Y = _dense(history, self.names, start, len(days))
+        Y[days <= self.last_days[..., None]] = np.nan
+        observed = ~np.isnan(Y)
+        if not observed.any():
+            return self, 0
+        # Skip the leading days no series has anything new for
+        first = int(observed.any(axis=(0, 1)).argmax())
+        days, Y, observed = days[first:], Y[..., first:], observed[..., first:]
+        last_days = np.where(observed.any(axis=-1), days[len(days) - 1 - observed[..., ::-1].argmax(axis=-1)],
+                             self.last_days)
+        active = (days > self.last_days[..., None]) & (days <= last_days[..., None])
+        level, trend, season, sse, n = smooth(Y, month_of(days), self.level, self.trend, self.season,
+                                              self.params[..., 0], self.params[..., 1], self.params[..., 2],
+                                              active=active)
+        # Running RMSE over all observed one-step errors
+        total = self.observations + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rmse = np.sqrt(np.where(total > 0, (np.nan_to_num(self.rmse) ** 2 * self.observations + sse) / total,
+                                    np.nan))
+        return (SeasonalModel(self.keys, max(self.last_day, int(last_days.max())), level, trend, season,
+                              self.params, rmse, total, last_days), len(days))
+
+    def rows(self, crop_type: str, region: Optional[str] = None) -> np.ndarray:
+        """
+        Key indexes for a crop and region; every region of the crop, or every key, when there is no exact match
+        """
+        if region is not None and (crop_type, region) in self.index:
+            return np.array([self.index[(crop_type, region)]])
+        rows = [i for i, key in enumerate(self.keys) if key[0] == crop_type]
+        return np.array(rows) if rows else np.arange(len(self.keys))
+
+    def forecast_all(self, horizon: int) -> np.ndarray:
+        """
+        (measure, key, day) forecasts for the ``horizon`` days after ``last_day``; series whose own last
+        day is earlier are forecast over the extra days too
+        """
+        days = np.arange(1, horizon + 1)
+        steps = (self.last_day - self.last_days)[..., None] + days
+        damped = DAMPING * (1 - DAMPING ** steps) / (1 - DAMPING)
+        months = month_of(self.last_day + days)
+        return self.level[..., None] + self.trend[..., None] * damped + self.season[..., months]
+
+    def forecast(self, crop_type: str, region: Optional[str] = None, horizon: int = 30) -> Dict[str, np.ndarray]:
+        """
+        Daily forecasts of each measure for the ``horizon`` days after ``last_day``, averaged over matching keys
+        """
+        rows = self.rows(crop_type, region)
+        forecasts = self.forecast_all(horizon)[:, rows].mean(axis=1)
+        return {measure: forecasts[m] for m, measure in enumerate(MEASURES)}
+
+    def seasonal_profile(self, crop_type: str, measure: str = 'price', region: Optional[str] = None) -> np.ndarray:
+        """
+        Monthly indexes of a measure relative to its level, averaged over matching keys
+        """
+        m = list(MEASURES).index(measure)
+        rows = self.rows(crop_type, region)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            relative = self.season[m, rows] / np.abs(self.level[m, rows])[:, None]
+        return np.nan_to_num(relative).mean(axis=0)
+
+    def peak_months(self, crop_type: str, region: Optional[str] = None, n: int = 3, measure: str = 'price') -> List[int]:
+        """
+        The ``n`` calendar months (1-12, ascending) with the highest seasonal index of a measure
+        """
+        profile = self.seasonal_profile(crop_type, measure, region)
+        return sorted(int(m) + 1 for m in np.argsort(-profile, kind='stable')[:n])
+
+    def relative_change(self, crop_type: str, measure: str, region: Optional[str] = None,
+                        horizon: int = TREND_HORIZON) -> float:
+        """
+        Change of the deseasonalised forecast over ``horizon`` days, relative to the current level
+        """
+        m = list(MEASURES).index(measure)
+        rows = self.rows(crop_type, region)
+        damped = DAMPING * (1 - DAMPING ** horizon) / (1 - DAMPING)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change = self.trend[m, rows] * damped / np.abs(self.level[m, rows])
+        return float(np.nan_to_num(change).mean())
+
+    def trend_direction(self, crop_type: str, measure: str, region: Optional[str] = None) -> str:
+        change = self.relative_change(crop_type, measure, region)
+        if change > TREND_THRESHOLD:
+            return 'increasing'
+        if change < -TREND_THRESHOLD:
+            return 'decreasing'
+        return 'stable'
+
+    def market_conditions(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Price peak months and price/demand trend directions of every crop, over all its regions
+        """
+        return {
+            crop_type: {
+                'peak_months': self.peak_months(crop_type),
+                'price_trend': self.trend_direction(crop_type, 'price'),
+                'demand_trend': self.trend_direction(crop_type, 'demand'),
+            }
+            for crop_type in sorted({key[0] for key in self.keys})
+        }
+
+    def save(self, path: str):
+        """
+        Write the fitted state to an .npz file, replacing any previous one atomically
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f'.{path.stem}-', suffix='.npz', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, keys=np.array(json.dumps(self.keys)), measures=np.array(json.dumps(list(MEASURES))),
+                         last_day=self.last_day, level=self.level, trend=self.trend, season=self.season,
+                         params=self.params, rmse=self.rmse, observations=self.observations,
+                         last_days=self.last_days)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'SeasonalModel':
+        with np.load(path) as data:
+            if json.loads(str(data['measures'])) != list(MEASURES):
+                raise ValueError(f"{path} was fitted for other measures")
+            return cls(json.loads(str(data['keys'])), int(data['last_day']), data['level'], data['trend'],
+                       data['season'], data['params'], data['rmse'], data['observations'],
+                       data['last_days'] if 'last_days' in data.files else None)
+
+class SeasonalForecaster:
+    """
+    The process's SeasonalModel: loaded from its cache file or fitted from the history on first use.
+
+    The fitted state is saved after the fit and after every update, so a
+    restart resumes from the last applied day without refitting. Updates
+    swap in a new model, so readers never see a half-updated one, and bump
+    ``version``. Listeners added with ``add_listener`` are called with each
+    model installed, on the thread that fitted, loaded or updated it, so
+    dependants rebuild off the request path.
+    """
+
+    def __init__(self, path: Optional[str] = None, source_dir: Optional[str] = None):
+        self.path = Path(path or os.environ.get('SEASONAL_MODEL_PATH', SEASONAL_MODEL_PATH))
+        self.source_dir = source_dir
+        self.version = 0
+        self._model: Optional[SeasonalModel] = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[SeasonalModel, int], None]] = []
+        self._stats = {'fit_seconds': 0.0, 'updates': 0, 'days_applied': 0}
+
+    def add_listener(self, listener: Callable[[SeasonalModel, int], None]):
+        """
+        Call ``listener(model, version)`` with every model installed from now on, and with the current one
+        """
+        self._listeners.append(listener)
+        model, version = self._model, self.version
+        if model is not None:
+            listener(model, version)
+
+    def model(self) -> Optional[SeasonalModel]:
+        """
+        The current model, loading or fitting it first if needed; None when there is no history
+        """
+        if self._model is None and not self._failed:
+            self.ensure_fitted()
+        return self._model
+
+    def ensure_fitted(self):
+        with self._lock:
+            if self._model is not None:
+                return
+            if self.path.exists():
+                try:
+                    self._install(SeasonalModel.load(str(self.path)))
+                    logging.info(f'Loaded seasonal models for {len(self._model.keys)} series from {self.path}')
+                    return
+                except (OSError, ValueError, KeyError) as e:
+                    logging.warning(f'Refitting seasonal models, cannot load {self.path}: {str(e)}')
+            try:
+                self.refit()
+            except (OSError, ValueError) as e:
+                self._failed = True
+                logging.warning(f'No seasonal models: {str(e)}')
+
+    def refit(self) -> SeasonalModel:
+        """
+        Fit from the historical files and save the result
+        """
+        start = time.perf_counter()
+        model = SeasonalModel.fit(read_history(self.source_dir))
+        self._stats['fit_seconds'] = time.perf_counter() - start
+        self._save(model)
+        self._install(model)
+        logging.info(f"Fitted seasonal models for {len(model.keys)} series in {self._stats['fit_seconds'] * 1000:.0f} ms")
+        return model
+
+    def update(self, history: History) -> int:
+        """
+        Apply the days after each series' last day; returns the number of days applied
+        """
+        model = self.model()
+        if model is None:
+            return 0
+        with self._lock:
+            model, days = self._model.updated(history)
+            if days:
+                self._save(model)
+                self._install(model)
+                self._stats['updates'] += 1
+                self._stats['days_applied'] += days
+        return days
+
+    def _install(self, model: SeasonalModel):
+        self._model = model
+        self._failed = False
+        self.version += 1
+        for listener in list(self._listeners):
+            try:
+                listener(model, self.version)
+            except Exception as e:
+                logging.error(f'Seasonal model listener failed: {str(e)}')
+
+    def _save(self, model: SeasonalModel):
+        try:
+            model.save(str(self.path))
+        except OSError as e:
+            logging.warning(f'Could not save seasonal models to {self.path}: {str(e)}')
+
+    def stats(self) -> Dict[str, Any]:
+        model = self._model
+        return {**self._stats, 'fitted': model is not None, 'version': self.version,
+                'series': model.level.size if model is not None else 0,
+                'last_day': model.last_day if model is not None else 0}
+
+def month_names(months: Sequence[int]) -> List[str]:
+    return [calendar.month_name[m] for m in months]
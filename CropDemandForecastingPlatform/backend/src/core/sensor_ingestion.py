@@ -0,0 +1,313 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+import numpy as np
+
+SENSOR_FIELDS = ['temperature', 'humidity', 'soil_moisture', 'soil_ph', 'light_intensity']
+
+# Aggregates that Forecasting takes as features
+FEATURE_FIELDS = ['humidity', 'soil_moisture']
+
+class SensorBackpressure(Exception):
+    """Raised when too many readings are waiting to be written"""
+
+def parse_reading(reading: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate one reading; the region defaults to the location prefix (``north_field_1`` -> ``north``)
+    """
+    if not isinstance(reading, dict):
+        raise ValueError("Reading must be an object")
+    if not reading.get('sensor_id') or not reading.get('timestamp'):
+        raise ValueError("Reading requires sensor_id and timestamp")
+    region = reading.get('region') or str(reading.get('location', '')).split('_', 1)[0]
+    if not region:
+        raise ValueError("Reading requires a region or location")
+
+    try:
+        timestamp = datetime.fromisoformat(str(reading['timestamp']))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {reading['timestamp']}")
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    parsed = {'sensor_id': str(reading['sensor_id']), 'region': region,
+              'timestamp': timestamp.isoformat(timespec='seconds')}
+    for field in SENSOR_FIELDS:
+        value = reading.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"Sensor field '{field}' must be numeric")
+        parsed[field] = value
+    return parsed
+
+def parse_lines(lines: Iterable[bytes]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Parse line-delimited JSON readings; returns the valid readings and the number of rejected lines
+    """
+    readings, rejected = [], 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            readings.append(parse_reading(json.loads(line)))
+        except ValueError:
+            rejected += 1
+    return readings, rejected
+
+class WindowAggregator:
+    """
+    Per-region tumbling-window means of the sensor fields.
+
+    Windows are ``window_seconds`` long and aligned to the epoch; the newest
+    ``max_windows`` windows of each region are kept. Batches are folded in
+    with one vectorized pass (``np.add.at`` over region/window keys), and
+    readings older than every retained window are counted as late and dropped.
+    """
+
+    def __init__(self, window_seconds: int = 300, max_windows: int = 12):
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+        self._windows: Dict[str, 'OrderedDict[int, np.ndarray]'] = {}
+        self._lock = threading.Lock()
+        self.late = 0
+
+    def add_batch(self, readings: List[Dict[str, Any]]):
+        if not readings:
+            return
+        regions = [r['region'] for r in readings]
+        names = sorted(set(regions))
+        lookup = {name: i for i, name in enumerate(names)}
+        codes = np.array([lookup[r] for r in regions], dtype=np.int64)
+        seconds = np.array([r['timestamp'] for r in readings], dtype='datetime64[s]').astype(np.int64)
+        windows = seconds // self.window_seconds * self.window_seconds
+        values = np.array([[r[f] if r[f] is not None else np.nan for f in SENSOR_FIELDS] for r in readings],
+                          dtype=np.float64)
+
+        keys, inverse = np.unique(np.stack([codes, windows], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        present = ~np.isnan(values)
+        # Per key: reading count, then a (count, sum) pair per field
+        totals = np.zeros((len(keys), 1 + 2 * len(SENSOR_FIELDS)))
+        np.add.at(totals[:, 0], inverse, 1)
+        np.add.at(totals[:, 1::2], inverse, present)
+        np.add.at(totals[:, 2::2], inverse, np.where(present, values, 0.0))
+
+        with self._lock:
+            for (code, window), total in zip(keys.tolist(), totals):
+                region_windows = self._windows.setdefault(names[code], OrderedDict())
+                if window in region_windows:
+                    region_windows[window] += total
+                    continue
+                if len(region_windows) >= self.max_windows and window < next(iter(region_windows)):
+                    self.late += int(total[0])
+                    continue
+                region_windows[window] = total.copy()
+                if len(region_windows) > 1 and window < next(reversed(region_windows)):
+                    for key in sorted(region_windows):
+                        region_windows.move_to_end(key)
+                while len(region_windows) > self.max_windows:
+                    region_windows.popitem(last=False)
+
+    def _summary(self, window: int, total: np.ndarray) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {'window_start': int(window), 'window_seconds': self.window_seconds,
+                                   'count': int(total[0])}
+        for i, field in enumerate(SENSOR_FIELDS):
+            count = total[1 + 2 * i]
+            summary[field] = float(total[2 + 2 * i] / count) if count else None
+        return summary
+
+    def windows(self, region: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._summary(w, t) for w, t in self._windows.get(region, {}).items()]
+
+    def latest(self, region: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            region_windows = self._windows.get(region)
+            if not region_windows:
+                return None
+            window = next(reversed(region_windows))
+            return self._summary(window, region_windows[window])
+
+    def features(self, region: str) -> Dict[str, float]:
+        """
+        Latest window means for the fields Forecasting uses; empty if the region has no readings
+        """
+        latest = self.latest(region)
+        if latest is None:
+            return {}
+        return {field: latest[field] for field in FEATURE_FIELDS if latest[field] is not None}
+
+    def regions(self) -> List[str]:
+        with self._lock:
+            return sorted(self._windows)
+
+class SensorIngestor:
+    """
+    Buffers sensor readings and writes them to ``sensor_data`` from one writer thread.
+
+    ``submit`` only queues readings, so request threads never wait on
+    SQLite. The writer drains everything queued (up to ``batch_size`` rows)
+    into one executemany transaction, then folds the batch into the window
+    aggregates. A failed write is retried ``max_retries`` times with
+    doubling delays; a batch that still fails is logged and its rows are
+    counted as ``dropped``, but it is aggregated either way. At most
+    ``max_pending`` readings may be queued: non-blocking submits beyond
+    that raise ``SensorBackpressure`` and blocking ones wait. The writer
+    thread starts on first submit.
+    """
+
+    def __init__(self, db, batch_size: int = 5000, flush_interval: float = 0.25, max_pending: int = 100000,
+                 aggregator: Optional[WindowAggregator] = None, max_retries: int = 3, retry_delay: float = 0.1):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.aggregator = aggregator or WindowAggregator()
+        self._queue: deque = deque()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {'accepted': 0, 'written': 0, 'rejected': 0, 'batches': 0,
+                       'write_seconds': 0.0, 'errors': 0, 'dropped': 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='sensor-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Write everything still queued, then stop the writer thread
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, readings: List[Dict[str, Any]], block: bool = False, timeout: Optional[float] = None) -> int:
+        if not readings:
+            return 0
+        if self._thread is None:
+            self.start()
+        # An oversized submit is still accepted once the queue is empty
+        fits = lambda: self._pending == 0 or self._pending + len(readings) <= self.max_pending
+        with self._cond:
+            if not fits():
+                if not block:
+                    self._stats['rejected'] += len(readings)
+                    raise SensorBackpressure(f'{self._pending} sensor readings already queued')
+                if not self._cond.wait_for(fits, timeout):
+                    self._stats['rejected'] += len(readings)
+                    raise SensorBackpressure(f'{self._pending} sensor readings still queued after {timeout}s')
+            self._queue.append(readings)
+            self._pending += len(readings)
+            self._stats['accepted'] += len(readings)
+            self._cond.notify_all()
+        return len(readings)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until every queued reading has been written
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or self._stopping, self.flush_interval)
+            batch: List[Dict[str, Any]] = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.extend(self._queue.popleft())
+            return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        """
+        Store one batch, retrying failed writes; returns the rows written, 0 if the batch was dropped
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.db.store_sensor_readings(batch)
+            except Exception as e:
+                with self._cond:
+                    self._stats['errors'] += 1
+                if attempt == self.max_retries:
+                    logging.error(f'Dropping {len(batch)} sensor readings after {attempt + 1} failed writes: {str(e)}')
+                    with self._cond:
+                        self._stats['dropped'] += len(batch)
+                    return 0
+                logging.warning(f'Failed to write {len(batch)} sensor readings, retrying: {str(e)}')
+                time.sleep(self.retry_delay * 2 ** attempt)
+        return 0
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if self._stopping:
+                    return
+                continue
+            start = time.perf_counter()
+            written = self._write(batch)
+            try:
+                # Live features do not depend on the rows being stored
+                self.aggregator.add_batch(batch)
+            except Exception as e:
+                logging.error(f'Failed to aggregate {len(batch)} sensor readings: {str(e)}')
+                with self._cond:
+                    self._stats['errors'] += 1
+            with self._cond:
+                self._pending -= len(batch)
+                self._stats['batches'] += 1
+                self._stats['written'] += written
+                self._stats['write_seconds'] += time.perf_counter() - start
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, 'pending': self._pending, 'max_pending': self.max_pending,
+                    'late': self.aggregator.late}
+
+class SensorLineHandler(socketserver.StreamRequestHandler):
+    """
+    Reads line-delimited JSON from a TCP connection. Submits block while the
+    queue is full, so a slow writer pushes back on the sender through TCP.
+    """
+
+    def handle(self):
+        ingestor: SensorIngestor = self.server.ingestor
+        lines = []
+        for line in self.rfile:
+            lines.append(line)
+            if len(lines) >= ingestor.batch_size:
+                ingestor.submit(parse_lines(lines)[0], block=True)
+                lines = []
+        if lines:
+            ingestor.submit(parse_lines(lines)[0], block=True)
+
+class SensorSocketServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, ingestor: SensorIngestor, host: str = '127.0.0.1', port: int = 9100):
+        self.ingestor = ingestor
+        super().__init__((host, port), SensorLineHandler)
+
+if __name__ == '__main__':
+    from core.database import Database
+    logging.basicConfig(level=logging.INFO)
+    database = Database()
+    database.ensure_schema()
+    server = SensorSocketServer(SensorIngestor(database), port=int(os.environ.get('SENSOR_PORT', 9100)))
+    print(f"Accepting sensor readings on {server.server_address}")
+    server.serve_forever()
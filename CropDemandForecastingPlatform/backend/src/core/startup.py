@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import types
+
+# Modules that dominate import time; request paths that do not need them should not load them
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'joblib')
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Bind it at module level (``pd = lazy_import('pandas')``) and use it as
+    the module itself. Attribute lookups after the first go through
+    ``__getattr__`` to the real module, so they always see its current
+    attributes. Annotations that name the module's types must not be
+    evaluated at import, which ``from __future__ import annotations``
+    takes care of.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            module = self.__dict__['_module'] = importlib.import_module(self.__name__)
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    The module if it is already imported, otherwise a LazyModule that imports it when first used
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+def loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+def import_times(module: str, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """
+    Import ``module`` in a fresh interpreter with ``-X importtime``; one row per imported module in import order
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=cwd, env={**os.environ, **(env or {})},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({'module': name.strip(), 'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+                     'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    return rows
+
+def summarize_import_times(rows: Sequence[Dict[str, Any]], top: int = 20) -> Dict[str, Any]:
+    """
+    Total import time, the slowest modules by cumulative time and self time summed per top-level package
+    """
+    packages: Dict[str, float] = {}
+    for row in rows:
+        package = row['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + row['self_ms']
+    return {
+        'total_ms': round(sum(row['self_ms'] for row in rows), 3),
+        'modules': len(rows),
+        'heavy_loaded': sorted({row['module'] for row in rows} & set(HEAVY_MODULES)),
+        'slowest': sorted(rows, key=lambda row: row['cumulative_ms'], reverse=True)[:top],
+        'packages': dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top])
+    }
+
+def print_report(module: str, summary: Dict[str, Any]):
+    print(f"import {module}: {summary['total_ms']:.1f} ms over {summary['modules']} modules; "
+          f"heavy modules loaded: {', '.join(summary['heavy_loaded']) or 'none'}")
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for row in summary['slowest']:
+        print(f"{row['cumulative_ms']:>14.1f}{row['self_ms']:>10.1f}  {'  ' * row['depth']}{row['module']}")
+    print(f"\n{'self ms':>14}  package")
+    for package, self_ms in summary['packages'].items():
+        print(f"{self_ms:>14.1f}  {package}")
+
+def main():
+    # python -m core.startup [module] [--top N] [--warmup MODE] [--json]
+    parser = argparse.ArgumentParser(description='Report where the import time of a module goes')
+    parser.add_argument('module', nargs='?', default='app')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--warmup', default='off', choices=['off', 'eager'],
+                        help='APP_WARMUP for the import; eager includes the app warmup')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    rows = import_times(args.module, cwd=src_dir, env={'APP_WARMUP': args.warmup})
+    summary = summarize_import_times(rows, args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(args.module, summary)
+
+if __name__ == '__main__':
+    main()
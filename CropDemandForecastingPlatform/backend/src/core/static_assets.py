@@ -0,0 +1,257 @@
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+from pathlib import Path
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import time
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip variants are built
+    brotli = None
+
+FRONTEND_DIR = Path(__file__).resolve().parent.parent.parent.parent / 'frontend'
+PUBLIC_DIR = FRONTEND_DIR / 'public'
+BUILD_DIR = FRONTEND_DIR / 'dist'
+MANIFEST = 'manifest.json'
+
+# Files under these public directories are fingerprinted; pages keep their names
+ASSET_DIRS = ('assets', 'js')
+# Text formats worth compressing; images and fonts are compressed already
+COMPRESSIBLE = {'.css', '.js', '.html', '.svg', '.json', '.txt', '.map'}
+# Preferred first when a client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+@dataclass(frozen=True)
+class Variant:
+    path: str
+    content_type: str
+    encoding: Optional[str]
+    etag: str
+    cache_control: str
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps builds of unchanged files byte-identical
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def available_encodings() -> List[Tuple[str, str]]:
+    return [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding != 'br' or brotli is not None]
+
+def hashed_name(logical: str, digest: str) -> str:
+    path = Path(logical)
+    return path.with_name(f'{path.stem}.{digest}{path.suffix}').as_posix()
+
+def _write_variants(root: Path, path: str, data: bytes, digest: str) -> Dict[str, Any]:
+    target = root / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    entry = {'path': path, 'etag': digest, 'size': len(data), 'content_type': content_type, 'encodings': {}}
+    if Path(path).suffix in COMPRESSIBLE:
+        for encoding, suffix in available_encodings():
+            compressed = compress(data, encoding)
+            if len(compressed) < len(data):
+                (root / (path + suffix)).write_bytes(compressed)
+                entry['encodings'][encoding] = {'path': path + suffix, 'size': len(compressed)}
+    return entry
+
+def build_assets(public_dir: Optional[Path] = None, build_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Write fingerprinted and precompressed copies of the frontend's static files.
+
+    Every file under ``ASSET_DIRS`` is copied with its content hash in the
+    name, so it can be cached forever. HTML pages keep their names but their
+    links to those files are rewritten. Text files also get ``.br`` (when the
+    brotli package is installed) and ``.gz`` variants where they are smaller.
+    ``manifest.json`` maps each source path to its variants. The build is
+    written to a temporary directory that then replaces ``build_dir``.
+    """
+    public_dir = Path(public_dir or PUBLIC_DIR)
+    build_dir = Path(build_dir or os.environ.get('STATIC_BUILD_DIR', BUILD_DIR))
+    build_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f'.{build_dir.name}-', dir=build_dir.parent))
+    try:
+        assets: Dict[str, Any] = {}
+        for name in ASSET_DIRS:
+            for path in sorted((public_dir / name).rglob('*')):
+                if path.is_file():
+                    data = path.read_bytes()
+                    digest = fingerprint(data)
+                    logical = path.relative_to(public_dir).as_posix()
+                    assets[logical] = _write_variants(tmp, hashed_name(logical, digest), data, digest)
+
+        pages: Dict[str, Any] = {}
+        if assets:
+            # Links are matched between quotes or parentheses, optionally rooted with "/"
+            links = re.compile(r'(?<=["\'(])(/?)(' + '|'.join(map(re.escape, sorted(assets, key=len, reverse=True)))
+                               + r')(?=["\')?#])')
+        for path in sorted(public_dir.glob('*.html')):
+            html = path.read_text(encoding='utf-8')
+            if assets:
+                html = links.sub(lambda m: m.group(1) + assets[m.group(2)]['path'], html)
+            data = html.encode('utf-8')
+            pages[path.name] = _write_variants(tmp, path.name, data, fingerprint(data))
+
+        manifest = {'encodings': [encoding for encoding, _ in available_encodings()], 'assets': assets, 'pages': pages}
+        with open(tmp / MANIFEST, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        old = None
+        if build_dir.exists():
+            old = Path(tempfile.mkdtemp(prefix=f'.{build_dir.name}-old-', dir=build_dir.parent))
+            os.replace(build_dir, old / build_dir.name)
+        os.replace(tmp, build_dir)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        return manifest
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    Quality value of each coding named in an Accept-Encoding header
+    """
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+class StaticAssets:
+    """
+    Serves a build written by ``build_assets``.
+
+    The manifest is read up front, and every URL path maps to its variants
+    precomputed by encoding. A lookup is then a dict access and a walk over
+    at most two codings. At most every ``check_interval`` seconds a lookup
+    stats the manifest and reloads it when a rebuild replaced it, and
+    ``refresh`` does so at once. Fingerprinted URLs are cacheable forever.
+    Unhashed asset paths and pages must be revalidated, which their ETags
+    make cheap. Without a build, nothing is found and callers serve the
+    source files instead.
+    """
+
+    def __init__(self, build_dir: Optional[str] = None, check_interval: float = 1.0):
+        self.build_dir = Path(build_dir or os.environ.get('STATIC_BUILD_DIR', BUILD_DIR))
+        self.check_interval = check_interval
+        self._routes: Dict[str, Dict[Optional[str], Variant]] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._checked = 0.0
+        self.reload()
+
+    def _manifest_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.build_dir / MANIFEST)
+        except OSError:
+            return None
+        # A rebuild swaps in a new directory, so the inode changes even within the mtime resolution
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def reload(self) -> bool:
+        """
+        Read the build's manifest; returns whether a build was found
+        """
+        manifest_path = self.build_dir / MANIFEST
+        self._stamp = self._manifest_stamp()
+        self._checked = time.monotonic()
+        if self._stamp is None:
+            self._routes = {}
+            return False
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+        routes = {}
+        for logical, entry in manifest['assets'].items():
+            routes[entry['path']] = self._variants(entry, IMMUTABLE)
+            routes[logical] = self._variants(entry, REVALIDATE)
+        for name, entry in manifest['pages'].items():
+            routes[name] = self._variants(entry, REVALIDATE)
+        self._routes = routes
+        logging.info(f'Serving {len(manifest["assets"])} static assets and {len(manifest["pages"])} pages '
+                     f'from {self.build_dir}')
+        return True
+
+    def _variants(self, entry: Dict[str, Any], cache_control: str) -> Dict[Optional[str], Variant]:
+        variants = {None: Variant(str(self.build_dir / entry['path']), entry['content_type'], None,
+                                  entry['etag'], cache_control)}
+        for encoding, variant in entry['encodings'].items():
+            # Each representation needs its own strong validator
+            variants[encoding] = Variant(str(self.build_dir / variant['path']), entry['content_type'], encoding,
+                                         f"{entry['etag']}-{encoding}", cache_control)
+        return variants
+
+    def refresh(self) -> bool:
+        """
+        Reload the manifest if it changed since it was read; returns whether it did
+        """
+        self._checked = time.monotonic()
+        if self._manifest_stamp() == self._stamp:
+            return False
+        self.reload()
+        return True
+
+    def __bool__(self) -> bool:
+        return bool(self._routes)
+
+    def select(self, path: str, accept_encoding: Optional[str] = None) -> Optional[Variant]:
+        """
+        The variant of a URL path to send for an Accept-Encoding header, or None if it is not in the build.
+        The accepted coding with the highest quality wins; ties go to the earlier one in the manifest.
+        """
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.refresh()
+        variants = self._routes.get(path.lstrip('/'))
+        if variants is None:
+            return None
+        if len(variants) > 1 and accept_encoding:
+            accepted = parse_accept_encoding(accept_encoding)
+            default = accepted.get('*', 0.0)
+            best, best_quality = None, 0.0
+            for encoding in variants:
+                quality = accepted.get(encoding, default) if encoding is not None else 0.0
+                if quality > best_quality:
+                    best, best_quality = encoding, quality
+            return variants[best]
+        return variants[None]
+
+def main():
+    # python -m core.static_assets [--public DIR] [--output DIR]
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress the frontend static files')
+    parser.add_argument('--public', default=str(PUBLIC_DIR))
+    parser.add_argument('--output', default=None, help=f'build directory (default {BUILD_DIR})')
+    args = parser.parse_args()
+
+    manifest = build_assets(Path(args.public), Path(args.output) if args.output else None)
+    for logical, entry in sorted({**manifest['assets'], **manifest['pages']}.items()):
+        sizes = ', '.join(f"{encoding} {variant['size']}" for encoding, variant in entry['encodings'].items())
+        print(f"{logical:<32} -> {entry['path']:<40} {entry['size']:>8} bytes{' (' + sizes + ')' if sizes else ''}")
+    print(f"Encodings: {', '.join(manifest['encodings'])}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+from __future__ import annotations
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from core.forecasting import Forecasting
+from core.ingestion import build_training_set, load_training_set
+from core.model_registry import ModelRegistry, DEFAULT_KEY
+from core.seasonal import SeasonalForecaster, history_from_frame
+from core.startup import lazy_import
+
+# The server imports this module for ModelUpdater; sklearn loads when models are fitted or updated
+pd = lazy_import('pandas')
+ensemble = lazy_import('sklearn.ensemble')
+incremental = lazy_import('core.incremental')
+
+FEATURES = Forecasting().features
+
+# Same hyperparameters as the synthetic YieldPredictor/DemandPredictor; the
+# yield model also keeps its least-squares sums so ModelUpdater can extend it
+YIELD_MODEL_PARAMS: Dict[str, Any] = {}
+DEMAND_MODEL_PARAMS: Dict[str, Any] = {'n_estimators': 100, 'random_state': 42}
+
+# The default model trains on every row, about as much work as all partitions
+# together, so its forest is fitted as independent tree chunks that a pool can
+# spread across workers. Chunk i uses random_state + i.
+DEFAULT_FOREST_CHUNKS = 20
+
+def fit_forest_chunk(X: np.ndarray, y: np.ndarray, chunk: int, n_chunks: int,
+                     n_jobs: Optional[int] = None) -> ensemble.RandomForestRegressor:
+    """
+    Fit chunk ``chunk`` of ``n_chunks`` of the demand forest's trees
+    """
+    params = dict(DEMAND_MODEL_PARAMS)
+    n_estimators = params.pop('n_estimators', 100)
+    seed = params.pop('random_state', None)
+    trees = n_estimators // n_chunks + (chunk < n_estimators % n_chunks)
+    return ensemble.RandomForestRegressor(n_estimators=trees, random_state=None if seed is None else seed + chunk,
+                                          n_jobs=n_jobs, **params).fit(X, y)
+
+def merge_forests(forests: List[ensemble.RandomForestRegressor]) -> ensemble.RandomForestRegressor:
+    merged = forests[0]
+    for forest in forests[1:]:
+        merged.estimators_ += forest.estimators_
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+def fit_models(X: np.ndarray, y_yield: np.ndarray, y_demand: np.ndarray, n_jobs: Optional[int] = None,
+               forest_chunks: int = 1) -> Tuple[incremental.IncrementalLinearRegression, ensemble.RandomForestRegressor]:
+    """
+    Fit a yield/demand model pair on a feature matrix in Forecasting.features order
+    """
+    yield_model = incremental.IncrementalLinearRegression(**YIELD_MODEL_PARAMS).fit(X, y_yield)
+    if forest_chunks > 1:
+        demand_model = merge_forests([fit_forest_chunk(X, y_demand, i, forest_chunks, n_jobs)
+                                      for i in range(forest_chunks)])
+    else:
+        demand_model = ensemble.RandomForestRegressor(n_jobs=n_jobs, **DEMAND_MODEL_PARAMS).fit(X, y_demand)
+    return yield_model, demand_model
+
+def partition_arrays(training_set: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    X = np.column_stack([training_set[f].to_numpy(dtype=np.float64) for f in FEATURES])
+    return X, training_set['yield'].to_numpy(dtype=np.float64), training_set['demand'].to_numpy(dtype=np.float64)
+
+def plan_parallelism(n_partitions: int, n_workers: Optional[int] = None,
+                     cpu_count: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Split the cores between pool workers and each forest's n_jobs so their product stays within the core count.
+    Without an explicit ``n_workers`` there is one worker per core, capped at the number of partitions.
+    """
+    cpus = cpu_count or os.cpu_count() or 1
+    workers = max(1, min(n_workers or cpus, n_partitions))
+    return workers, max(1, cpus // workers)
+
+Partition = Tuple[Tuple[str, str], Optional[int], Optional[int]]
+
+def partition_plan(training_set: pd.DataFrame, min_rows: int) -> Tuple[np.ndarray, List[Partition]]:
+    """
+    Row order that makes every (crop, region) partition contiguous, and the default model
+    plus each partition as (key, start, stop), largest first; ``None`` bounds mean all rows in their original order
+    """
+    groups = training_set.groupby(['crop_type', 'region'], observed=True, sort=True).indices
+    order = np.concatenate([groups[key] for key in sorted(groups)]) if groups else np.empty(0, dtype=np.int64)
+    partitions, start = [(DEFAULT_KEY, None, None)], 0
+    for (crop_type, region) in sorted(groups):
+        stop = start + len(groups[(crop_type, region)])
+        partitions.append(((str(crop_type), str(region)), start, stop))
+        start = stop
+
+    plan = []
+    for key, lo, hi in partitions:
+        rows = len(training_set) if lo is None else hi - lo
+        if rows < min_rows:
+            logging.info(f'Skipping {key[0]}/{key[1]}: only {rows} rows')
+            continue
+        plan.append((key, lo, hi))
+    plan.sort(key=lambda p: -(len(training_set) if p[1] is None else p[2] - p[1]))
+    return order, plan
+
+class SharedArrays:
+    """
+    Named arrays copied once into shared memory; workers attach by name instead of unpickling copies
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.spec: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self.blocks[name] = block
+                np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> 'SharedArrays':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+# Worker-process state: attached shared arrays and the registry to publish into
+_worker_state: Dict[str, Any] = {}
+
+def _init_training_worker(spec: Dict[str, Tuple[str, Tuple[int, ...], str]], registry_root: str):
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, (block_name, _, _) in spec.items()}
+    _worker_state['blocks'] = blocks
+    _worker_state['arrays'] = {
+        name: np.ndarray(shape, np.dtype(dtype), buffer=blocks[name].buf) for name, (_, shape, dtype) in spec.items()
+    }
+    _worker_state['registry'] = ModelRegistry(registry_root, mmap_mode=None)
+
+def _partition_rows(arrays: Dict[str, np.ndarray], start: Optional[int], stop: Optional[int]):
+    if start is None:
+        return arrays['X'], arrays['y_yield'], arrays['y_demand']
+    rows = arrays['order'][start:stop]
+    return arrays['X'][rows], arrays['y_yield'][rows], arrays['y_demand'][rows]
+
+def _forest_chunks(key: Tuple[str, str]) -> int:
+    return DEFAULT_FOREST_CHUNKS if key == DEFAULT_KEY else 1
+
+def _train_partition(key: Tuple[str, str], start: Optional[int], stop: Optional[int], rf_jobs: int,
+                     version: Optional[str]) -> Dict[str, Any]:
+    begin = time.perf_counter()
+    X, y_yield, y_demand = _partition_rows(_worker_state['arrays'], start, stop)
+    yield_model, demand_model = fit_models(X, y_yield, y_demand, n_jobs=rf_jobs)
+    entry = _worker_state['registry'].publish(key[0], key[1], yield_model, demand_model, version=version)
+    return {**entry.to_dict(), 'rows': len(X), 'train_seconds': time.perf_counter() - begin, 'worker': os.getpid()}
+
+def _train_forest_chunk(start: Optional[int], stop: Optional[int], chunk: int, n_chunks: int,
+                        rf_jobs: int) -> ensemble.RandomForestRegressor:
+    X, _, y_demand = _partition_rows(_worker_state['arrays'], start, stop)
+    return fit_forest_chunk(X, y_demand, chunk, n_chunks, n_jobs=rf_jobs)
+
+def train_forecasting_models(training_set: pd.DataFrame, registry: ModelRegistry, min_rows: int = 30,
+                             version: Optional[str] = None, n_workers: Optional[int] = 1,
+                             rf_jobs: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Train a default model plus one per (crop, region) partition and publish them to the registry.
+
+    With ``n_workers`` > 1 (``None`` means one per core) partitions train on a
+    process pool. The feature matrix and targets are placed in shared memory
+    once and each worker slices its partition from it. Each forest gets
+    ``rf_jobs`` threads, by default the cores left per worker. Workers publish
+    their partitions directly; the default model's tree chunks come back to
+    this process to be merged and published. Serial and parallel runs
+    publish identical models.
+    """
+    order, plan = partition_plan(training_set, min_rows)
+    workers, planned_jobs = plan_parallelism(len(plan) - 1 + DEFAULT_FOREST_CHUNKS, n_workers)
+    rf_jobs = rf_jobs or planned_jobs
+    X, y_yield, y_demand = partition_arrays(training_set)
+    arrays = {'X': X, 'y_yield': y_yield, 'y_demand': y_demand, 'order': order}
+    published = []
+
+    if workers == 1:
+        for key, start, stop in plan:
+            begin = time.perf_counter()
+            X_part, y_yield_part, y_demand_part = _partition_rows(arrays, start, stop)
+            yield_model, demand_model = fit_models(X_part, y_yield_part, y_demand_part, n_jobs=rf_jobs,
+                                                   forest_chunks=_forest_chunks(key))
+            entry = registry.publish(key[0], key[1], yield_model, demand_model, version=version)
+            published.append({**entry.to_dict(), 'rows': len(X_part), 'train_seconds': time.perf_counter() - begin})
+            logging.info(f'Published {key[0]}/{key[1]}@{entry.version} trained on {len(X_part)} rows')
+        return published
+
+    # Every model of the run is published under the same version
+    version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    begin = time.perf_counter()
+    with SharedArrays(arrays) as shared:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_training_worker,
+                                 initargs=(shared.spec, str(registry.root))) as executor:
+            # Largest tasks first: the default model's chunks, then partitions by size
+            chunk_futures, partition_futures = [], []
+            for key, start, stop in plan:
+                if _forest_chunks(key) > 1:
+                    chunk_futures = [executor.submit(_train_forest_chunk, start, stop, i, _forest_chunks(key), rf_jobs)
+                                     for i in range(_forest_chunks(key))]
+                    default_rows = (key, start, stop)
+                else:
+                    partition_futures.append(executor.submit(_train_partition, key, start, stop, rf_jobs, version))
+
+            if chunk_futures:
+                key, start, stop = default_rows
+                X_part, y_yield_part, _ = _partition_rows(arrays, start, stop)
+                yield_model = incremental.IncrementalLinearRegression(**YIELD_MODEL_PARAMS).fit(X_part, y_yield_part)
+                demand_model = merge_forests([future.result() for future in chunk_futures])
+                entry = registry.publish(key[0], key[1], yield_model, demand_model, version=version)
+                published.append({**entry.to_dict(), 'rows': len(X_part), 'train_seconds': time.perf_counter() - begin,
+                                  'worker': os.getpid()})
+                logging.info(f'Published {key[0]}/{key[1]}@{entry.version} trained on {len(X_part)} rows')
+
+            for future in as_completed(partition_futures):
+                result = future.result()
+                published.append(result)
+                logging.info(f"Published {result['crop_type']}/{result['region']}@{result['version']} "
+                             f"trained on {result['rows']} rows")
+
+    registry.refresh()
+    return published
+
+def observation_features(observations: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Features and targets for rows from Database.query_new_observations, derived the way build_training_set does
+    """
+    price = observations['price_per_ton'].astype(np.float64)
+    previous = observations['previous_price'].astype(np.float64)
+    columns = {
+        'month': pd.to_datetime(observations['date']).dt.month.astype(np.float64),
+        'price_per_ton': price,
+        'price_moving_avg': observations['price_moving_avg'].astype(np.float64).fillna(price),
+        'price_change': ((price - previous) / previous).fillna(0.0),
+    }
+    # Without a price that day the training join leaves every price feature empty
+    for name in ['price_moving_avg', 'price_change']:
+        columns[name] = columns[name].where(price.notna())
+    for name in ['temperature', 'rainfall', 'humidity', 'soil_moisture']:
+        columns[name] = observations[name].astype(np.float64)
+
+    X = np.column_stack([columns[f].fillna(0.0).to_numpy() for f in FEATURES])
+    return X, observations['yield'].to_numpy(dtype=np.float64), observations['demand'].to_numpy(dtype=np.float64)
+
+# Observation columns holding each seasonal measure
+SEASONAL_COLUMNS = {'price': 'price_per_ton', 'yield': 'yield', 'demand': 'demand'}
+
+class ModelUpdater:
+    """
+    Folds newly arrived ``crop_yields`` rows into the published models.
+
+    Each pass reads the rows after the last one applied, joined with their
+    price and weather features, and updates the default model plus every
+    published (crop, region) model that has new rows:
+
+    - the yield model's least-squares sums are extended, which gives the
+      same coefficients as refitting on all rows;
+    - once ``min_forest_rows`` rows are waiting for a key, the demand forest
+      gets ``trees_per_update`` new trees fitted on them, and the oldest
+      trees beyond its size are retired;
+    - with a SeasonalForecaster, the seasonal price, yield and demand
+      models are advanced over the new days.
+
+    Work per pass depends only on the new rows. Updated pairs are published
+    as new versions, which readers pick up atomically, each recording the
+    last row it applied. The last applied row id of a pass is recorded in
+    ``model_updates`` so a restart resumes from there; when a pass fails
+    partway, the pairs it already published skip the rows they took.
+    Before the first update, ``prepare`` records the rows already stored as
+    the baseline the published models were trained on; the server calls it
+    at startup so rows arriving before the first pass are not skipped.
+    Rows still waiting for a forest update are kept in memory only.
+    """
+
+    def __init__(self, db, registry: ModelRegistry, interval: float = 300.0, min_forest_rows: int = 30,
+                 trees_per_update: int = 10, batch_size: int = 50000, after_id: Optional[int] = None,
+                 seasonal: Optional[SeasonalForecaster] = None):
+        self.db = db
+        self.registry = registry
+        self.seasonal = seasonal
+        self.interval = interval
+        self.min_forest_rows = min_forest_rows
+        self.trees_per_update = trees_per_update
+        self.batch_size = batch_size
+        self._pending: Dict[Tuple[str, str], List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'passes': 0, 'rows': 0, 'published': 0, 'trees_added': 0, 'skipped': 0,
+                       'seasonal_days': 0, 'seconds': 0.0}
+        self._last_id = after_id
+
+    @property
+    def last_id(self) -> int:
+        """
+        Id of the last applied crop_yields row; read from the database on first use
+        """
+        if self._last_id is None:
+            self.prepare()
+        return self._last_id
+
+    def prepare(self):
+        """
+        Resolve the watermark now rather than at the first pass; runs once
+        """
+        if self._last_id is None:
+            with self._lock:
+                if self._last_id is None:
+                    self._last_id = self._load_watermark()
+
+    @last_id.setter
+    def last_id(self, value: int):
+        self._last_id = value
+
+    def _load_watermark(self) -> int:
+        self.db.ensure_schema()
+        with self.db.pool.connection() as conn:
+            row = conn.execute('SELECT MAX(last_yield_id) FROM model_updates').fetchone()
+            if row[0] is not None:
+                return row[0]
+            # Rows already stored when updates start are assumed to be in the trained models; the
+            # baseline is recorded so a restart does not move it past rows that arrived meanwhile
+            last_id = conn.execute('SELECT MAX(id) FROM crop_yields').fetchone()[0] or 0
+            conn.execute("INSERT INTO model_updates (version, rows, models, trees_added, last_yield_id) "
+                         "VALUES ('baseline', 0, 0, 0, ?)", (last_id,))
+            conn.commit()
+        return last_id
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='model-updater', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f'Model update failed: {str(e)}')
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """
+        Apply every row that arrived since the last pass; returns the published entries
+        """
+        published = []
+        self.prepare()
+        with self._lock:
+            while True:
+                observations = self.db.query_new_observations(self.last_id, self.batch_size)
+                if observations.empty:
+                    break
+                published.extend(self._apply(observations))
+                if len(observations) < self.batch_size:
+                    break
+        return published
+
+    def _apply(self, observations: pd.DataFrame) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        X, y_yield, y_demand = observation_features(observations)
+        ids = observations['id'].to_numpy()
+        last_id = int(ids[-1])
+        groups = {DEFAULT_KEY: np.arange(len(observations))}
+        groups.update({(str(crop_type), str(region)): rows for (crop_type, region), rows
+                       in observations.groupby(['crop_type', 'region'], sort=True).indices.items()})
+        version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+        published = []
+        for key, rows in groups.items():
+            current = self.registry.entry(*key)
+            if current is None:
+                continue
+            if current.last_yield_id is not None:
+                rows = rows[ids[rows] > current.last_yield_id]
+                if not len(rows):
+                    continue
+            forecaster = current.forecaster
+            try:
+                yield_model = incremental.update_linear(forecaster.yield_model, X[rows], y_yield[rows])
+            except TypeError as e:
+                logging.warning(f'Not updating {key[0]}/{key[1]}: {str(e)}')
+                self._stats['skipped'] += 1
+                continue
+
+            # Rows waiting for a forest update are replaced only once the new version is published
+            pending = self._pending.get(key, []) + [(X[rows], y_demand[rows])]
+            demand_model, trees_added = forecaster.demand_model, 0
+            if sum(len(y) for _, y in pending) >= self.min_forest_rows:
+                demand_model = incremental.grow_forest(demand_model, np.vstack([x for x, _ in pending]),
+                                                       np.concatenate([y for _, y in pending]), self.trees_per_update,
+                                                       random_state=last_id % 2 ** 31, params=DEMAND_MODEL_PARAMS)
+                trees_added = self.trees_per_update
+                pending = []
+
+            # An unchanged forest keeps its compact export
+            entry = self.registry.publish(key[0], key[1], yield_model, demand_model, version=version,
+                                          compact_model=None if trees_added else forecaster.compact_demand_model,
+                                          last_yield_id=last_id)
+            self._pending[key] = pending
+            published.append({**entry.to_dict(), 'rows': len(rows), 'trees_added': trees_added})
+            logging.info(f'Updated {key[0]}/{key[1]}@{version} with {len(rows)} rows ({trees_added} new trees)')
+
+        if self.seasonal is not None:
+            self._stats['seasonal_days'] += self.seasonal.update(history_from_frame(observations, SEASONAL_COLUMNS))
+
+        trees_added = sum(p['trees_added'] for p in published)
+        with self.db.pool.connection() as conn:
+            conn.execute('INSERT INTO model_updates (version, rows, models, trees_added, last_yield_id) '
+                         'VALUES (?, ?, ?, ?, ?)', (version, len(observations), len(published), trees_added, last_id))
+            conn.commit()
+
+        self.last_id = last_id
+        self._stats['passes'] += 1
+        self._stats['rows'] += len(observations)
+        self._stats['published'] += len(published)
+        self._stats['trees_added'] += trees_added
+        self._stats['seconds'] += time.perf_counter() - start
+        return published
+
+    def stats(self) -> Dict[str, Any]:
+        pending = sum(len(y) for rows in list(self._pending.values()) for _, y in rows)
+        # _last_id, not last_id: a metrics scrape must not create the schema or query the database
+        return {**self._stats, 'last_id': self._last_id, 'pending_forest_rows': pending,
+                'interval': self.interval, 'running': self._thread is not None and self._thread.is_alive()}
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    path = build_training_set()
+    training_set = load_training_set(path)
+    registry = ModelRegistry()
+    n_workers = int(os.environ['TRAINING_WORKERS']) if 'TRAINING_WORKERS' in os.environ else None
+    published = train_forecasting_models(training_set, registry, n_workers=n_workers)
+    print(f"Published {len(published)} models to {registry.root}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+import sys
+import os
+import gzip
+import socket
+import subprocess
+import tempfile
+from concurrent.futures import TimeoutError as VerificationTimeout
+from pathlib import Path
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Serve from an empty registry so the tests never pick up local artifacts
+os.environ['MODEL_REGISTRY_DIR'] = tempfile.mkdtemp(prefix='registry-')
+os.environ['FEATURE_STORE_DIR'] = tempfile.mkdtemp(prefix='feature-store-')
+os.environ['CROP_MODEL_STORE'] = tempfile.mkdtemp(prefix='model-store-')
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='database-'), 'agritech.db')
+os.environ['SEASONAL_MODEL_PATH'] = os.path.join(tempfile.mkdtemp(prefix='seasonal-'), 'seasonal_model.npz')
+os.environ['MODEL_UPDATE_INTERVAL'] = '0'
+os.environ['PROFILING_ENABLED'] = '1'
+os.environ['APP_WARMUP'] = 'off'
+
+from app import app, model_registry, db, forecast_cache, sensor_ingestor, job_manager, startup_stats, warmup, static_assets
+from app import seasonal_forecaster
+from core.model_registry import DEFAULT_KEY
+from core.startup import import_times, summarize_import_times
+from core.seasonal import month_names
+from core.static_assets import IMMUTABLE, build_assets
+from test_forecasting import make_models, sample_features
+
+client = app.test_client()
+
+def auth_headers():
+    """Log in with the seeded account and return its bearer token header"""
+    response = client.post('/api/login', json={'email': 'mahesha@gmail.com', 'password': 'm@123'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+def test_forecast_without_any_model():
+    """Test that a forecast with neither a trained nor a seasonal model answers 503"""
+    print("\n=== Testing /api/forecast without models ===")
+
+    seasonal_forecaster.model = lambda: None
+    try:
+        response = client.post('/api/forecast', json={'crop_type': 'maize', 'region': 'east'})
+    finally:
+        del seasonal_forecaster.model
+    assert response.status_code == 503
+    assert 'not available' in response.get_json()['error']
+
+def test_forecast_endpoint():
+    """Test the forecast endpoint with and without a published model"""
+    print("\n=== Testing /api/forecast ===")
+
+    response = client.post('/api/forecast', json={'crop_type': 'wheat', 'region': 'north'})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['model_version'] is None
+    # Peak months come from the seasonal price model fitted on the history
+    assert data['peak_months'] == month_names(seasonal_forecaster.model().peak_months('wheat'))
+    assert data['demand'] > 0 and data['yield'] > 0
+    for key in ('yield', 'demand', 'planting_advice', 'recommended_markets', 'confidence_level'):
+        assert key in data
+
+    model_registry.publish(*DEFAULT_KEY, *make_models(), version='v1')
+    response = client.post('/api/forecast', json={
+        'crop_type': 'rice', 'region': 'south', 'features': sample_features()
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['model_version'] == 'v1'
+    # The test forest gives demand quantiles; its plain LinearRegression has no residual statistics
+    assert data['demand_interval']['p10'] <= data['demand_interval']['p50'] <= data['demand_interval']['p90']
+    assert data['yield_interval'] is None and 0 <= data['confidence_level'] <= 100
+
+    models = client.get('/api/models').get_json()['models']
+    assert [m['version'] for m in models] == ['v1']
+
+    response = client.post('/api/forecast', json={'crop_type': 'wheat'})
+    assert response.status_code == 400
+
+def test_model_update_endpoint():
+    """Test that an update pass can be triggered and reports its progress"""
+    print("\n=== Testing /api/models/update ===")
+
+    assert client.post('/api/models/update').status_code == 401
+    assert client.post('/api/models/reload').status_code == 401
+    assert client.post('/api/models/update', headers={'Authorization': 'Bearer nope'}).status_code == 401
+
+    headers = auth_headers()
+    assert client.post('/api/models/reload', headers=headers).get_json()['swapped'] == []
+    response = client.post('/api/models/update', headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['published'] == []
+    assert data['updates']['running'] is False
+    assert 'updates' in client.get('/api/models').get_json()
+
+def test_forecast_batch_endpoint():
+    """Test the batch forecast endpoint keeps input order and reports per-item errors"""
+    print("\n=== Testing /api/forecast/batch ===")
+
+    model_registry.publish('corn', 'west', *make_models(seed=5), version='corn-v1')
+    items = [
+        {'crop_type': 'corn', 'region': 'west', 'features': sample_features(1)},
+        {'crop_type': 'corn'},
+        {'crop_type': 'corn', 'region': 'west', 'features': {'rainfall': 'heavy'}},
+        {'crop_type': 'corn', 'region': 'west', 'features': sample_features(2)},
+    ]
+    response = client.post('/api/forecast/batch', json={'items': items})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+
+    assert len(results) == 4
+    assert 'error' in results[1] and 'error' in results[2]
+    for i in (0, 3):
+        single = client.post('/api/forecast', json=items[i]).get_json()
+        assert results[i]['yield'] == single['yield']
+        assert results[i]['model_version'] == 'corn-v1'
+
+    assert client.post('/api/forecast/batch', json={'items': []}).status_code == 400
+
+def test_forecast_cache_hits_and_version_invalidation():
+    """Test repeated forecasts are served from cache until a new model version is published"""
+    print("\n=== Testing forecast cache ===")
+
+    before = forecast_cache.stats()
+    request = {'crop_type': 'potatoes', 'region': 'east', 'features': sample_features(3)}
+    model_registry.publish('potatoes', 'east', *make_models(seed=1), version='p1')
+
+    first = client.post('/api/forecast', json=request).get_json()
+    second = client.post('/api/forecast', json=request).get_json()
+    assert first == second
+    stats = client.get('/api/forecast/cache').get_json()['cache']
+    assert (stats['hits'] - before['hits'], stats['misses'] - before['misses']) == (1, 1)
+
+    batch = client.post('/api/forecast/batch', json={'items': [request]}).get_json()['results']
+    assert batch[0] == first
+
+    model_registry.publish('potatoes', 'east', *make_models(seed=2), version='p2')
+    third = client.post('/api/forecast', json=request).get_json()
+    assert third['model_version'] == 'p2'
+    assert forecast_cache.stats()['misses'] - before['misses'] == 2
+
+def test_sensor_readings_feed_forecast_features():
+    """Test NDJSON sensor ingestion and that live soil moisture reaches the forecast features"""
+    print("\n=== Testing /api/sensors ===")
+
+    lines = [
+        '{"timestamp": "2024-05-01T10:00:00", "sensor_id": "S1", "location": "central_field_1", "humidity": 60, "soil_moisture": 30}',
+        '{"timestamp": "2024-05-01T10:01:00", "sensor_id": "S2", "location": "central_field_2", "humidity": 70, "soil_moisture": 50}',
+        'garbage'
+    ]
+    response = client.post('/api/sensors/readings', data='\n'.join(lines), content_type='application/x-ndjson')
+    assert response.status_code == 202
+    assert response.get_json() == {'accepted': 2, 'rejected': 1}
+    assert sensor_ingestor.flush(timeout=10)
+
+    windows = client.get('/api/sensors/aggregates?region=central').get_json()['windows']['central']
+    assert windows[-1]['count'] == 2 and windows[-1]['soil_moisture'] == 40.0
+
+    model_registry.publish('corn', 'central', *make_models(seed=4), version='c1')
+    features = {k: v for k, v in sample_features(4).items() if k not in ('humidity', 'soil_moisture')}
+    live = client.post('/api/forecast', json={'crop_type': 'corn', 'region': 'central', 'features': features}).get_json()
+    explicit = client.post('/api/forecast', json={'crop_type': 'corn', 'region': 'central',
+                                                  'features': {**features, 'humidity': 65.0, 'soil_moisture': 40.0}}).get_json()
+    assert live['yield'] == explicit['yield']
+
+def test_forecast_job_endpoints():
+    """Test submitting a sweep, streaming progress and paging persisted results"""
+    print("\n=== Testing /api/jobs ===")
+
+    assert client.post('/api/jobs', json={'grid': {'crop_type': ['barley'], 'region': ['north']}}).status_code == 400
+    assert client.get('/api/jobs/missing').status_code == 404
+
+    response = client.post('/api/jobs', json={'grid': {'crop_type': ['wheat', 'rice'], 'region': ['north', 'south'],
+                                                       'temperature': [20.0, 25.0, 30.0]}})
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+    assert response.headers['Location'] == f'/api/jobs/{job_id}'
+
+    events = client.get(f'/api/jobs/{job_id}/events').get_data(as_text=True)
+    assert '"status": "completed"' in events.strip().split('\n\n')[-1]
+
+    page = client.get(f'/api/jobs/{job_id}/results?limit=5').get_json()
+    assert page['job']['completed'] == 12 and len(page['results']) == 5 and page['next_offset'] == 5
+    rest = client.get(f"/api/jobs/{job_id}/results?offset={page['next_offset']}&limit=100").get_json()
+    assert [r['index'] for r in rest['results']] == list(range(5, 12)) and rest['next_offset'] is None
+
+    # Streams of jobs that will never finish end too
+    with db.pool.connection() as conn:
+        conn.execute("INSERT INTO forecast_jobs (id, status, total, owner) VALUES "
+                     "('dead', 'running', 10, ?), ('elsewhere', 'running', 10, 'other-host:1')",
+                     (f'{socket.gethostname()}:999999999',))
+        conn.commit()
+    events = client.get('/api/jobs/dead/events').get_data(as_text=True)
+    assert '"status": "failed"' in events.strip().split('\n\n')[-1]
+    app_module = sys.modules['app']
+    timeout, app_module.JOB_STREAM_TIMEOUT = app_module.JOB_STREAM_TIMEOUT, 0.0
+    try:
+        events = client.get('/api/jobs/elsewhere/events').get_data(as_text=True)
+    finally:
+        app_module.JOB_STREAM_TIMEOUT = timeout
+    assert events.strip().split('\n\n')[-1].startswith('event: timeout\ndata: ')
+
+def test_login_sessions_and_backpressure():
+    """Test login tokens, token validation and 503 when verification is saturated"""
+    print("\n=== Testing /api/login ===")
+
+    response = client.post('/api/login', json={'email': 'mahesha@gmail.com', 'password': 'm@123'})
+    assert response.status_code == 200
+    token = response.get_json()['token']
+
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.post('/api/forecast', json={'crop_type': 'wheat', 'region': 'north'}, headers=headers).status_code == 200
+    bad = {'Authorization': 'Bearer nope'}
+    assert client.post('/api/forecast', json={'crop_type': 'wheat', 'region': 'north'}, headers=bad).status_code == 401
+
+    assert client.post('/api/login', json={'email': 'mahesha@gmail.com', 'password': 'bad'}).status_code == 401
+
+    verifier = db.verifier
+    verifier._pending = verifier.max_pending
+    try:
+        response = client.post('/api/login', json={'email': 'mahesha@gmail.com', 'password': 'm@123'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        verifier._pending = 0
+
+    def timed_out(*args, **kwargs):
+        raise VerificationTimeout()
+
+    verifier.verify = timed_out
+    try:
+        response = client.post('/api/login', json={'email': 'mahesha@gmail.com', 'password': 'm@123'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        del verifier.verify
+
+def test_metrics_endpoint_and_request_profiles():
+    """Test that forecast stages, requests and component stats are exported, and profiles are opt-in"""
+    print("\n=== Testing /api/metrics ===")
+
+    model_registry.publish('soybeans', 'north', *make_models(seed=4), version='s1')
+    request = {'crop_type': 'soybeans', 'region': 'north', 'features': sample_features(4)}
+    assert 'X-Profile-Id' not in client.post('/api/forecast', json=request).headers
+    response = client.post('/api/forecast', json=request, headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    client.post('/api/models/update', headers=auth_headers())
+
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    for stage in ('forecast.encode', 'forecast.yield_predict', 'forecast.demand_predict', 'forecast.serialize',
+                  'recommendation', 'db.query_new_observations'):
+        assert f'agritech_span_seconds_count{{span="{stage}"}}' in text, stage
+    assert 'agritech_http_request_seconds_bucket{endpoint="forecast",method="POST",status="200",le="+Inf"}' in text
+    assert '# TYPE agritech_db_pool_size gauge' in text
+    assert 'agritech_forecast_cache_hits ' in text
+
+    profile_id = int(client.post('/api/forecast', json=request, headers={'X-Profile': '1'}).headers['X-Profile-Id'])
+    assert client.get('/api/metrics/profiles').status_code == 401
+    profiles = client.get('/api/metrics/profiles', headers=auth_headers()).get_json()['profiles']
+    assert profiles[0]['id'] == profile_id
+    assert profiles[0]['path'] == '/api/forecast' and profiles[0]['status'] == 200
+    assert {'samples', 'duration_ms', 'functions', 'stacks'} <= set(profiles[0])
+
+def test_lazy_startup_and_warmup():
+    """Test that importing the app and serving login and pages loads no ML library, and warmup loads them"""
+    print("\n=== Testing startup ===")
+
+    src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+    summary = summarize_import_times(import_times('app', cwd=src_dir, env={'APP_WARMUP': 'off'}), top=5)
+    print(f"import app: {summary['total_ms']:.0f} ms, slowest: {[row['module'] for row in summary['slowest']]}")
+    assert summary['heavy_loaded'] == []
+
+    script = ("import app\n"
+              "client = app.app.test_client()\n"
+              "assert client.get('/').status_code == 200\n"
+              "assert client.post('/api/login', json={'email': 'mahesha@gmail.com', 'password': 'm@123'}).status_code == 200\n"
+              "from core.startup import loaded_heavy_modules\n"
+              "print(loaded_heavy_modules())\n")
+    result = subprocess.run([sys.executable, '-c', script], cwd=src_dir, capture_output=True, text=True,
+                            env={**os.environ, 'APP_WARMUP': 'off'})
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+
+    model_registry.publish(*DEFAULT_KEY, *make_models(), version='warm')
+    warmup()
+    assert startup_stats['warm'] and startup_stats['warmup_seconds'] > 0
+    assert 'agritech_startup_warm 1' in client.get('/api/metrics').get_data(as_text=True)
+
+def test_static_assets_from_build():
+    """Test pages and assets are sent precompressed with cache headers, and from source without a build"""
+    print("\n=== Testing Static Asset Serving ===")
+
+    response = client.get('/assets/css/style.css')
+    assert response.status_code == 200 and 'Content-Encoding' not in response.headers
+    source = response.get_data()
+    response.close()
+    welcome = client.get('/welcome.html')
+    assert welcome.headers['Cache-Control'].startswith('no-store')
+    welcome.close()
+
+    build_dir = tempfile.mkdtemp(prefix='static-')
+    manifest = build_assets(build_dir=build_dir)
+    static_assets.build_dir = Path(build_dir)
+    try:
+        assert static_assets.reload()
+        hashed = '/' + manifest['assets']['assets/css/style.css']['path']
+        response = client.get(hashed, headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Cache-Control'] == IMMUTABLE
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert gzip.decompress(response.get_data()) == source
+        etag = response.headers['ETag']
+        response.close()
+
+        response = client.get(hashed, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304 and not response.get_data()
+        response.close()
+
+        page = client.get('/dashboard', headers={'Accept-Encoding': 'gzip'})
+        assert page.headers['Cache-Control'] == 'no-cache'
+        assert manifest['assets']['js/dashboard.js']['path'] in gzip.decompress(page.get_data()).decode()
+        page.close()
+        welcome = client.get('/welcome.html')
+        assert welcome.headers['Cache-Control'].startswith('no-store') and 'Content-Encoding' not in welcome.headers
+        welcome.close()
+
+        # Files replaced by a rebuild are found again before the next manifest check
+        public = Path(tempfile.mkdtemp(prefix='public-'))
+        (public / 'assets' / 'css').mkdir(parents=True)
+        (public / 'assets' / 'css' / 'style.css').write_text('body { margin: 0; }\n')
+        build_assets(public, build_dir)
+        assert static_assets.reload()
+        (public / 'assets' / 'css' / 'style.css').write_text('body { margin: 1px; }\n')
+        build_assets(public, build_dir)
+        response = client.get('/assets/css/style.css')
+        assert response.status_code == 200 and response.get_data() == b'body { margin: 1px; }\n'
+        response.close()
+    finally:
+        static_assets.build_dir = Path(build_dir) / 'missing'
+        static_assets.reload()
+
+if __name__ == "__main__":
+    test_forecast_without_any_model()
+    test_forecast_endpoint()
+    test_model_update_endpoint()
+    test_forecast_batch_endpoint()
+    test_forecast_cache_hits_and_version_invalidation()
+    test_sensor_readings_feed_forecast_features()
+    test_forecast_job_endpoints()
+    test_login_sessions_and_backpressure()
+    test_metrics_endpoint_and_request_profiles()
+    test_lazy_startup_and_warmup()
+    test_static_assets_from_build()
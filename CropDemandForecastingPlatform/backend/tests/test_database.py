@@ -0,0 +1,223 @@
+import sys
+import os
+import tempfile
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core import auth
+from core.database import Database, PoolTimeout
+from core.ingestion import HISTORICAL_DIR
+
+def test_bulk_import_and_range_queries():
+    """Test bulk loading the historical CSVs and reading typed ranges back"""
+    print("\n=== Testing Database Bulk Import ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'data', 'agritech.db'))
+        # Nothing is created until the first connection
+        assert not os.path.exists(os.path.join(tmp, 'data'))
+        start = time.perf_counter()
+        counts = db.import_historical_data(HISTORICAL_DIR, chunksize=3000)
+        print(f"Imported {counts} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        assert counts == {'weather_history': 9125, 'crop_yields': 9125, 'market_prices': 9125}
+
+        conn = db.get_data_connection()
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        plan = conn.execute(
+            'EXPLAIN QUERY PLAN SELECT date FROM crop_yields WHERE crop_id = 1 AND region_id = 1 AND date BETWEEN ? AND ?',
+            ('2022-01-01', '2022-02-01')
+        ).fetchall()
+        conn.close()
+        assert 'idx_crop_yields_crop_region_date' in plan[0][-1]
+
+        start = time.perf_counter()
+        prices = db.query_prices('wheat', 'north', '2022-03-01', '2022-05-31')
+        print(f"Range query: {len(prices['date'])} rows in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        expected = pd.read_csv(HISTORICAL_DIR / 'market_prices.csv', parse_dates=['date'])
+        expected = expected[(expected['crop_type'] == 'wheat') & (expected['region'] == 'north') &
+                            (expected['date'] >= '2022-03-01') & (expected['date'] <= '2022-05-31')]
+        assert prices['date'].dtype == np.dtype('datetime64[D]')
+        assert prices['price_per_ton'].dtype == np.float64
+        np.testing.assert_array_equal(prices['price_per_ton'], expected['price'].to_numpy())
+
+        yields = db.query_yields('rice', 'south', '2022-12-01', '2022-12-31')
+        assert len(yields['date']) == 31 and not np.isnan(yields['demand']).any()
+        assert len(db.query_weather('east', '2022-07-04', '2022-07-04')['temperature']) == 5
+        assert len(db.query_prices('cotton', 'north', '2022-01-01', '2022-12-31')['date']) == 0
+
+        # Importing again replaces the rows it loaded instead of duplicating them
+        assert db.import_historical_data(HISTORICAL_DIR, chunksize=3000) == counts
+        with db.pool.connection() as conn:
+            for table, count in counts.items():
+                assert conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == count
+        assert len(db.query_weather('east', '2022-07-04', '2022-07-04')['temperature']) == 5
+        np.testing.assert_array_equal(db.query_prices('wheat', 'north', '2022-03-01', '2022-05-31')['price_per_ton'],
+                                      expected['price'].to_numpy())
+
+def test_connection_pool_under_threads():
+    """Test the bounded pool with concurrent users, re-entrancy and wait statistics"""
+    print("\n=== Testing Connection Pool ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'), pool_size=2, pool_timeout=0.2)
+        assert db.verify_user('mahesha@gmail.com', 'm@123')['name'] == 'Mahesh'
+        assert db.verify_user('mahesha@gmail.com', 'wrong') is None
+        assert db.create_user('mahesha@gmail.com', 'x') is False
+
+        # Nested checkouts on one thread share a connection
+        with db.pool.connection() as outer:
+            with db.pool.connection() as inner:
+                assert inner is outer
+
+        errors = []
+
+        def worker(i):
+            try:
+                for j in range(20):
+                    with db.pool.connection() as conn:
+                        conn.execute('INSERT INTO regions (name) VALUES (?)', (f'r{i}-{j}',))
+                        conn.commit()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors
+
+        stats = db.pool_stats()
+        print(f"Pool stats: {stats}")
+        assert stats['size'] <= 2 and stats['in_use'] == 0
+        assert stats['affinity_hits'] > 0
+        with db.pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM regions').fetchone()[0] == 120
+
+        # A saturated pool times out instead of blocking forever
+        holders = [threading.Event(), threading.Event()]
+        release = threading.Event()
+
+        def hold(ready):
+            with db.pool.connection():
+                ready.set()
+                release.wait()
+
+        for ready in holders:
+            threading.Thread(target=hold, args=(ready,)).start()
+            ready.wait()
+        try:
+            with db.pool.connection():
+                raise AssertionError('expected PoolTimeout')
+        except PoolTimeout:
+            pass
+        finally:
+            release.set()
+
+        stats = db.pool_stats()
+        assert stats['waits'] >= 1 and stats['timeouts'] == 1 and stats['wait_seconds'] > 0
+
+def test_connection_pool_after_fork():
+    """Test a forked child gets a fresh pool even while a parent thread holds the pool lock"""
+    print("\n=== Testing Connection Pool After Fork ===")
+    if not hasattr(os, 'fork'):
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        with db.pool.connection() as conn:
+            conn.execute('SELECT 1')
+
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            with db.pool._cond:
+                locked.set()
+                release.wait(10)
+
+        holder = threading.Thread(target=hold_lock)
+        with db.pool.connection() as parent_conn:
+            holder.start()
+            locked.wait(10)
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    with db.pool.connection() as child_conn:
+                        child_conn.execute('SELECT COUNT(*) FROM users').fetchone()
+                        code = 0 if child_conn is not parent_conn and db.pool.stats()['connects'] == 1 else 2
+                finally:
+                    os._exit(code)
+        release.set()
+        holder.join()
+
+        deadline = time.time() + 10
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            if time.time() > deadline:
+                os.kill(pid, 9)
+                os.waitpid(pid, 0)
+                raise AssertionError('forked child blocked on the parent pool lock')
+            time.sleep(0.05)
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+        assert db.pool.stats()['in_use'] == 0
+
+def test_password_parameters_and_verifier():
+    """Test per-user hashing parameters, legacy hashes and verifier backpressure"""
+    print("\n=== Testing Password Hashing ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'), password_iterations=1000,
+                      verifier=auth.PasswordVerifier(max_workers=2, max_pending=2))
+        assert db.create_user('cheap@example.com', 'secret')
+        stored = db.get_user('cheap@example.com')['password']
+        assert stored.startswith('pbkdf2_sha512$1000$')
+
+        # Raising the cost leaves existing rows verifiable
+        db.password_iterations = 2000
+        assert db.authenticate('cheap@example.com', 'secret')['email'] == 'cheap@example.com'
+        assert auth.needs_rehash(stored, db.password_iterations)
+
+        # ...and that login upgraded the stored hash to the new cost on the worker pool
+        deadline = time.monotonic() + 10
+        while db.verifier.stats()['pending'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        upgraded = db.get_user('cheap@example.com')['password']
+        assert upgraded.startswith('pbkdf2_sha512$2000$') and not auth.needs_rehash(upgraded, 2000)
+        assert db.authenticate('cheap@example.com', 'secret')['email'] == 'cheap@example.com'
+        assert db.get_user('cheap@example.com')['password'] == upgraded
+
+        # Hashes written before per-user parameters still verify with 100,000 rounds
+        legacy = auth.hash_password('m@123', 100000).split('$')
+        assert db.verify_password(legacy[2] + legacy[3], 'm@123')
+
+        db.verifier._pending = db.verifier.max_pending
+        try:
+            db.authenticate('cheap@example.com', 'secret')
+            raise AssertionError('expected AuthBusy')
+        except auth.AuthBusy:
+            # An upgrade is skipped rather than queued past the limit
+            assert db.rehash_password(1, upgraded, 'secret') is None
+        finally:
+            db.verifier._pending = 0
+        assert db.verifier.stats()['rejected'] == 2
+
+    cache = auth.SessionCache(ttl=60, max_entries=2)
+    tokens = [cache.issue({'id': i}) for i in range(3)]
+    assert cache.get(tokens[0]) is None and cache.get(tokens[2]) == {'id': 2}
+    expired = auth.SessionCache(ttl=-1)
+    assert expired.get(expired.issue({'id': 1})) is None
+
+if __name__ == "__main__":
+    test_bulk_import_and_range_queries()
+    test_connection_pool_under_threads()
+    test_connection_pool_after_fork()
+    test_password_parameters_and_verifier()
@@ -0,0 +1,250 @@
+import sys
+import os
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.compact_forest import CompactForest
+from core.forecasting import COMPACT_MAX_ROWS, Forecasting, NORMAL_QUANTILES, QUANTILES, tree_predictions
+from core.incremental import IncrementalLinearRegression
+from core.model_registry import ModelRegistry, DEFAULT_KEY
+from core.result_cache import ForecastCache, SQLiteCacheBackend, cache_key
+
+def make_models(n_features=8, seed=0):
+    """Fit a small yield/demand model pair on random features"""
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(200, n_features))
+    yield_model = LinearRegression().fit(X, X @ rng.normal(size=n_features) + 3)
+    demand_model = RandomForestRegressor(n_estimators=10, random_state=seed).fit(X, rng.normal(1000, 100, 200))
+    return yield_model, demand_model
+
+def sample_features(seed=0):
+    rng = np.random.RandomState(seed)
+    return {
+        'temperature': rng.normal(25, 5),
+        'rainfall': rng.normal(150, 30),
+        'humidity': rng.uniform(30, 90),
+        'soil_moisture': rng.uniform(20, 60),
+        'month': int(rng.randint(1, 13)),
+        'price_per_ton': rng.normal(300, 20),
+        'price_history': list(rng.normal(300, 20, 7))
+    }
+
+def test_model_registry_publish_and_hot_swap():
+    """Test publishing, fallback resolution and hot-swapping of registry models"""
+    print("\n=== Testing Model Registry ===")
+
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(root)
+        assert registry.resolve('wheat', 'north') is None
+
+        registry.publish(*DEFAULT_KEY, *make_models(seed=1), version='v1')
+        registry.publish('wheat', 'north', *make_models(seed=2), version='v1')
+        assert registry.resolve('rice', 'south').crop_type == 'default'
+        assert registry.resolve('wheat', 'north').crop_type == 'wheat'
+
+        # A second worker loads everything once at startup
+        worker = ModelRegistry(root)
+        assert len(worker.load_all()) == 2
+        before = worker.get('wheat', 'north')
+        for stats in worker.stats():
+            assert stats['load_seconds'] > 0
+            assert stats['memory_bytes'] > 0
+            print(f"{stats['crop_type']}/{stats['region']}@{stats['version']}: "
+                  f"{stats['load_seconds'] * 1000:.2f} ms, {stats['memory_bytes']} bytes")
+
+        # Publishing a new version is picked up by refresh without touching other entries
+        registry.publish('wheat', 'north', *make_models(seed=3), version='v2')
+        swapped = worker.refresh()
+        assert [(e.crop_type, e.version) for e in swapped] == [('wheat', 'v2')]
+        assert worker.get('wheat', 'north') is not before
+        assert worker.resolve('wheat', 'north').version == 'v2'
+        assert worker.refresh() == []
+
+        # A half-written version is skipped without blocking the models after it
+        broken_dir = Path(root) / 'corn' / 'east' / 'broken'
+        broken_dir.mkdir(parents=True)
+        (broken_dir / 'yield_model.joblib').write_bytes(b'truncated')
+        (broken_dir.parent / 'CURRENT').write_text('broken')
+        registry.publish('wheat', 'north', *make_models(seed=4), version='v3')
+        assert [(e.crop_type, e.version) for e in worker.refresh()] == [('wheat', 'v3')]
+        assert worker.get('corn', 'east') is None
+
+        features = sample_features()
+        expected = registry.get('wheat', 'north').get_forecast(features)
+        assert worker.get('wheat', 'north').get_forecast(features) == expected
+
+        # Forest demand models are published with a compact export that serves small batches
+        forecaster = worker.get('wheat', 'north')
+        assert forecaster.compact_demand_model is not None
+        X_single = forecaster.encoder.encode(features)
+        assert np.isclose(expected['demand'], forecaster.demand_model.predict(X_single)[0], rtol=1e-6)
+
+def test_forecast_batch_matches_single():
+    """Test that batch forecasts match single forecasts and keep input order"""
+    print("\n=== Testing Batch Forecasting ===")
+
+    forecaster = Forecasting()
+    forecaster.yield_model, forecaster.demand_model = make_models()
+
+    items = [sample_features(seed) for seed in range(20)]
+    del items[3]['price_history']
+    items.insert(5, {'temperature': 'hot'})
+    items.insert(9, {'price_per_ton': 300, 'price_history': []})
+    items.insert(12, 'not a dict')
+
+    results = forecaster.get_forecast_batch(items)
+    assert len(results) == len(items)
+    for item, result in zip(items, results):
+        if isinstance(item, dict) and item.get('temperature') != 'hot' and item.get('price_history') != []:
+            single = forecaster.get_forecast(item)
+            assert np.isclose(result['yield'], single['yield'])
+            assert np.isclose(result['demand'], single['demand'])
+        else:
+            assert 'error' in result
+
+    print(f"Batch of {len(items)} items: {sum('error' in r for r in results)} validation errors")
+
+def test_forecast_intervals_from_trees_and_residuals():
+    """Test demand quantiles come from the per-tree predictions and yield quantiles from the residuals"""
+    print("\n=== Testing Forecast Intervals ===")
+
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(300, 8))
+    forecaster = Forecasting()
+    forecaster.yield_model = IncrementalLinearRegression().fit(X, X @ rng.normal(size=8) + 3 + rng.normal(0, 0.5, 300))
+    forecaster.demand_model = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, rng.normal(1000, 100, 300))
+
+    items = [sample_features(seed) for seed in range(5)]
+    X_items = forecaster.encoder.encode_batch(items).copy()
+    arrays = forecaster.predict_arrays(X_items)
+    assert arrays['yield_quantiles'].shape == arrays['demand_quantiles'].shape == (5, len(QUANTILES))
+
+    # Demand is the forest's own prediction; its quantiles are those of the individual trees
+    frame = pd.DataFrame(X_items, columns=forecaster.features)
+    assert np.allclose(arrays['demand'], forecaster.demand_model.predict(X_items))
+    trees = np.stack([tree.predict(X_items.astype(np.float32)) for tree in forecaster.demand_model.estimators_])
+    assert np.allclose(arrays['demand_quantiles'], np.quantile(trees, QUANTILES, axis=0).T)
+
+    # A compact export gives the same trees for small batches; larger ones walk the forest
+    compact = CompactForest.from_forest(forecaster.demand_model)
+    assert np.allclose(tree_predictions(forecaster.demand_model, X_items, compact), trees, rtol=1e-6)
+    large = np.repeat(X_items, COMPACT_MAX_ROWS // 5 + 1, axis=0)
+    assert np.allclose(tree_predictions(forecaster.demand_model, large, compact).mean(axis=0),
+                       forecaster.demand_model.predict(large))
+    # ...and both reject the same inputs
+    missing = X_items.copy()
+    missing[0, 0] = np.nan
+    for rows in (missing, np.repeat(missing, COMPACT_MAX_ROWS // 5 + 1, axis=0)):
+        for bad, message in [(rows, 'missing values'), (rows[:, :-1], 'Expected 8 features, got 7')]:
+            try:
+                tree_predictions(forecaster.demand_model, bad, compact)
+                raise AssertionError('expected ValueError')
+            except ValueError as e:
+                assert message in str(e)
+
+    # Yield quantiles are normal quantiles of the prediction error around the point prediction
+    std = forecaster.yield_model.prediction_std(frame)
+    assert np.allclose(arrays['yield_quantiles'], arrays['yield'][:, None] + std[:, None] * NORMAL_QUANTILES)
+
+    single = forecaster.get_forecast(items[0])
+    print(single)
+    assert single['yield_interval']['p10'] < single['yield_interval']['p50'] < single['yield_interval']['p90']
+    assert single['demand_interval']['p10'] <= single['demand_interval']['p90']
+    assert 0 <= single['confidence'] <= 1
+    batch = forecaster.get_forecast_batch(items)
+    assert batch[0]['yield_interval'] == single['yield_interval']
+    assert batch[0]['demand_interval'] == single['demand_interval']
+
+    # A plain LinearRegression keeps no residual statistics
+    forecaster.yield_model = make_models()[0]
+    assert forecaster.get_forecast(items[0])['yield_interval'] is None
+
+def legacy_prepare_features(features, data):
+    """Reference copy of the original one-row DataFrame feature path"""
+    df = pd.DataFrame([data])
+    if 'price_history' in data:
+        df['price_moving_avg'] = np.mean(data['price_history'])
+        df['price_change'] = (data['price_per_ton'] - data['price_history'][-1]) / data['price_history'][-1]
+    else:
+        df['price_moving_avg'] = data['price_per_ton']
+        df['price_change'] = 0
+    for feature in features:
+        if feature not in df.columns:
+            df[feature] = 0
+    return df[features]
+
+def test_feature_encoder_matches_dataframe_path():
+    """Test that the NumPy encoder reproduces the legacy DataFrame features exactly"""
+    print("\n=== Testing Feature Encoder ===")
+
+    forecaster = Forecasting()
+    items = [sample_features(seed) for seed in range(50)]
+    for item in items[::3]:
+        del item['price_history']
+    for item in items[::4]:
+        del item['humidity']
+
+    expected = np.vstack([
+        legacy_prepare_features(forecaster.features, item).to_numpy(dtype=np.float64) for item in items
+    ])
+    for item, row in zip(items, expected):
+        assert np.array_equal(forecaster.encoder.encode(item)[0], row)
+    assert np.array_equal(forecaster.encoder.encode_batch(items), expected)
+
+    df = forecaster.prepare_features(items[0])
+    assert list(df.columns) == forecaster.features
+    assert np.array_equal(df.to_numpy(), expected[:1])
+
+def test_forecast_cache_ttl_lru_and_shared_backend():
+    """Test cache keys, TTL expiry, LRU eviction and sharing through SQLite"""
+    print("\n=== Testing Forecast Cache ===")
+
+    features = sample_features()
+    key = cache_key('wheat', 'north', 'v1', features)
+    assert key == cache_key('wheat', 'north', 'v1', dict(reversed(list(features.items()))))
+    assert key != cache_key('wheat', 'north', 'v2', features)
+
+    cache = ForecastCache(ttl=60, max_entries=2)
+    assert cache.get(key) is None
+    cache.set(key, {'yield': 1.0})
+    cache.set('b', {'yield': 2.0})
+    assert cache.get(key) == {'yield': 1.0}
+    cache.set('c', {'yield': 3.0})  # evicts 'b', the least recently used
+    assert cache.get('b') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (1, 2, 1, 2)
+
+    expired = ForecastCache(ttl=-1)
+    expired.set(key, {'yield': 1.0})
+    assert expired.get(key) is None and expired.stats()['expirations'] == 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.db')
+        writer = ForecastCache(ttl=60, backend=SQLiteCacheBackend(path))
+        reader = ForecastCache(ttl=60, backend=SQLiteCacheBackend(path))
+        writer.set(key, {'yield': 4.5, 'peak_months': ['June']})
+        assert reader.get(key) == {'yield': 4.5, 'peak_months': ['June']}
+        assert reader.stats()['shared_hits'] == 1
+        assert len(reader) == 1
+
+        # Expired rows are deleted by later writes once the purge interval has passed
+        backend = SQLiteCacheBackend(path, purge_interval=0)
+        backend.set('stale', {'yield': 1.0}, time.time() - 1)
+        backend.set('fresh', {'yield': 2.0}, time.time() + 60)
+        keys = [row[0] for row in backend._connection().execute('SELECT key FROM forecast_cache')]
+        assert 'stale' not in keys and 'fresh' in keys and key in keys
+
+if __name__ == "__main__":
+    test_model_registry_publish_and_hot_swap()
+    test_forecast_batch_matches_single()
+    test_forecast_intervals_from_trees_and_residuals()
+    test_feature_encoder_matches_dataframe_path()
+    test_forecast_cache_ttl_lru_and_shared_backend()
@@ -0,0 +1,188 @@
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.database import Database
+from core.forecasting import Forecasting
+from core.incremental import IncrementalLinearRegression, grow_forest
+from core.ingestion import build_training_set, load_training_set, HISTORICAL_DIR
+from core.model_registry import ModelRegistry
+from core.seasonal import SeasonalForecaster
+from core.training import ModelUpdater, observation_features, partition_arrays, train_forecasting_models
+
+def test_incremental_regression_matches_batch_fit():
+    """Test that partial_fit on new rows gives the coefficients of a refit on all rows"""
+    print("\n=== Testing Incremental Least Squares ===")
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 8)) * [10, 50, 20, 5, 3, 300, 300, 0.1]
+    y = X @ rng.normal(size=8) + 4 + rng.normal(scale=0.1, size=500)
+
+    model = IncrementalLinearRegression().fit(X[:400], y[:400])
+    for batch in np.array_split(np.arange(400, 500), 4):
+        model.partial_fit(X[batch], y[batch])
+    reference = LinearRegression().fit(X, y)
+
+    assert model.n_samples_seen_ == 500
+    assert np.allclose(model.coef_, reference.coef_, rtol=1e-6, atol=1e-8)
+    assert np.allclose(model.predict(X[:5]), reference.predict(X[:5]))
+
+    # Residual variance and prediction error from the sums match the textbook formulas on all rows
+    A = np.column_stack([X, np.ones(500)])
+    residuals = y - reference.predict(X)
+    variance = residuals @ residuals / (500 - 9)
+    assert np.isclose(model.residual_variance_, variance, rtol=1e-8)
+    leverage = np.einsum('ij,jk,ik->i', A[:5], np.linalg.inv(A.T @ A), A[:5])
+    assert np.allclose(model.prediction_std(X[:5]), np.sqrt(variance * (1 + leverage)), rtol=1e-4)
+
+    # With forgetting the fit leans towards the newest rows
+    drifted = y + np.where(np.arange(500) >= 400, 50.0, 0.0)
+    forgetful = IncrementalLinearRegression(forgetting=0.95).fit(X[:400], drifted[:400]).partial_fit(X[400:], drifted[400:])
+    assert forgetful.intercept_ > model.intercept_ + 25
+
+def test_residual_variance_on_large_targets_and_few_rows():
+    """Test the residual variance keeps its precision on large targets and is absent without spare rows"""
+    print("\n=== Testing Residual Statistics ===")
+
+    # Targets around 50,000 with a residual spread of 0.01: y'y and the fitted sums agree to ~1e-12
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(4000, 8)) * [10, 50, 20, 5, 3, 300, 300, 0.1] + [25, 150, 60, 40, 6, 3000, 3000, 0]
+    y = X @ rng.normal(size=8) * 10 + 50000 + rng.normal(scale=0.01, size=4000)
+    model = IncrementalLinearRegression().fit(X[:2000], y[:2000])
+    for batch in np.array_split(np.arange(2000, 4000), 5):
+        model.partial_fit(X[batch], y[batch])
+    residuals = y - LinearRegression().fit(X, y).predict(X)
+    assert np.isclose(model.residual_variance_, residuals @ residuals / (4000 - 9), rtol=1e-6)
+
+    # Fewer rows than coefficients leave no residual degrees of freedom, so there is no interval
+    few = IncrementalLinearRegression().fit(X[:5], y[:5])
+    assert few.residual_variance_ is None and few.prediction_std(X[:3]) is None
+    forecaster = Forecasting()
+    forecaster.yield_model = few
+    forecaster.demand_model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X[:50], y[:50])
+    forecast = forecaster.get_forecast({'temperature': 25, 'rainfall': 150, 'price_per_ton': 3000})
+    assert forecast['yield_interval'] is None and forecast['demand_interval'] is not None
+    json.dumps(forecast, allow_nan=False)
+
+def test_grow_forest_replaces_oldest_trees():
+    """Test that new trees are appended, the oldest retired and the original forest left untouched"""
+    print("\n=== Testing Forest Growth ===")
+
+    rng = np.random.default_rng(1)
+    X, y = rng.normal(size=(200, 4)), rng.normal(size=200)
+    forest = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+    original = list(forest.estimators_)
+
+    grown = grow_forest(forest, X[:40], y[:40] + 100, n_trees=5, random_state=3)
+    assert grown.n_estimators == 20 and len(grown.estimators_) == 20
+    assert grown.estimators_[:15] == original[5:]
+    assert forest.estimators_ == original
+    assert grown.predict(X[:1])[0] > forest.predict(X[:1])[0] + 10
+
+def test_model_updater_applies_new_rows():
+    """Test that new crop_yields rows update and republish the default and partition models"""
+    print("\n=== Testing Background Model Updates ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        db.import_historical_data(HISTORICAL_DIR)
+
+        # Features joined in SQL match the ones the training set builds
+        training_set = load_training_set(build_training_set(output_dir=os.path.join(tmp, 'ts')))
+        observations = db.query_new_observations(0)
+        assert len(observations) == len(training_set)
+        frame = observations.sort_values(['date', 'crop_type', 'region'], kind='stable')
+        expected = training_set.sort_values(['date', 'crop_type', 'region'], kind='stable')
+        X, _, y_demand = observation_features(frame)
+        assert np.allclose(X, partition_arrays(expected)[0], rtol=1e-5, atol=1e-3)
+        assert np.allclose(y_demand, expected['demand'].to_numpy(), rtol=1e-5)
+
+        wheat = training_set[training_set['crop_type'] == 'wheat']
+        registry = ModelRegistry(os.path.join(tmp, 'registry'))
+        train_forecasting_models(wheat, registry, version='base')
+        seasonal = SeasonalForecaster(os.path.join(tmp, 'seasonal_model.npz'))
+        updater = ModelUpdater(db, registry, min_forest_rows=30, trees_per_update=10, seasonal=seasonal)
+        # The watermark is fixed at startup, before the first pass
+        updater.prepare()
+        assert updater.stats()['last_id'] == len(observations)
+        version = seasonal.version
+
+        with db.pool.connection() as conn:
+            wheat_id, north_id, south_id = [conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+                                            for table, name in [('crops', 'wheat'), ('regions', 'north'), ('regions', 'south')]]
+            rows = [(wheat_id, north_id if i % 4 else south_id, f'2023-01-{1 + i % 28:02d}', 3.5, 4200.0 + i)
+                    for i in range(40)]
+            conn.executemany('INSERT INTO crop_yields (crop_id, region_id, date, yield_amount, demand) '
+                             'VALUES (?, ?, ?, ?, ?)', rows)
+            conn.commit()
+
+        published = {(p['crop_type'], p['region']): p for p in updater.poll()}
+        print(f"Updated {sorted(published)} in {updater.stats()['seconds'] * 1000:.0f} ms")
+        assert set(published) == {('default', 'default'), ('wheat', 'north'), ('wheat', 'south')}
+        assert published[('default', 'default')]['rows'] == 40
+        assert published[('wheat', 'north')]['trees_added'] == 10
+        # Only 10 new south rows so far; they wait for more before the forest grows
+        assert published[('wheat', 'south')]['trees_added'] == 0
+        assert updater.stats()['pending_forest_rows'] == 10
+
+        # The seasonal models advance over the 28 new days
+        assert updater.stats()['seasonal_days'] == 28
+        assert seasonal.version > version
+        assert seasonal.model().last_day == np.datetime64('2023-01-28').astype(np.int64)
+
+        entry = registry.resolve('wheat', 'north')
+        assert entry.version != 'base'
+        assert entry.forecaster.yield_model.n_samples_seen_ == 365 + 30
+        assert len(entry.forecaster.demand_model.estimators_) == 100
+
+        # A restarted updater resumes after the last applied row
+        restarted = ModelUpdater(db, registry)
+        assert restarted.stats()['last_id'] is None
+        assert restarted.last_id == updater.last_id
+        assert updater.poll() == []
+
+        # A pass that fails partway is retried without applying any rows twice
+        with db.pool.connection() as conn:
+            conn.executemany('INSERT INTO crop_yields (crop_id, region_id, date, yield_amount, demand) '
+                             'VALUES (?, ?, ?, ?, ?)',
+                             [(wheat_id, north_id if i % 2 else south_id, '2023-01-28', 3.5, 4300.0 + i)
+                              for i in range(8)])
+            conn.commit()
+        publish, calls = registry.publish, []
+
+        def failing_publish(crop_type, region, *args, **kwargs):
+            calls.append((crop_type, region))
+            if (crop_type, region) == ('wheat', 'south'):
+                raise OSError('disk full')
+            return publish(crop_type, region, *args, **kwargs)
+
+        registry.publish = failing_publish
+        try:
+            updater.poll()
+            assert False, "the failing publish should propagate"
+        except OSError:
+            pass
+        del registry.publish
+        assert calls == [('default', 'default'), ('wheat', 'north'), ('wheat', 'south')]
+        assert updater.last_id == restarted.last_id
+        assert registry.resolve('wheat', 'north').forecaster.yield_model.n_samples_seen_ == 395 + 4
+
+        published = {(p['crop_type'], p['region']): p for p in updater.poll()}
+        assert set(published) == {('wheat', 'south')} and published[('wheat', 'south')]['rows'] == 4
+        assert registry.resolve('wheat', 'north').forecaster.yield_model.n_samples_seen_ == 395 + 4
+        assert registry.resolve('wheat', 'north').last_yield_id == updater.last_id == restarted.last_id + 8
+        # 8 default, 4 north and 10 + 4 south rows wait for their forests
+        assert updater.stats()['pending_forest_rows'] == 26
+
+if __name__ == "__main__":
+    test_incremental_regression_matches_batch_fit()
+    test_residual_variance_on_large_targets_and_few_rows()
+    test_grow_forest_replaces_oldest_trees()
+    test_model_updater_applies_new_rows()
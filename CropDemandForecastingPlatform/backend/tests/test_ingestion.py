@@ -0,0 +1,145 @@
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.feature_store import FeatureStore
+from core.forecasting import Forecasting
+from core.ingestion import build_training_set, load_training_set, HISTORICAL_DIR
+from core.model_registry import ModelRegistry
+from core.training import train_forecasting_models, plan_parallelism
+
+def test_training_set_is_chunk_invariant():
+    """Test that streaming chunk size does not change the joined training set"""
+    print("\n=== Testing Training Set Ingestion ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        small = load_training_set(build_training_set(output_dir=os.path.join(tmp, 'small'), chunksize=777))
+        large = load_training_set(build_training_set(output_dir=os.path.join(tmp, 'large'), chunksize=10 ** 6))
+        pd.testing.assert_frame_equal(small, large)
+
+        yields = pd.read_csv(HISTORICAL_DIR / 'crop_yields.csv')
+        assert len(small) == len(yields)
+        print(f"Training set: {len(small)} rows, crops: {list(small['crop_type'].cat.categories)}")
+
+        # Rolling price features match a straightforward per-series computation
+        prices = pd.read_csv(HISTORICAL_DIR / 'market_prices.csv')
+        series = prices[(prices['crop_type'] == 'corn') & (prices['region'] == 'east')]['price'].to_numpy()
+        rows = small[(small['crop_type'] == 'corn') & (small['region'] == 'east')]
+        for t in (0, 1, 5, 200):
+            history = series[max(0, t - 7):t]
+            expected_avg = history.mean() if len(history) else series[t]
+            expected_change = (series[t] - series[t - 1]) / series[t - 1] if t else 0.0
+            assert np.isclose(rows['price_moving_avg'].iloc[t], expected_avg, rtol=1e-6)
+            assert np.isclose(rows['price_change'].iloc[t], expected_change, rtol=1e-5, atol=1e-7)
+
+def test_train_and_publish_from_training_set():
+    """Test that models trained on the historical data are served by the registry"""
+    print("\n=== Testing Training From Historical Data ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        training_set = load_training_set(build_training_set(output_dir=os.path.join(tmp, 'ts')))
+        wheat = training_set[training_set['crop_type'] == 'wheat']
+        registry = ModelRegistry(os.path.join(tmp, 'registry'))
+        published = train_forecasting_models(wheat, registry, version='test')
+
+        assert sorted((p['crop_type'], p['region']) for p in published)[0] == ('default', 'default')
+        assert len(published) == 6
+
+        row = wheat[wheat['region'] == 'north'].iloc[100]
+        features = {f: float(row[f]) for f in ['temperature', 'rainfall', 'humidity', 'soil_moisture', 'month', 'price_per_ton']}
+        forecast = registry.resolve('wheat', 'north').forecaster.get_forecast(features)
+        print(f"Wheat/north forecast: {forecast['yield']:.2f} (actual {row['yield']:.2f})")
+        assert forecast['demand'] > 0
+
+def test_parallel_training_matches_serial():
+    """Test that training partitions on a process pool over shared memory publishes the same models"""
+    print("\n=== Testing Parallel Training ===")
+
+    assert plan_parallelism(26, None, cpu_count=32) == (26, 1)
+    assert plan_parallelism(4, None, cpu_count=32) == (4, 8)
+    assert plan_parallelism(26, 1, cpu_count=8) == (1, 8)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        training_set = load_training_set(build_training_set(output_dir=os.path.join(tmp, 'ts')))
+        subset = training_set[training_set['crop_type'].isin(['wheat', 'rice'])]
+        serial = ModelRegistry(os.path.join(tmp, 'serial'))
+        parallel = ModelRegistry(os.path.join(tmp, 'parallel'))
+        train_forecasting_models(subset, serial, version='serial', n_workers=1, rf_jobs=1)
+        published = train_forecasting_models(subset, parallel, n_workers=2)
+
+        assert len(published) == 11
+        assert len({p['version'] for p in published}) == 1
+        print(f"Trained {len(published)} partitions on {len({p['worker'] for p in published})} worker(s)")
+
+        rows = subset.iloc[::97]
+        for _, row in rows.iterrows():
+            features = {f: float(row[f]) for f in ['temperature', 'rainfall', 'humidity', 'soil_moisture', 'month', 'price_per_ton']}
+            for key in [(row['crop_type'], row['region']), ('default', 'default')]:
+                expected = serial.resolve(*key).forecaster.get_forecast(features)
+                actual = parallel.resolve(*key).forecaster.get_forecast(features)
+                assert abs(expected['yield'] - actual['yield']) < 1e-9
+                assert abs(expected['demand'] - actual['demand']) < 1e-9
+
+def test_feature_store_predicate_pushdown():
+    """Test partition pruning and filtered reads against a plain pandas filter"""
+    print("\n=== Testing Feature Store ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeatureStore(tmp)
+        rows = store.build(chunksize=2000)
+        assert rows == {'weather': 9125, 'prices': 9125, 'yields': 9125}
+        assert len(store.partitions('prices', region='north', year=2022)) == 1
+
+        prices = pd.read_csv(HISTORICAL_DIR / 'market_prices.csv', parse_dates=['date'])
+        expected = prices[(prices['crop_type'] == 'wheat') & (prices['region'] == 'north')]
+        result = store.read('prices', crop_type='wheat', region='north', year=2022)
+        assert len(result) == len(expected)
+        np.testing.assert_allclose(result['price'], expected['price'], rtol=1e-6)
+        assert (result['date'].to_numpy() == expected['date'].to_numpy()).all()
+
+        window = store.read('yields', ['date', 'yield'], crop_type=['rice', 'corn'], region='east',
+                            start='2022-03-01', end='2022-03-10')
+        assert len(window) == 20
+        assert window['date'].min() == pd.Timestamp('2022-03-01')
+
+        features = Forecasting().features_from_store(store, 'wheat', 'north', '2022-06-15')
+        day = expected[expected['date'] <= '2022-06-15']['price'].to_numpy()
+        assert np.isclose(features['price_per_ton'], day[-1], rtol=1e-6)
+        np.testing.assert_allclose(features['price_history'], day[-8:-1], rtol=1e-6)
+        assert features['month'] == 6 and 'temperature' in features
+
+        # Column maps are opened once and reused until the table is rebuilt, here by another instance
+        opened = {path: dict(columns) for path, (_, columns) in store._partitions['prices'].items()}
+        store.read_arrays('prices', ['price'], crop_type='wheat', region='north', year=2022)
+        assert all(store._partitions['prices'][path][1][name] is column
+                   for path, columns in opened.items() for name, column in columns.items())
+        FeatureStore(tmp).write_table('prices', iter([pd.DataFrame({
+            'date': pd.to_datetime(['2023-01-01', '2023-01-02']), 'crop_type': ['wheat', 'wheat'],
+            'region': ['north', 'north'], 'price': [1.0, 2.0]
+        })]))
+        assert len(store.partitions('prices')) == 1
+        assert store.read_arrays('prices', ['price'], region='north')['price'].tolist() == [1.0, 2.0]
+
+    # exists() remembers built tables and rechecks missing ones only after check_interval
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeatureStore(tmp, check_interval=60.0)
+        assert not store.exists('prices')
+        FeatureStore(tmp).write_table('prices', iter([pd.DataFrame({
+            'date': pd.to_datetime(['2023-01-01']), 'crop_type': ['wheat'], 'region': ['north'], 'price': [1.0]
+        })]))
+        assert not store.exists('prices')
+        store.check_interval = 0.0
+        assert store.exists('prices') and not store.exists()
+        os.remove(os.path.join(tmp, 'prices', '_table.json'))
+        assert store.exists('prices')
+
+if __name__ == "__main__":
+    test_training_set_is_chunk_invariant()
+    test_train_and_publish_from_training_set()
+    test_parallel_training_matches_serial()
+    test_feature_store_predicate_pushdown()
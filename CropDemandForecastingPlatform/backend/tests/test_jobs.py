@@ -0,0 +1,166 @@
+import sys
+import os
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Worker processes inherit this, so the predictors never touch models/store
+os.environ.setdefault('CROP_MODEL_STORE', tempfile.mkdtemp(prefix='model-store-'))
+
+from core.database import Database
+from core import jobs
+from core.jobs import JobManager, expand_sweep, predict_chunk
+
+def test_expand_sweep():
+    """Test grid expansion, defaults and validation of sweep requests"""
+    print("\n=== Testing Sweep Expansion ===")
+
+    columns = expand_sweep({'grid': {'crop_type': ['wheat', 'rice'], 'region': ['north', 'south', 'east'],
+                                     'temperature': [20, 25, 30]}}, max_scenarios=100)
+    assert len(columns['crop_type']) == 18
+    assert np.all(columns['rainfall'] == 150.0) and np.all(columns['soil_quality'] == 7.0)
+
+    columns = expand_sweep({'scenarios': [{'crop_type': 'corn', 'region': 'west', 'rainfall': 90}]}, 10)
+    assert columns['region'] == ['west'] and columns['rainfall'][0] == 90
+
+    for spec, message in [
+        ({}, "either"),
+        ({'grid': {'crop_type': ['wheat'], 'region': ['north'], 'temperature': list(range(20))}}, "at most"),
+        ({'scenarios': [{'crop_type': 'barley', 'region': 'north'}]}, "crop_type"),
+        ({'scenarios': [{'crop_type': 'wheat', 'region': 'north', 'rainfall': 'lots'}]}, "numeric"),
+    ]:
+        try:
+            expand_sweep(spec, max_scenarios=10)
+            raise AssertionError(f'expected ValueError for {spec}')
+        except ValueError as e:
+            assert message in str(e)
+
+def test_job_runs_on_process_pool_and_pages_results():
+    """Test a sweep runs in chunks on worker processes and results persist for paging"""
+    print("\n=== Testing Forecast Jobs ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        db.ensure_schema()
+        with db.pool.connection() as conn:
+            conn.execute("INSERT INTO forecast_jobs (id, status, total, owner) VALUES "
+                         "('dead', 'running', 10, ?), ('elsewhere', 'running', 10, 'other-host:1')",
+                         (f'{socket.gethostname()}:999999999',))
+            conn.commit()
+
+        manager = JobManager(db, max_workers=1, chunk_size=40)
+        try:
+            assert manager.get('dead')['status'] == 'failed'
+            assert manager.get('elsewhere')['status'] == 'running'
+
+            spec = {'grid': {'crop_type': ['wheat', 'corn', 'cotton'], 'region': ['north', 'central'],
+                             'temperature': [18.0, 24.0, 30.0], 'rainfall': [100.0, 150.0, 200.0, 250.0]}}
+            job = manager.submit(spec)
+            assert job['total'] == 72
+            job = manager.wait(job['id'], timeout=120)
+            assert job['status'] == 'completed' and job['completed'] == 72 and job['progress'] == 1.0
+
+            first = manager.results(job['id'], offset=0, limit=50)
+            second = manager.results(job['id'], offset=50, limit=50)
+            assert [r['index'] for r in first + second] == list(range(72))
+
+            columns = expand_sweep(spec, max_scenarios=100)
+            yields, demands = predict_chunk(columns)
+            assert np.allclose([r['yield'] for r in first + second], yields)
+            assert np.allclose([r['demand'] for r in first + second], demands)
+        finally:
+            manager.shutdown()
+
+def test_failing_chunk_fails_job_and_cancels_the_rest():
+    """Test a chunk that raises fails its job, cancels pending chunks and leaves the manager usable"""
+    print("\n=== Testing Failed Forecast Jobs ===")
+
+    release = threading.Event()
+
+    def failing_chunk(columns):
+        # Holds the single worker thread until every chunk is queued behind it
+        release.wait(10)
+        raise RuntimeError('model exploded')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        manager = JobManager(db, chunk_size=1, executor=ThreadPoolExecutor(max_workers=1))
+        spec = {'scenarios': [{'crop_type': 'wheat', 'region': 'north'}] * 4}
+        try:
+            jobs.predict_chunk = failing_chunk
+            try:
+                job = manager.submit(spec)
+                release.set()
+                job = manager.wait(job['id'], timeout=10)
+            finally:
+                jobs.predict_chunk = predict_chunk
+            assert job['status'] == 'failed' and 'model exploded' in job['error']
+            assert job['completed'] == 0 and manager.results(job['id']) == []
+
+            # The manager's lock must have been released: a new job runs to completion
+            submitted = []
+            thread = threading.Thread(target=lambda: submitted.append(manager.submit(spec)))
+            thread.start()
+            thread.join(10)
+            assert not thread.is_alive() and submitted
+            job = manager.wait(submitted[0]['id'], timeout=60)
+            assert job['status'] == 'completed' and job['completed'] == 4
+        finally:
+            release.set()
+            manager.shutdown()
+
+def test_chunks_finishing_during_submit_stay_cancellable():
+    """Test a chunk that finishes before the rest are submitted leaves the job's other chunks cancellable"""
+    print("\n=== Testing Forecast Job Submission ===")
+
+    release = threading.Event()
+    calls = []
+
+    def chunk(columns):
+        calls.append(len(calls))
+        if len(calls) == 2:
+            release.wait(10)
+            raise RuntimeError('model exploded')
+        return np.zeros(len(columns['crop_type'])), np.zeros(len(columns['crop_type']))
+
+    class FirstChunkFirst(ThreadPoolExecutor):
+        # The first chunk is done before the job manager sees its future, so its callback runs during submit
+        submitted = 0
+
+        def submit(self, fn, *args, **kwargs):
+            future = super().submit(fn, *args, **kwargs)
+            self.submitted += 1
+            if self.submitted == 1:
+                future.result(10)
+            return future
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        manager = JobManager(db, chunk_size=1, executor=FirstChunkFirst(max_workers=1))
+        try:
+            jobs.predict_chunk = chunk
+            try:
+                job = manager.submit({'scenarios': [{'crop_type': 'wheat', 'region': 'north'}] * 4})
+                assert job['id'] in manager._futures
+                release.set()
+                job = manager.wait(job['id'], timeout=10)
+            finally:
+                jobs.predict_chunk = predict_chunk
+            assert job['status'] == 'failed' and job['completed'] == 1
+            # The chunks queued behind the failing one were cancelled rather than run
+            manager.shutdown()
+            assert calls == [0, 1] and manager._futures == {}
+        finally:
+            release.set()
+            manager.shutdown()
+
+if __name__ == "__main__":
+    test_expand_sweep()
+    test_job_runs_on_process_pool_and_pages_results()
+    test_failing_chunk_fails_job_and_cancels_the_rest()
+    test_chunks_finishing_during_submit_stay_cancellable()
@@ -0,0 +1,73 @@
+import sys
+import os
+import time
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.metrics import Histogram, Metrics, NULL_SPAN, SamplingProfiler
+
+def test_histogram_buckets_and_prometheus_text():
+    """Test cumulative buckets, label rendering and stats gauges in the exposition format"""
+    print("\n=== Testing Metrics Rendering ===")
+
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    counts, total, count = histogram.snapshot()
+    assert counts == [2, 3, 4] and count == 4 and abs(total - 3.65) < 1e-9
+
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.observe('http_request_seconds', 0.5, 'Request time', endpoint='forecast', status=200)
+    metrics.register_stats('cache', lambda: {'hits': 3, 'hit_rate': 0.75, 'shared': False, 'name': 'memory'})
+    text = metrics.render()
+    print(text)
+
+    assert '# TYPE agritech_http_request_seconds histogram' in text
+    assert 'agritech_http_request_seconds_bucket{endpoint="forecast",status="200",le="0.1"} 0' in text
+    assert 'agritech_http_request_seconds_bucket{endpoint="forecast",status="200",le="+Inf"} 1' in text
+    assert 'agritech_http_request_seconds_count{endpoint="forecast",status="200"} 1' in text
+    assert 'agritech_cache_hits 3\n' in text and 'agritech_cache_hit_rate 0.75\n' in text
+    assert 'agritech_cache_shared 0\n' in text and 'agritech_cache_name' not in text
+
+def test_spans_record_only_when_enabled():
+    """Test spans and timed functions feed the span histogram, and are no-ops while disabled"""
+    print("\n=== Testing Timing Spans ===")
+
+    metrics = Metrics(enabled=False)
+    timed_sleep = metrics.timed('sleep')(time.sleep)
+    assert metrics.span('stage') is NULL_SPAN
+    with metrics.span('stage'):
+        timed_sleep(0.001)
+    assert 'span_seconds' not in metrics.render()
+
+    metrics.enabled = True
+    with metrics.span('stage'):
+        timed_sleep(0.002)
+    counts, total, count = metrics.histogram('span_seconds', span='sleep').snapshot()
+    assert count == 1 and total >= 0.002
+    assert 'agritech_span_seconds_count{span="stage"} 1' in metrics.render()
+
+def test_sampling_profiler_finds_hot_function():
+    """Test the sampling profiler attributes samples to the function keeping the thread busy"""
+    print("\n=== Testing Sampling Profiler ===")
+
+    def busy_loop(seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    profiler = SamplingProfiler(interval=0.001).start()
+    busy_loop(0.2)
+    profile = profiler.stop().to_dict()
+    print(f"{profile['samples']} samples, top: {profile['functions'][:2]}")
+
+    assert profile['samples'] > 0
+    assert profile['functions'][0]['function'] == 'test_metrics.py:busy_loop'
+    assert profile['stacks'][0]['stack'].endswith('test_metrics.py:test_sampling_profiler_finds_hot_function;'
+                                                  'test_metrics.py:busy_loop')
+
+if __name__ == "__main__":
+    test_histogram_buckets_and_prometheus_text()
+    test_spans_record_only_when_enabled()
+    test_sampling_profiler_finds_hot_function()
@@ -1,14 +1,20 @@
 import sys
 import os
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from sklearn.metrics import mean_squared_error, r2_score
 import matplotlib.pyplot as plt
+import tempfile
 
-# Add the backend directory to the Python path
+# Add the backend and backend source directories to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from models.crop_models import YieldPredictor, DemandPredictor
+from models.model_store import ModelStore
+from core.compact_forest import CompactForest
+from core.feature_store import FeatureStore
 
 def test_model_predictions():
     """Test both yield and demand prediction models"""
@@ -126,6 +132,105 @@ def test_model_sensitivity():
         print(f"Yield: {yield_pred:.2f} (Δ: {yield_pred - base_yield:+.2f})")
         print(f"Demand: {demand_pred:.2f} (Δ: {demand_pred - base_demand:+.2f})")
 
+def test_model_store_reuse():
+    """Test that a second construction loads the stored artifacts"""
+    print("\n=== Testing Model Store ===")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = ModelStore(store_dir)
+        trained = DemandPredictor(store=store)
+        loaded = DemandPredictor(store=store)
+
+        assert loaded.model_version == trained.model_version
+        # Predictions come from the stored compact forest; the full forest loads on first access
+        assert loaded._model is None and loaded.compact_model is not None
+        assert list((Path(store_dir) / 'demand').iterdir()) == [Path(store_dir) / 'demand' / trained.model_version]
+
+        X = trained.data[trained.feature_columns]
+        np.testing.assert_allclose(loaded.model.predict(X), trained.model.predict(X))
+        print(f"Reused demand model version {loaded.model_version}")
+
+        # Changing hyperparameters must produce a new version
+        class ShallowDemandPredictor(DemandPredictor):
+            model_params = {'n_estimators': 10, 'random_state': 42}
+
+        shallow = ShallowDemandPredictor(store=store)
+        assert shallow.model_version != trained.model_version
+
+def test_compact_forest_matches_sklearn():
+    """Test the packed float32 forest reaches the same leaves and predictions as sklearn"""
+    print("\n=== Testing Compact Forest ===")
+
+    predictor = DemandPredictor(store=False)
+    rng = np.random.RandomState(7)
+    X = predictor.data[predictor.feature_columns].to_numpy(dtype=np.float64)
+    X[:, 2:] += rng.normal(0, 1, (len(X), 3))
+
+    compact = CompactForest.from_forest(predictor.model)
+    expected = predictor.model.predict(pd.DataFrame(X, columns=predictor.feature_columns))
+    np.testing.assert_allclose(compact.predict(X), expected, rtol=CompactForest.RTOL)
+    np.testing.assert_array_equal(compact.apply(X) - compact.roots[:, None],
+                                  predictor.model.apply(pd.DataFrame(X.astype(np.float32), columns=predictor.feature_columns)).T)
+
+    # Inputs exactly on a split threshold take the same branch as in sklearn
+    tree = predictor.model.estimators_[0].tree_
+    on_split = np.repeat(X[:1], 5, axis=0).astype(np.float32)
+    on_split[:, tree.feature[0]] = np.float32(tree.threshold[0])
+    np.testing.assert_allclose(compact.predict(on_split), predictor.model.predict(
+        pd.DataFrame(on_split, columns=predictor.feature_columns)), rtol=CompactForest.RTOL)
+
+    batch = predictor.predict_batch(['wheat', 'cotton'], ['north', 'west'], [25, 30], [150, 120], [7, 6])
+    assert batch.shape == (2,) and (batch >= 0).all()
+
+    sklearn_bytes = sum(e.tree_.__getstate__()['nodes'].nbytes + e.tree_.value.nbytes
+                        for e in predictor.model.estimators_)
+    print(f"{compact.n_nodes} nodes: {compact.nbytes / 1024:.0f} KiB packed vs {sklearn_bytes / 1024:.0f} KiB in sklearn")
+    assert compact.nbytes * 3 < sklearn_bytes
+
+def test_training_data_generation():
+    """Test columnar target generation is reproducible and chunkable"""
+    print("\n=== Testing Training Data Generation ===")
+
+    predictor = YieldPredictor(store=False)
+    chunks = list(predictor.iter_training_chunks(n_samples=2500, chunk_size=1000))
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+
+    again = list(predictor.iter_training_chunks(n_samples=2500, chunk_size=1000))
+    for chunk, repeat in zip(chunks, again):
+        pd.testing.assert_frame_equal(chunk, repeat)
+
+    # Vectorized targets match the row-wise formula
+    row = chunks[1].iloc[17]
+    expected = (predictor.base_yields[row['crop_type']] *
+                (1 + 0.1 * (row['temperature'] - 25) / 5) *
+                (1 + 0.2 * (row['rainfall'] - 150) / 30) *
+                (1 + 0.15 * (row['soil_quality'] - 7)))
+    assert row['yield'] == expected
+
+    demand = DemandPredictor(store=False).data
+    assert (demand.groupby('region', observed=True)['demand'].mean()[['north', 'central']] >
+            demand.groupby('region', observed=True)['demand'].mean()[['south', 'east', 'west']].max()).all()
+
+def test_inputs_from_feature_store():
+    """Test predictors take the region's latest stored weather and simulate it for regions without any"""
+    print("\n=== Testing Predictor Inputs From The Feature Store ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeatureStore(tmp)
+        store.write_table('weather', iter([pd.DataFrame({
+            'date': pd.to_datetime(['2023-06-01', '2023-06-02']), 'region': ['north', 'north'],
+            'temperature': [18.0, 31.0], 'rainfall': [90.0, 210.0], 'humidity': [60.0, 55.0]
+        })]))
+        predictor = YieldPredictor(store=False, feature_store=store)
+        X = predictor.preprocess_input('wheat', 'north')
+        assert X[0, 2] == 31.0 and X[0, 3] == 210.0
+        assert predictor.predict('wheat', 'north') >= 0
+
+        # South has no stored weather, and a predictor without a store keeps simulating
+        assert predictor.preprocess_input('wheat', 'south')[0, 2] != 31.0
+        plain = YieldPredictor(store=False)
+        assert plain.stored_weather('north') is None and plain.preprocess_input('wheat', 'north').shape == (1, 5)
+
 if __name__ == "__main__":
     print("=== Crop Demand Forecasting Model Test Suite ===\n")
     
@@ -134,6 +239,10 @@ if __name__ == "__main__":
         test_model_predictions()
         test_model_performance()
         test_model_sensitivity()
+        test_model_store_reuse()
+        test_compact_forest_matches_sklearn()
+        test_training_data_generation()
+        test_inputs_from_feature_store()
         
         print("\n✅ All tests completed successfully!")
         
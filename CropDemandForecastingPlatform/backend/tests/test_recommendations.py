@@ -0,0 +1,61 @@
+import sys
+import os
+import numpy as np
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.recommendation_engine import RecommendationEngine, HIGH_DEMAND, OVERSUPPLY, BALANCED, ratio_band
+
+engine = RecommendationEngine()
+
+def test_recommendation_table_lookup():
+    """Test table lookups pick the right band and month-dependent advice"""
+    print("\n=== Testing Recommendation Table ===")
+
+    assert [ratio_band(r) for r in (1.5, 0.5, 1.0, 1.2, 0.8)] == [HIGH_DEMAND, OVERSUPPLY, BALANCED, BALANCED, BALANCED]
+
+    result = engine.get_recommendation('wheat', 4.0, 6.0, month=4)
+    assert result['planting_recommendation']['confidence'] == 0.9
+    assert result['selling_strategy']['timing'].startswith('Peak selling season approaching in 2 months')
+    assert result['distribution_strategy']['recommended_markets'] == [
+        'Chennai Trade Center', 'Kolkata Wholesale Market', 'Mumbai Commodity Market']
+    assert result['market_analysis'] == {'demand_supply_ratio': 1.5, 'predicted_yield': 4.0,
+                                         'predicted_demand': 6.0, 'market_insights': ['Prices are expected to rise']}
+
+    result = engine.get_recommendation('rice', 0, 10, month=12)
+    assert result['market_analysis']['demand_supply_ratio'] == 0.0
+    assert 'oversupplied for rice' in result['planting_recommendation']['advice']
+    assert result['selling_strategy']['timing'].startswith('Current off-peak season. 9 months')
+
+    unknown = engine.get_recommendation('barley', 5.0, 5.0, month=1)
+    assert 'barley' in unknown['planting_recommendation']['advice']
+    assert unknown['selling_strategy']['peak_months'] == []
+    assert 'barley' not in engine.table
+
+def test_recommendations_batch_matches_single():
+    """Test the vectorized batch path returns exactly the single-call results"""
+    print("\n=== Testing Batch Recommendations ===")
+
+    rng = np.random.RandomState(0)
+    crops = list(engine.market_conditions) + ['barley']
+    yields = np.concatenate([rng.uniform(0, 10, size=200), [0.0, -1.0, 5.0, 5.0]])
+    demands = np.concatenate([rng.uniform(0, 15, size=200), [3.0, 2.0, 6.0, 4.0]])
+    crop_types = [crops[i % len(crops)] for i in range(len(yields))]
+
+    for month in range(1, 13):
+        batch = engine.get_recommendations_batch(crop_types, yields, demands, month=month)
+        single = [engine.get_recommendation(c, y, d, month=month)
+                  for c, y, d in zip(crop_types, yields.tolist(), demands.tolist())]
+        assert batch == single
+
+    assert len(engine.get_recommendations_batch('corn', [1.0, 2.0], [2.0, 2.0])) == 2
+    try:
+        engine.get_recommendations_batch(['corn'], [1.0, 2.0], [2.0, 2.0])
+        raise AssertionError('expected ValueError')
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    test_recommendation_table_lookup()
+    test_recommendations_batch_matches_single()
@@ -0,0 +1,148 @@
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.forecasting import get_crop_forecast
+from core.recommendation_engine import RecommendationEngine
+from core.seasonal import MEASURES, SeasonalForecaster, SeasonalModel, SeasonalUnavailable, month_of
+
+DAYS = np.arange(np.datetime64('2021-01-01'), np.datetime64('2023-01-01')).astype(np.int64)
+
+def synthetic_history(days=DAYS, seed=0):
+    """Two years of daily series: wheat rising with a July peak, rice falling with a January peak, flat corn"""
+    rng = np.random.RandomState(seed)
+    months = month_of(days)
+    crops, regions, values = [], [], {measure: [] for measure in MEASURES}
+    for crop_type, slope, peak in [('wheat', 0.3, 6), ('rice', -0.3, 0), ('corn', 0.0, 9)]:
+        for region in ['north', 'south']:
+            crops += [crop_type] * len(days)
+            regions += [region] * len(days)
+            for measure, base in [('price', 300.0), ('yield', 4.0), ('demand', 3000.0)]:
+                seasonal = 0.1 * base * np.cos(2 * np.pi * (months - peak) / 12)
+                values[measure].append(base + slope * base / 300 * (days - days[0]) + seasonal
+                                       + rng.normal(0, 0.02 * base, len(days)))
+    base = {'crop_type': np.array(crops), 'region': np.array(regions), 'day': np.tile(days, len(crops) // len(days))}
+    return {measure: {**base, 'value': np.concatenate(series)} for measure, series in values.items()}
+
+def select_days(history, start, end):
+    return {measure: {name: values[(obs['day'] >= start) & (obs['day'] <= end)] for name, values in obs.items()}
+            for measure, obs in history.items()}
+
+def test_fit_finds_peak_months_and_trends():
+    """Test every series is fitted in one pass and peaks and trend directions match the generated data"""
+    print("\n=== Testing Seasonal Fit ===")
+
+    model = SeasonalModel.fit(synthetic_history())
+    assert model.keys == [(c, r) for c in ('corn', 'rice', 'wheat') for r in ('north', 'south')]
+    assert model.level.shape == (len(MEASURES), 6) and model.season.shape == (len(MEASURES), 6, 12)
+    assert model.last_day == DAYS[-1]
+
+    conditions = model.market_conditions()
+    print(conditions)
+    assert conditions['wheat'] == {'peak_months': [6, 7, 8], 'price_trend': 'increasing', 'demand_trend': 'increasing'}
+    assert conditions['rice']['price_trend'] == 'decreasing'
+    assert set(conditions['rice']['peak_months']) == {12, 1, 2}
+    assert conditions['corn']['price_trend'] == 'stable' and conditions['corn']['peak_months'] == [9, 10, 11]
+
+    # January is wheat's seasonal low: about 300 + 0.3 * 731 - 30
+    forecast = model.forecast('wheat', 'north', horizon=10)
+    assert forecast['price'].shape == (10,)
+    assert abs(forecast['price'].mean() - 489) < 25
+    # Unknown regions average the crop's regions
+    assert np.allclose(model.forecast('wheat', 'west')['price'], model.forecast('wheat')['price'])
+
+def test_updates_continue_from_last_day():
+    """Test incremental updates apply only new days and match a single update over the same days"""
+    print("\n=== Testing Seasonal Updates ===")
+
+    history = synthetic_history()
+    model = SeasonalModel.fit(select_days(history, DAYS[0], DAYS[-61]))
+    assert model.updated(select_days(history, DAYS[0], DAYS[-61]))[1] == 0
+
+    once, days = model.updated(history)
+    assert days == 60 and once.last_day == DAYS[-1]
+    first, _ = model.updated(select_days(history, DAYS[0], DAYS[-31]))
+    twice, days = first.updated(history)
+    assert days == 30
+    for name in ('level', 'trend', 'season', 'rmse'):
+        assert np.allclose(getattr(once, name), getattr(twice, name))
+    assert np.array_equal(twice.observations, model.observations + 60)
+    # The earlier model is left as it was
+    assert model.last_day == DAYS[-61]
+
+def test_split_same_day_batches():
+    """Test a day reported in several batches is applied to every key, as if it came in one batch"""
+    print("\n=== Testing Split Same-Day Updates ===")
+
+    history = synthetic_history()
+    model = SeasonalModel.fit(select_days(history, DAYS[0], DAYS[-3]))
+    days = select_days(history, DAYS[-2], DAYS[-1])
+
+    def split(wheat):
+        return {measure: {name: values[(obs['crop_type'] == 'wheat') == wheat] for name, values in obs.items()}
+                for measure, obs in days.items()}
+
+    once, _ = model.updated(days)
+    first, applied = model.updated(split(True))
+    assert applied == 2 and first.last_day == DAYS[-1]
+    assert first.forecast('rice', 'north')['price'].shape == (30,)
+    second, applied = first.updated(split(False))
+    assert applied == 2 and np.all(second.last_days == DAYS[-1])
+    for name in ('level', 'trend', 'season', 'rmse', 'observations'):
+        assert np.allclose(getattr(once, name), getattr(second, name))
+    assert np.allclose(once.forecast_all(10), second.forecast_all(10))
+    # Reapplying either batch changes nothing
+    assert second.updated(split(True))[1] == 0 and second.updated(days)[1] == 0
+
+    # A series behind the others is forecast from its own last day
+    assert np.allclose(first.forecast('rice', 'north')['price'][:-2], model.forecast('rice', 'north')['price'][2:])
+
+def test_forecaster_cache_and_derived_recommendations():
+    """Test the fitted state is cached on disk and recommendations take peak months from it"""
+    print("\n=== Testing Seasonal Forecaster ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'seasonal_model.npz')
+        forecaster = SeasonalForecaster(path)
+        engine = RecommendationEngine(forecaster)
+        assert forecaster.stats()['fitted'] is False
+
+        # Lookups never fit the model on the request thread; warmup does
+        engine.get_recommendation('wheat', 4.0, 3000.0, month=1)
+        assert forecaster.stats()['fitted'] is False
+        engine.refresh_conditions()
+        recommendation = engine.get_recommendation('wheat', 4.0, 3000.0, month=1)
+        model = forecaster.model()
+        assert os.path.exists(path) and forecaster.stats()['series'] == len(MEASURES) * len(model.keys)
+        assert recommendation['selling_strategy']['peak_months'] == model.peak_months('wheat')
+
+        cached = SeasonalForecaster(path).model()
+        assert cached.keys == model.keys and np.allclose(cached.season, model.season)
+
+        forecast = get_crop_forecast('wheat', 'north', model)
+        assert forecast == get_crop_forecast('wheat', 'north', model)
+        assert forecast['predicted_demand'] > 0 and 0 <= forecast['confidence_score'] <= 1
+        assert set(forecast['suitable_regions']) <= {key[1] for key in model.keys}
+
+        # A model update is pushed to the engine by the forecaster
+        next_day = {measure: {'crop_type': np.array(['wheat']), 'region': np.array(['north']),
+                              'day': np.array([model.last_day + 1]), 'value': np.array([value])}
+                    for measure, value in [('price', 300.0), ('yield', 3.0), ('demand', 3000.0)]}
+        assert forecaster.update(next_day) == 1
+        assert engine._seasonal_version == forecaster.version
+
+        try:
+            get_crop_forecast('wheat', 'north', None)
+            assert False, "expected SeasonalUnavailable"
+        except SeasonalUnavailable:
+            pass
+
+if __name__ == "__main__":
+    test_fit_finds_peak_months_and_trends()
+    test_updates_continue_from_last_day()
+    test_split_same_day_batches()
+    test_forecaster_cache_and_derived_recommendations()
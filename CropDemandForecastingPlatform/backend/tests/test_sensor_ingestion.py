@@ -0,0 +1,155 @@
+import sys
+import os
+import json
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.database import Database
+from core.sensor_ingestion import (SensorBackpressure, SensorIngestor, SensorSocketServer,
+                                   WindowAggregator, parse_lines)
+
+SENSOR_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'simulated', 'iot_sensor_data.csv')
+
+def make_lines(n, seed=0):
+    rng = np.random.RandomState(seed)
+    regions = ['north', 'south', 'east', 'west', 'central']
+    start = pd.Timestamp('2024-01-01')
+    for i in range(n):
+        yield json.dumps({
+            'sensor_id': f'SENSOR{i % 50:03d}',
+            'location': f'{regions[i % 5]}_field_{i % 3}',
+            'timestamp': (start + pd.Timedelta(seconds=int(i * 0.5))).isoformat(),
+            'temperature': float(rng.uniform(15, 30)), 'humidity': float(rng.uniform(40, 90)),
+            'soil_moisture': float(rng.uniform(20, 60)), 'soil_ph': 6.8, 'light_intensity': 850.0
+        }).encode('utf-8')
+
+def test_parse_and_window_aggregates():
+    """Test line parsing and that tumbling-window means match pandas"""
+    print("\n=== Testing Sensor Window Aggregates ===")
+
+    csv = pd.read_csv(SENSOR_CSV)
+    readings, rejected = parse_lines(json.dumps(row).encode() for row in csv.to_dict('records'))
+    assert rejected == 0 and [r['region'] for r in readings] == ['north', 'south', 'east', 'west', 'central']
+
+    bad = [b'not json', b'{"sensor_id": "S1"}', b'{"sensor_id": "S1", "timestamp": "2024-01-01", '
+           b'"region": "north", "humidity": "wet"}', b'']
+    assert parse_lines(bad) == ([], 3)
+
+    readings, _ = parse_lines(make_lines(4000))
+    aggregator = WindowAggregator(window_seconds=300, max_windows=12)
+    for i in range(0, len(readings), 700):
+        aggregator.add_batch(readings[i:i + 700])
+
+    frame = pd.DataFrame(readings)
+    frame['window'] = frame['timestamp'].to_numpy(dtype='datetime64[s]').astype(np.int64) // 300 * 300
+    expected = frame[frame['region'] == 'east'].groupby('window')['soil_moisture'].agg(['mean', 'count'])
+    windows = aggregator.windows('east')
+    assert len(windows) == len(expected) == 7
+    for window in windows:
+        assert window['count'] == expected.loc[window['window_start'], 'count']
+        assert np.isclose(window['soil_moisture'], expected.loc[window['window_start'], 'mean'])
+    assert aggregator.features('east') == {'humidity': windows[-1]['humidity'],
+                                           'soil_moisture': windows[-1]['soil_moisture']}
+
+    small = WindowAggregator(window_seconds=300, max_windows=2)
+    small.add_batch(readings)
+    assert len(small.windows('east')) == 2
+    small.add_batch(readings[:10])
+    assert small.late == 10
+
+def test_ingestor_writes_batches_and_applies_backpressure():
+    """Test queued readings reach sensor_data through the socket and HTTP-style submits"""
+    print("\n=== Testing Sensor Ingestor ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        db.ensure_schema()
+        ingestor = SensorIngestor(db, batch_size=1000, max_pending=2500)
+
+        server = SensorSocketServer(ingestor, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with socket.create_connection(server.server_address) as sock:
+                sock.sendall(b'\n'.join(make_lines(6000)) + b'\n')
+            readings, _ = parse_lines(make_lines(2000, seed=1))
+            ingestor.submit(readings, block=True, timeout=10)
+            assert ingestor.flush(timeout=10)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        deadline = time.time() + 10
+        while ingestor.stats()['written'] < 8000 and time.time() < deadline:
+            ingestor.flush(timeout=1)
+
+        stats = ingestor.stats()
+        assert stats['written'] == stats['accepted'] == 8000 and stats['errors'] == 0
+        with db.pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM sensor_data').fetchone()[0] == 8000
+
+        # Hold the writer so the queue cannot drain, then overflow it
+        blocked = threading.Event()
+        original = db.store_sensor_readings
+        db.store_sensor_readings = lambda batch: blocked.wait(10) and original(batch)
+        try:
+            ingestor.submit(readings[:1000])
+            ingestor.submit(readings[1000:2000])
+            try:
+                ingestor.submit(readings[:1000])
+                raise AssertionError('expected SensorBackpressure')
+            except SensorBackpressure:
+                pass
+        finally:
+            blocked.set()
+        assert ingestor.flush(timeout=10)
+        assert ingestor.stats()['rejected'] == 1000
+        ingestor.stop()
+
+def test_ingestor_retries_and_counts_dropped_batches():
+    """Test a failed write is retried, and a batch that keeps failing is counted as dropped but still aggregated"""
+    print("\n=== Testing Sensor Ingestor Failures ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        db.ensure_schema()
+        ingestor = SensorIngestor(db, batch_size=1000, max_retries=2, retry_delay=0.01)
+        readings, _ = parse_lines(make_lines(500))
+
+        original = db.store_sensor_readings
+        failures = [1]
+
+        def flaky(batch):
+            if failures[0]:
+                failures[0] -= 1
+                raise sqlite3.OperationalError('database is locked')
+            return original(batch)
+
+        db.store_sensor_readings = flaky
+        ingestor.submit(readings)
+        assert ingestor.flush(timeout=10)
+        stats = ingestor.stats()
+        assert stats['written'] == 500 and stats['errors'] == 1 and stats['dropped'] == 0
+
+        failures[0] = 10
+        ingestor.submit(readings)
+        assert ingestor.flush(timeout=10)
+        stats = ingestor.stats()
+        assert stats['written'] == 500 and stats['errors'] == 4 and stats['dropped'] == 500
+        assert sum(w['count'] for r in ingestor.aggregator.regions() for w in ingestor.aggregator.windows(r)) == 1000
+        with db.pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM sensor_data').fetchone()[0] == 500
+        ingestor.stop()
+
+if __name__ == "__main__":
+    test_parse_and_window_aggregates()
+    test_ingestor_writes_batches_and_applies_backpressure()
+    test_ingestor_retries_and_counts_dropped_batches()
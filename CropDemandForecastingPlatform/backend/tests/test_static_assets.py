@@ -0,0 +1,100 @@
+import sys
+import os
+import gzip
+import json
+import tempfile
+from pathlib import Path
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.static_assets import IMMUTABLE, REVALIDATE, StaticAssets, build_assets, parse_accept_encoding
+
+def make_public(root: Path) -> Path:
+    public = root / 'public'
+    (public / 'assets' / 'css').mkdir(parents=True)
+    (public / 'js').mkdir()
+    (public / 'assets' / 'css' / 'style.css').write_text('body { margin: 0; }\n' * 50)
+    (public / 'js' / 'app.js').write_text('console.log("ready");\n' * 50)
+    (public / 'index.html').write_text(
+        '<link rel="stylesheet" href="assets/css/style.css">\n'
+        '<script src="/js/app.js?v=1"></script>\n' + '<p>Crop demand</p>\n' * 50)
+    return public
+
+def test_build_fingerprints_and_rewrites_links():
+    """Test the build hashes asset names, precompresses text files and rewrites page links"""
+    print("\n=== Testing Static Asset Build ===")
+
+    root = Path(tempfile.mkdtemp(prefix='static-'))
+    public = make_public(root)
+    manifest = build_assets(public, root / 'dist')
+
+    css = manifest['assets']['assets/css/style.css']
+    assert css['path'].startswith('assets/css/style.') and css['path'].endswith('.css')
+    assert css['path'] != 'assets/css/style.css'
+    assert gzip.decompress((root / 'dist' / css['encodings']['gzip']['path']).read_bytes()) == \
+        (public / 'assets' / 'css' / 'style.css').read_bytes()
+
+    html = (root / 'dist' / 'index.html').read_text()
+    assert f'href="{css["path"]}"' in html
+    assert f'src="/{manifest["assets"]["js/app.js"]["path"]}?v=1"' in html
+    assert json.loads((root / 'dist' / 'manifest.json').read_text()) == manifest
+
+    # Rebuilding an unchanged tree gives identical names and bytes
+    assert build_assets(public, root / 'dist') == manifest
+
+def test_variant_selection_by_accept_encoding():
+    """Test cache headers per URL kind and content negotiation between the variants"""
+    print("\n=== Testing Static Asset Selection ===")
+
+    assert parse_accept_encoding('gzip;q=0.5, br;q=0, *') == {'gzip': 0.5, 'br': 0.0, '*': 1.0}
+
+    root = Path(tempfile.mkdtemp(prefix='static-'))
+    manifest = build_assets(make_public(root), root / 'dist')
+    assets = StaticAssets(str(root / 'dist'))
+    assert assets
+    hashed = manifest['assets']['assets/css/style.css']['path']
+
+    variant = assets.select(hashed, 'gzip, deflate')
+    assert variant.encoding == 'gzip' and variant.path.endswith('.gz')
+    assert variant.cache_control == IMMUTABLE and variant.content_type == 'text/css'
+    assert assets.select('/assets/css/style.css', 'gzip').cache_control == REVALIDATE
+    assert assets.select(hashed, 'gzip;q=0').encoding is None
+    assert assets.select(hashed, None).etag != variant.etag
+    assert assets.select('index.html', '*').encoding is not None
+    assert assets.select('assets/css/missing.css', 'gzip') is None
+
+    assert not StaticAssets(str(root / 'missing'))
+
+    # Codings are ranked by quality; a hand-made br variant stands in when brotli is not installed
+    entry = manifest['assets']['assets/css/style.css']
+    entry['encodings'] = {'br': {'path': entry['path'] + '.br', 'size': 1}, **entry['encodings']}
+    (root / 'dist' / 'manifest.json').write_text(json.dumps(manifest))
+    assert assets.refresh() and assets.select(hashed, 'gzip').encoding == 'gzip'
+    assert assets.select(hashed, 'gzip, br').encoding == 'br'
+    assert assets.select(hashed, 'gzip, br;q=0').encoding == 'gzip'
+    assert assets.select(hashed, 'gzip;q=0.9, br;q=0.5').encoding == 'gzip'
+    assert assets.select(hashed, 'br;q=0, *').encoding == 'gzip'
+    assert not assets.refresh()
+
+def test_rebuild_is_picked_up():
+    """Test a running server follows a rebuild that replaced the files it was serving"""
+    print("\n=== Testing Static Asset Rebuilds ===")
+
+    root = Path(tempfile.mkdtemp(prefix='static-'))
+    public = make_public(root)
+    build_assets(public, root / 'dist')
+    assets = StaticAssets(str(root / 'dist'), check_interval=0.0)
+    old = assets.select('assets/css/style.css').path
+
+    (public / 'assets' / 'css' / 'style.css').write_text('body { margin: 1px; }\n' * 50)
+    manifest = build_assets(public, root / 'dist')
+    assert not os.path.exists(old)
+    variant = assets.select('assets/css/style.css')
+    assert variant.path == str(root / 'dist' / manifest['assets']['assets/css/style.css']['path'])
+    assert os.path.exists(variant.path)
+
+if __name__ == "__main__":
+    test_build_fingerprints_and_rewrites_links()
+    test_variant_selection_by_accept_encoding()
+    test_rebuild_is_picked_up()
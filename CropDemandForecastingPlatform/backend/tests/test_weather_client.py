@@ -0,0 +1,154 @@
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+from datetime import date, timedelta
+import numpy as np
+
+# Add the backend source directory to the Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.weather_api import WeatherAPI
+from api.weather_cache import WeatherCache
+from api.weather_client import AsyncWeatherClient, WeatherAPIError, ingest_forecasts
+from api.weather_stub_server import WeatherStubServer
+from core.database import Database
+
+REGIONS = [f'region-{i}' for i in range(40)]
+
+def test_client_pooling_and_coalescing():
+    """Test pooled connections are reused and duplicate region requests share one fetch"""
+    print("\n=== Testing Async Weather Client ===")
+
+    async def run():
+        async with WeatherStubServer(latency=0.01) as server:
+            async with AsyncWeatherClient(server.base_url, max_connections=5, max_concurrency=10) as client:
+                results = await client.fetch_many(REGIONS + REGIONS[:10], days=3)
+                duplicates = await asyncio.gather(*(client.fetch_forecast('north', 3) for _ in range(5)))
+                stats = client.stats()
+            return server, results, duplicates, stats
+
+    server, results, duplicates, stats = asyncio.run(run())
+    assert len(results) == len(REGIONS)
+    assert all(len(r['forecast']) == 3 for r in results.values())
+    assert all(d == duplicates[0] for d in duplicates)
+    assert stats['coalesced'] == 14
+    assert stats['requests'] == server.requests == len(REGIONS) + 1
+    assert stats['connects'] <= 5 and server.connections == stats['connects']
+    assert stats['reuses'] == stats['requests'] - stats['connects']
+
+def test_client_retries_and_failures():
+    """Test transient 503s are retried and exhausted retries surface as WeatherAPIError"""
+    print("\n=== Testing Weather Client Retries ===")
+
+    async def run(failure_rate, retries):
+        async with WeatherStubServer(failure_rate=failure_rate, seed=1) as server:
+            async with AsyncWeatherClient(server.base_url, retries=retries, backoff=0.001) as client:
+                return await client.fetch_many(REGIONS[:20], days=1), client.stats()
+
+    results, stats = asyncio.run(run(0.3, 8))
+    assert all(isinstance(r, dict) for r in results.values())
+    assert stats['retries'] > 0 and stats['failures'] == 0
+
+    results, stats = asyncio.run(run(1.0, 2))
+    assert all(isinstance(r, WeatherAPIError) and r.status == 503 for r in results.values())
+    assert stats['requests'] == 20 * 3 and stats['failures'] == 20
+
+def test_ingest_forecasts_bulk_inserts_weather():
+    """Test fetched forecasts land in weather_history"""
+    print("\n=== Testing Weather Ingestion ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'agritech.db'))
+        db.ensure_schema()
+
+        async def run():
+            async with WeatherStubServer() as server:
+                return await ingest_forecasts(db, server.base_url, ['north', 'south', 'east'], days=7)
+
+        summary = asyncio.run(run())
+        assert summary['rows'] == 21 and summary['failed'] == []
+        with db.pool.connection() as conn:
+            count = conn.execute('''
+                SELECT COUNT(*) FROM weather_history w JOIN regions r ON r.id = w.region_id
+                WHERE r.name = 'south' AND w.soil_moisture IS NOT NULL
+            ''').fetchone()[0]
+        assert count == 7
+
+def test_weather_cache_fetches_only_missing_days():
+    """Test the history cache fetches only the new tail and keeps aggregates equal to a full recompute"""
+    print("\n=== Testing Incremental Weather Cache ===")
+
+    api = WeatherAPI()
+    clock = {'today': date(2024, 3, 1)}
+    calls = []
+
+    def fetch(region, start, end):
+        calls.append((region, start, end))
+        return api.fetch_history_range(region, start, end)
+
+    cache = WeatherCache(fetch, today=lambda: clock['today'])
+    history, _ = cache.history('north', 30)
+    assert len(history) == 30 and history[-1]['date'] == '2024-02-29'
+    assert calls == [('north', date(2024, 1, 31), date(2024, 2, 29))]
+
+    cache.history('north', 30)
+    assert len(calls) == 1
+
+    for _ in range(10):
+        clock['today'] += timedelta(days=1)
+        history, aggregates = cache.history('north', 30)
+        assert calls[-1][1] == calls[-1][2] == clock['today'] - timedelta(days=1)
+    assert cache.stats()['days_fetched'] == 40
+
+    temperatures = np.array([day['temperature'] for day in history])
+    rainfall = np.array([day['rainfall'] for day in history])
+    assert np.isclose(aggregates['temperature_mean_7d'], temperatures[-7:].mean())
+    assert np.isclose(aggregates['temperature_mean_30d'], temperatures.mean())
+    assert np.isclose(aggregates['rainfall_total_7d'], rainfall[-7:].sum())
+    expected_total = sum(day['rainfall'] for day in api.fetch_history_range('north', date(2024, 1, 31), date(2024, 3, 10)))
+    assert np.isclose(aggregates['cumulative_rainfall'], expected_total)
+
+    # A longer window than is cached refetches and rebuilds
+    assert len(cache.history('north', 60)[0]) == 60
+    assert cache.stats()['rebuilds'] == 1
+
+    assert api.get_historical_weather('south', 14)['history'] == api.get_historical_weather('south', 14)['history']
+
+def test_weather_cache_fetches_outside_the_lock():
+    """Test a slow region fetch does not hold up other regions and is shared by concurrent requests"""
+    print("\n=== Testing Weather Cache Locking ===")
+
+    api = WeatherAPI()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch(region, start, end):
+        calls.append(region)
+        if region == 'slow':
+            started.set()
+            assert release.wait(10)
+        return api.fetch_history_range(region, start, end)
+
+    cache = WeatherCache(fetch, today=lambda: date(2024, 3, 1))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.history('slow', 7))) for _ in range(2)]
+    threads[0].start()
+    assert started.wait(10)
+    threads[1].start()
+
+    # Other regions and stats are served while the slow fetch is in flight
+    assert len(cache.history('fast', 7)[0]) == 7
+    assert cache.stats()['fetches'] == 1
+    release.set()
+    for thread in threads:
+        thread.join(10)
+    assert cache.stats()['requests'] == 3 and calls.count('slow') == 1 and len(results) == 2 and results[0] == results[1]
+
+if __name__ == "__main__":
+    test_client_pooling_and_coalescing()
+    test_client_retries_and_failures()
+    test_ingest_forecasts_bulk_inserts_weather()
+    test_weather_cache_fetches_only_missing_days()
+    test_weather_cache_fetches_outside_the_lock()
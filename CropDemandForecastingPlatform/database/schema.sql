@@ -31,6 +31,7 @@ CREATE TABLE IF NOT EXISTS crop_yields (
     region_id INTEGER,
     date DATE,
     yield_amount FLOAT,
+    demand FLOAT,
     area_hectares FLOAT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (crop_id) REFERENCES crops(id),
@@ -68,4 +69,47 @@ CREATE TABLE IF NOT EXISTS sensor_data (
     light_intensity FLOAT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (region_id) REFERENCES regions(id)
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS forecast_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS forecast_job_results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    crop_type TEXT,
+    region TEXT,
+    temperature FLOAT,
+    rainfall FLOAT,
+    soil_quality FLOAT,
+    predicted_yield FLOAT,
+    predicted_demand FLOAT,
+    PRIMARY KEY (job_id, idx),
+    FOREIGN KEY (job_id) REFERENCES forecast_jobs(id)
+);
+
+CREATE TABLE IF NOT EXISTS model_updates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    version TEXT,
+    rows INTEGER,
+    models INTEGER,
+    trees_added INTEGER,
+    last_yield_id INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_weather_history_region_date ON weather_history (region_id, date);
+CREATE INDEX IF NOT EXISTS idx_crop_yields_crop_region_date ON crop_yields (crop_id, region_id, date);
+CREATE INDEX IF NOT EXISTS idx_crop_yields_region_date ON crop_yields (region_id, date);
+CREATE INDEX IF NOT EXISTS idx_market_prices_crop_region_date ON market_prices (crop_id, region_id, date);
+CREATE INDEX IF NOT EXISTS idx_market_prices_region_date ON market_prices (region_id, date);
+CREATE INDEX IF NOT EXISTS idx_sensor_data_region_timestamp ON sensor_data (region_id, timestamp);